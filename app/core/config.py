@@ -1,11 +1,48 @@
 from pathlib import Path
 import os
+import socket
 
 class Settings:
     PROJECT_NAME: str = "Suricata Monitor API"
     
-    SURICATA_LOG_PATH: Path = Path("/var/log/suricata/eve.json")
-    SURICATA_RULES_PATH: Path = Path("/etc/suricata/rules")
+    SURICATA_LOG_PATH: Path = Path(os.getenv("SURICATA_LOG_PATH", "/var/log/suricata/eve.json"))
+    # 수집할 eve 파일 목록 (콤마 구분, glob 가능, "센서=경로" 로 센서 이름 지정. 기본은 SURICATA_LOG_PATH)
+    SURICATA_LOG_SOURCES: str = os.getenv("SURICATA_LOG_SOURCES", str(SURICATA_LOG_PATH))
+    SENSOR_NAME: str = os.getenv("SENSOR_NAME", socket.gethostname())  # 센서 이름을 지정하지 않은 항목의 sensor 값
+    SURICATA_RULES_PATH: Path = Path(os.getenv("SURICATA_RULES_PATH", "/etc/suricata/rules"))
+    # 이 시간 안에 들어온 규칙 변경은 리로드 1번으로 합침 (seconds)
+    RULES_RELOAD_DEBOUNCE: float = float(os.getenv("RULES_RELOAD_DEBOUNCE", "2.0"))
+    
+    # Suricata 프로세스 관리
+    SURICATA_CONFIG_PATH: str = os.getenv("SURICATA_CONFIG_PATH", "/etc/suricata/suricata.yaml")
+    SURICATA_INTERFACE: str = os.getenv("SURICATA_INTERFACE", "eth0")
+    SURICATA_PID_FILE: Path = Path(os.getenv("SURICATA_PID_FILE", "/var/run/suricata.pid"))
+    # 명령 앞에 붙일 prefix (Windows 에서 WSL 의 Suricata 를 관리할 때 "wsl", 같은 호스트면 빈 값 -> /proc 직접 확인)
+    SURICATA_COMMAND_PREFIX: str = os.getenv("SURICATA_COMMAND_PREFIX", "wsl" if os.name == "nt" else "")
+    SURICATA_STATUS_INTERVAL: float = float(os.getenv("SURICATA_STATUS_INTERVAL", "2.0"))  # seconds (상태 캐시 갱신 주기)
+    SURICATA_STOP_TIMEOUT: float = 10.0  # seconds (시작/종료 확인 대기, 초과 시 SIGKILL)
+    SURICATA_COMMAND_TIMEOUT: float = 30.0  # seconds (sudo/ps 등 명령 1개 최대 실행 시간)
+    # unix command socket (suricata.yaml 의 unix-command, 연결할 수 없으면 리로드/종료는 신호로 대체)
+    SURICATA_COMMAND_SOCKET: str = os.getenv("SURICATA_COMMAND_SOCKET", "/var/run/suricata-command.socket")
+    SURICATA_SOCKET_TIMEOUT: float = float(os.getenv("SURICATA_SOCKET_TIMEOUT", "5.0"))  # seconds (소켓 명령 응답 대기)
+    SURICATA_RELOAD_TIMEOUT: float = float(os.getenv("SURICATA_RELOAD_TIMEOUT", "120"))  # seconds (reload-rules 완료 대기)
+    
+    # eve.json tail 설정
+    SURICATA_LOG_POLL_INTERVAL: float = float(os.getenv("SURICATA_LOG_POLL_INTERVAL", "1.0"))  # seconds (inotify 미지원 시 폴링 주기)
+    SURICATA_LOG_READ_CHUNK: int = 1024 * 1024  # bytes
+    SURICATA_LOG_RESCAN_INTERVAL: float = float(os.getenv("SURICATA_LOG_RESCAN_INTERVAL", "10"))  # seconds (glob 새 파일 확인 주기)
+    
+    # alert 메모리 캐시 최대 개수
+    ALERT_CACHE_SIZE: int = int(os.getenv("ALERT_CACHE_SIZE", "100000"))
+    ALERT_CACHE_PAYLOAD_SIZE: int = int(os.getenv("ALERT_CACHE_PAYLOAD_SIZE", "10000"))  # payload 는 최신 N개만 보관
+    
+    # 실시간 alert 스트림 (SSE / WebSocket)
+    ALERT_STREAM_QUEUE_SIZE: int = int(os.getenv("ALERT_STREAM_QUEUE_SIZE", "1000"))  # 구독자별 대기 이벤트 수 (초과 시 연결 끊음)
+    ALERT_STREAM_MAX_CLIENTS: int = int(os.getenv("ALERT_STREAM_MAX_CLIENTS", "100"))
+    ALERT_STREAM_HEARTBEAT: float = 15.0  # seconds (이벤트가 없을 때 keepalive 전송 주기)
+    
+    # 수집 체크포인트 (ClickHouse 저장 완료 위치)
+    INGEST_CHECKPOINT_PATH: Path = Path(os.getenv("INGEST_CHECKPOINT_PATH", "data/ingest_checkpoint.json"))
     
     # ClickHouse 설정
     CLICKHOUSE_HOST: str = os.getenv("CLICKHOUSE_HOST", "localhost")
@@ -14,9 +51,75 @@ class Settings:
     CLICKHOUSE_PASSWORD: str = os.getenv("CLICKHOUSE_PASSWORD", "qwe123")
     CLICKHOUSE_DATABASE: str = os.getenv("CLICKHOUSE_DATABASE", "suricata")
     CLICKHOUSE_TABLE: str = "events"
+    CLICKHOUSE_ROLLUP_TTL_DAYS: int = 365  # 통계 rollup 보관 기간
+    # 이벤트 타입별 테이블 보관 기간 (days, 목록에 없는 타입은 other)
+    CLICKHOUSE_EVENT_TTL_DAYS: dict = {
+        "alert": 365,
+        "flow": 30,
+        "http": 90,
+        "dns": 30,
+        "tls": 90,
+        "fileinfo": 90,
+        "anomaly": 90,
+        "drop": 90,
+        "ssh": 90,
+        "smtp": 90,
+        "other": 90,
+    }
+    # stats 이벤트 카운터 시계열 테이블 (sensor, iface, metric, value, delta)
+    CLICKHOUSE_METRICS_TABLE: str = os.getenv("CLICKHOUSE_METRICS_TABLE", "stats_metrics")
+    CLICKHOUSE_METRICS_TTL_DAYS: int = int(os.getenv("CLICKHOUSE_METRICS_TTL_DAYS", "180"))
+    STATS_RESTORE_DAYS: int = 7  # 시작 시 delta 기준값을 읽어올 범위 (이보다 오래 멈췄으면 delta 0 부터)
+    # 원본 EVE JSON 저장 여부 (false 면 타입별 컬럼만 저장, raw_json 은 빈 값)
+    CLICKHOUSE_STORE_RAW_JSON: bool = os.getenv("CLICKHOUSE_STORE_RAW_JSON", "true").lower() in ("1", "true", "yes")
     
     # 배치 삽입 설정
     CLICKHOUSE_BATCH_SIZE: int = 100
     CLICKHOUSE_BATCH_INTERVAL: int = 5  # seconds
+    CLICKHOUSE_MAX_INFLIGHT_INSERTS: int = int(os.getenv("CLICKHOUSE_MAX_INFLIGHT_INSERTS", "2"))  # 동시 진행 가능한 삽입 수
+    
+    # 연결 풀 및 재연결 설정
+    CLICKHOUSE_POOL_SIZE: int = int(os.getenv("CLICKHOUSE_POOL_SIZE", "4"))  # 삽입 + 조회 동시 사용 수
+    CLICKHOUSE_POOL_TIMEOUT: float = 30.0  # seconds (풀에서 클라이언트를 기다리는 최대 시간)
+    CLICKHOUSE_HEALTH_INTERVAL: int = 10  # seconds (ping 주기)
+    CLICKHOUSE_RECONNECT_MIN_DELAY: float = 1.0  # seconds
+    CLICKHOUSE_RECONNECT_MAX_DELAY: float = 60.0  # seconds
+    
+    # 이력 조회 API (/events)
+    EVENT_QUERY_DEFAULT_HOURS: int = 24  # start 미지정 시 조회 범위
+    EVENT_QUERY_MAX_LIMIT: int = 1000  # 페이지당 최대 행 수
+    EVENT_QUERY_STREAM_PAGE_SIZE: int = 10000  # 스트리밍 시 내부 페이지 크기
+    
+    # 통계 API 결과 캐시 (TTL = 조회 범위 / DIVISOR, MIN~MAX 사이)
+    STATS_CACHE_TTL_DIVISOR: int = 720  # 1시간 범위 -> 5초, 24시간 -> 120초
+    STATS_CACHE_MIN_TTL: float = 5.0  # seconds
+    STATS_CACHE_MAX_TTL: float = float(os.getenv("STATS_CACHE_MAX_TTL", "600"))  # seconds
+    STATS_CACHE_MAX_ENTRIES: int = 256
+    STATS_MAX_HOURS: int = 24 * 365  # rollup 보관 기간까지
+    
+    # 메모리 버퍼 한도 및 backpressure 정책
+    INGEST_MAX_BUFFERED_EVENTS: int = int(os.getenv("INGEST_MAX_BUFFERED_EVENTS", "200000"))
+    INGEST_BACKPRESSURE_POLICY: str = os.getenv("INGEST_BACKPRESSURE_POLICY", "spill")  # block | drop | spill
+    INGEST_DROP_EVENT_TYPES: frozenset = frozenset(
+        t.strip() for t in os.getenv("INGEST_DROP_EVENT_TYPES", "flow,netflow,stats").split(",") if t.strip()
+    )  # drop 정책에서 버릴 수 있는 이벤트 타입 (나머지는 block)
+    INGEST_SPILL_DIR: Path = Path(os.getenv("INGEST_SPILL_DIR", "data/spill"))
+    INGEST_SPILL_MAX_BYTES: int = int(os.getenv("INGEST_SPILL_MAX_BYTES", str(10 * 1024 ** 3)))  # 초과 시 block
+    # 재시도해도 삽입할 수 없는 배치(데이터 오류)를 옮겨 두는 곳 (스필과 같은 형식, 초과 시 폐기)
+    INGEST_DEAD_LETTER_DIR: Path = Path(os.getenv("INGEST_DEAD_LETTER_DIR", "data/dead_letter"))
+    INGEST_DEAD_LETTER_MAX_BYTES: int = int(os.getenv("INGEST_DEAD_LETTER_MAX_BYTES", str(1024 ** 3)))
+    
+    # 수집 모드: inline (API 프로세스에서 수집) | process (ingest.py 가 별도 프로세스로 수집)
+    INGEST_MODE: str = os.getenv("INGEST_MODE", "inline")
+    INGEST_WORKERS: int = int(os.getenv("INGEST_WORKERS", str(max(1, (os.cpu_count() or 2) - 2))))  # 디코딩 워커 프로세스 수
+    INGEST_QUEUE_CHUNKS: int = int(os.getenv("INGEST_QUEUE_CHUNKS", "16"))  # reader/워커 큐에 대기 가능한 블록 수
+    INGEST_SHUTDOWN_TIMEOUT: float = 30.0  # seconds (종료 시 읽은 블록 저장을 기다리는 시간)
+    # process 모드 수집 프로세스의 /metrics 포트 (0 이면 사용 안 함, API 는 자체 /metrics)
+    INGEST_METRICS_PORT: int = int(os.getenv("INGEST_METRICS_PORT", "9101"))
+
+    # 로깅 (같은 메시지는 LOG_RATE_INTERVAL 초마다 LOG_RATE_LIMIT 번까지만 출력, 0 이면 제한 없음)
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_RATE_LIMIT: int = int(os.getenv("LOG_RATE_LIMIT", "10"))
+    LOG_RATE_INTERVAL: float = float(os.getenv("LOG_RATE_INTERVAL", "60"))
 
 settings = Settings()
\ No newline at end of file
@@ -1,42 +1,70 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response, StreamingResponse
 from typing import List, Optional
 import asyncio
-from pathlib import Path
+import json
+import logging
+from datetime import datetime
 import uvicorn
 from contextlib import asynccontextmanager
 
 from app.core.config import settings
 from app.model.alert import Alert
 from app.model.suricata_status import SuricataStatus
-from app.model.rule_update import RuleUpdate
-from app.service.suricata_manager import SuricataManager
-from app.util.logger import monitor_logs, alert_cache
+from app.model.rule_update import RuleBatch, RuleBatchResult, RuleInfo, RuleUpdate
+from app.model.rule_reload import RuleReload
+from app.model.clickhouse_status import ClickHouseStatus
+from app.model.event_record import EventPage
+from app.model.event_stats import AlertStats, EventTypeCount, HourlyCount, SignatureStat, SourceIpStat, HttpMethodCount
+from app.model.sensor_metrics import CaptureStat, MetricPoint
+from app.service.suricata_manager import suricata_manager
+from app.service.rule_store import RuleChangeError, rule_store
+from app.service.event_query import EventQuery
+from app.service.event_stats import EventStats, stats_cache
+from app.service.sensor_metrics import SensorMetrics
+from app.util.logger import monitor_logs, alert_cache, alert_broadcaster
+from app.util.alert_broadcaster import StreamFilter, StreamSubscriber
 from app.util.clickhouse_client import clickhouse_client
+from app.util.suricata_socket import SuricataCommandError, SuricataSocketError, suricata_socket
+from app.util.log_config import configure_logging
+from app.util.metrics import CONTENT_TYPE, registry
+
+log = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    print("=" * 50)
+    configure_logging()
+    # process 모드면 ClickHouse 저장과 마이그레이션은 ingest.py 프로세스가 담당
+    store = settings.INGEST_MODE != "process"
+    clickhouse_client.manage_schema = store
     if clickhouse_client.connect():
         clickhouse_client.ensure_database()
     else:
-        print("⚠ ClickHouse 연결 실패 - 로컬 캐시만 사용됩니다")
+        log.warning("ClickHouse 연결 실패 - 백그라운드에서 재연결을 시도합니다")
     
     # 백그라운드 태스크 시작
-    monitor_task = asyncio.create_task(monitor_logs())
-    flush_task = asyncio.create_task(clickhouse_client.periodic_flush())
-    print("=" * 50)
+    tasks = [asyncio.create_task(monitor_logs(store))]
+    if store:
+        tasks.append(asyncio.create_task(clickhouse_client.periodic_flush()))
+        # 이전 스키마 테이블이 남아 있으면 새 스키마로 데이터 이전
+        tasks.append(asyncio.create_task(clickhouse_client.migrate_legacy_data()))
+    # 연결 상태 확인 및 끊겼을 때 자동 재연결
+    tasks.append(asyncio.create_task(clickhouse_client.maintain_connection()))
+    # Suricata 프로세스 상태 캐시 갱신
+    tasks.append(asyncio.create_task(suricata_manager.watch()))
     
     yield
     
-    print("\n애플리케이션 종료.")
-    monitor_task.cancel()
-    flush_task.cancel()
+    log.info("애플리케이션 종료")
+    for task in tasks:
+        task.cancel()
+    alert_broadcaster.close()
+    await suricata_socket.close()
     
     await clickhouse_client.flush_batch()
     clickhouse_client.disconnect()
-    print("ClickHouse 연결 종료 완료")
+    log.info("ClickHouse 연결 종료 완료")
 
 app = FastAPI(title=settings.PROJECT_NAME, lifespan=lifespan)
 
@@ -45,26 +73,41 @@ async def root():
     return {
         "service": settings.PROJECT_NAME,
         "status": "running",
-        "suricata_status": SuricataManager.is_running()
+        "suricata_status": suricata_manager.is_running
     }
 
 @app.get("/status", response_model=SuricataStatus)
 async def get_suricata_status():
-    is_running = SuricataManager.is_running()
-    pid = SuricataManager.get_pid() if is_running else None
-    
+    # 백그라운드 watcher 가 갱신한 캐시 (SURICATA_STATUS_INTERVAL 이내의 상태)
+    status = suricata_manager.status
     return SuricataStatus(
-        is_running=is_running,
-        pid=pid,
-        uptime=None
+        is_running=status.is_running,
+        pid=status.pid,
+        uptime=suricata_manager.uptime(),
+        started_at=status.started_at,
+        checked_at=status.checked_at,
+        command_socket=suricata_socket.connected,
+        last_reload=suricata_manager.last_reload
     )
 
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus 텍스트 형식 지표 (수집 라인/바이트/이벤트, 배치 크기, 삽입 시간, 버퍼, tail lag, alert 캐시)
+
+    INGEST_MODE=process 이면 저장 관련 지표는 수집 프로세스의 INGEST_METRICS_PORT 에서 제공
+    """
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
+@app.get("/clickhouse/status", response_model=ClickHouseStatus)
+async def get_clickhouse_status():
+    return ClickHouseStatus(**clickhouse_client.status())
+
 @app.post("/control/start")
 async def start_suricata():
-    if SuricataManager.is_running():
+    if (await suricata_manager.refresh()).is_running:
         raise HTTPException(status_code=400, detail="Suricata is already running")
     
-    success = await SuricataManager.start()
+    success = await suricata_manager.start()
     if success:
         return {"message": "Suricata started successfully"}
     else:
@@ -72,51 +115,392 @@ async def start_suricata():
 
 @app.post("/control/stop")
 async def stop_suricata():
-    if not SuricataManager.is_running():
+    if not (await suricata_manager.refresh()).is_running:
         raise HTTPException(status_code=400, detail="Suricata is not running")
     
-    success = await SuricataManager.stop()
+    success = await suricata_manager.stop()
     if success:
         return {"message": "Suricata stopped successfully"}
     else:
         raise HTTPException(status_code=500, detail="Failed to stop Suricata")
 
+@app.post("/control/reload", response_model=RuleReload)
+async def reload_suricata_rules():
+    result = await suricata_manager.reload_rules()
+    if not result.success:
+        raise HTTPException(status_code=500, detail=result.message)
+    return result
+
+async def _socket_command(coro):
+    """command socket 조회 (소켓을 쓸 수 없으면 503, Suricata 가 거부하면 400)"""
+    try:
+        return await coro
+    except SuricataSocketError as e:
+        raise HTTPException(status_code=503, detail=f"Suricata command socket 사용 불가: {e}")
+    except SuricataCommandError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/suricata/ruleset-stats")
+async def get_ruleset_stats():
+    return await _socket_command(suricata_socket.ruleset_stats())
+
+@app.get("/suricata/iface-stat")
+async def get_iface_stat(iface: Optional[str] = None):
+    # iface 를 생략하면 SURICATA_INTERFACE
+    return await _socket_command(suricata_socket.iface_stat(iface or settings.SURICATA_INTERFACE))
+
+@app.get("/suricata/iface-list")
+async def get_iface_list():
+    return await _socket_command(suricata_socket.iface_list())
+
+@app.get("/suricata/counters")
+async def get_suricata_counters():
+    return await _socket_command(suricata_socket.dump_counters())
+
 @app.get("/alerts", response_model=List[Alert])
 async def get_alerts(
     limit: int = 100,
     severity: Optional[int] = None,
     src_ip: Optional[str] = None,
-    dest_ip: Optional[str] = None
+    dest_ip: Optional[str] = None,
+    signature: Optional[str] = None
 ):
-    alerts = alert_cache[-limit:]
+    # 인덱스로 필터링한 뒤 조건에 맞는 최신 limit 개 반환
+    return alert_cache.query(
+        limit,
+        alert_severity=severity,
+        src_ip=src_ip or None,
+        dest_ip=dest_ip or None,
+        alert_signature=signature or None
+    )
+
+def _subscribe_stream(
+    event_type: Optional[str],
+    severity: Optional[int],
+    src_ip: Optional[str],
+    dest_ip: Optional[str],
+    signature: Optional[str]
+) -> StreamSubscriber:
+    stream_filter = StreamFilter(
+        event_type=None if event_type in (None, "", "all") else event_type,
+        severity=severity,
+        src_ip=src_ip or None,
+        dest_ip=dest_ip or None,
+        signature=signature or None
+    )
+    try:
+        return alert_broadcaster.subscribe(stream_filter)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+@app.get("/alerts/stream")
+async def stream_alerts(
+    event_type: Optional[str] = "alert",
+    severity: Optional[int] = None,
+    src_ip: Optional[str] = None,
+    dest_ip: Optional[str] = None,
+    signature: Optional[str] = None
+):
+    """새 alert 를 Server-Sent Events 로 전송 (event_type=all 이면 모든 이벤트)"""
+    subscriber = _subscribe_stream(event_type, severity, src_ip, dest_ip, signature)
     
-    # 필터링
-    if severity is not None:
-        alerts = [a for a in alerts if a.alert_severity == severity]
-    if src_ip:
-        alerts = [a for a in alerts if a.src_ip == src_ip]
-    if dest_ip:
-        alerts = [a for a in alerts if a.dest_ip == dest_ip]
+    async def event_stream():
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                messages = await subscriber.next_batch(settings.ALERT_STREAM_HEARTBEAT)
+                if messages is None:
+                    if subscriber.dropped:
+                        yield b"event: dropped\ndata: slow consumer\n\n"
+                    break
+                if not messages:
+                    yield b": keepalive\n\n"
+                    continue
+                yield b"".join(b"data: " + message + b"\n\n" for message in messages)
+        finally:
+            alert_broadcaster.unsubscribe(subscriber)
     
-    return alerts
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-@app.post("/rules/add")
-async def add_rule(rule: RuleUpdate):
-    rule_path = Path(f"{settings.SURICATA_RULES_PATH}/{rule.rule_file}")
-    
+@app.websocket("/alerts/ws")
+async def alerts_websocket(
+    websocket: WebSocket,
+    event_type: Optional[str] = "alert",
+    severity: Optional[int] = None,
+    src_ip: Optional[str] = None,
+    dest_ip: Optional[str] = None,
+    signature: Optional[str] = None
+):
+    """새 alert 를 WebSocket 텍스트 메시지(EVE JSON)로 전송"""
     try:
-        with open(rule_path, "a") as f:
-            f.write(f"\n{rule.rule_content}\n")
-        
-        success = await SuricataManager.reload_rules()
-        
-        if success:
-            return {"message": "Rule added and reloaded successfully"}
-        else:
-            return {"message": "Rule added but reload failed"}
+        subscriber = _subscribe_stream(event_type, severity, src_ip, dest_ip, signature)
+    except HTTPException as e:
+        await websocket.close(code=1013, reason=e.detail)
+        return
+    await websocket.accept()
+    
+    # 클라이언트가 보내는 메시지는 무시하고 연결 종료만 감지
+    async def wait_disconnect():
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
     
+    disconnect_task = asyncio.create_task(wait_disconnect())
+    try:
+        while not disconnect_task.done():
+            next_task = asyncio.ensure_future(subscriber.next_batch(settings.ALERT_STREAM_HEARTBEAT))
+            await asyncio.wait({next_task, disconnect_task}, return_when=asyncio.FIRST_COMPLETED)
+            if not next_task.done():
+                next_task.cancel()
+                break
+            messages = next_task.result()
+            if messages is None:
+                await websocket.close(code=1013, reason="slow consumer" if subscriber.dropped else "server shutdown")
+                break
+            for message in messages:
+                await websocket.send_text(message.decode("utf-8", "replace"))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        disconnect_task.cancel()
+        alert_broadcaster.unsubscribe(subscriber)
+
+@app.get("/alerts/stream/status")
+async def get_stream_status():
+    return alert_broadcaster.status()
+
+def _event_query(
+    start: Optional[datetime],
+    end: Optional[datetime],
+    event_type: Optional[str],
+    severity: Optional[int],
+    src_ip: Optional[str],
+    dest_ip: Optional[str],
+    signature: Optional[str],
+    sensor: Optional[str],
+    order: str,
+    include_raw: bool
+) -> EventQuery:
+    if order not in ("desc", "asc"):
+        raise HTTPException(status_code=400, detail="order 는 desc 또는 asc")
+    event_types = None
+    if event_type and event_type != "all":
+        event_types = [t.strip() for t in event_type.split(",") if t.strip()]
+    try:
+        return EventQuery(
+            start=start,
+            end=end,
+            event_types=event_types,
+            severity=severity,
+            src_ip=src_ip or None,
+            dest_ip=dest_ip or None,
+            signature=signature or None,
+            sensor=sensor or None,
+            descending=order == "desc",
+            include_raw=include_raw
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def _run_event_query(coro):
+    try:
+        return await coro
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ConnectionError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=502, detail=f"ClickHouse 조회 실패: {e}")
+
+@app.get("/events", response_model=EventPage)
+async def search_events(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    event_type: Optional[str] = "alert",
+    severity: Optional[int] = None,
+    src_ip: Optional[str] = None,
+    dest_ip: Optional[str] = None,
+    signature: Optional[str] = None,
+    sensor: Optional[str] = None,
+    order: str = "desc",
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    include_raw: bool = False
+):
+    """ClickHouse 이력 조회 (다음 페이지는 응답의 next_cursor 로 요청)"""
+    if not 1 <= limit <= settings.EVENT_QUERY_MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit 는 1~{settings.EVENT_QUERY_MAX_LIMIT}")
+    query = _event_query(start, end, event_type, severity, src_ip, dest_ip, signature, sensor, order, include_raw)
+    records, next_cursor = await _run_event_query(query.fetch_page(cursor, limit))
+    return EventPage(items=records, next_cursor=next_cursor)
+
+@app.get("/events/stream")
+async def stream_events(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    event_type: Optional[str] = "alert",
+    severity: Optional[int] = None,
+    src_ip: Optional[str] = None,
+    dest_ip: Optional[str] = None,
+    signature: Optional[str] = None,
+    sensor: Optional[str] = None,
+    order: str = "desc",
+    max_rows: int = 0,
+    cursor: Optional[str] = None,
+    include_raw: bool = False
+):
+    """ClickHouse 이력 조회 결과 전체를 NDJSON 으로 스트리밍 (max_rows=0 이면 끝까지)"""
+    if max_rows < 0:
+        raise HTTPException(status_code=400, detail="max_rows 는 0 이상")
+    query = _event_query(start, end, event_type, severity, src_ip, dest_ip, signature, sensor, order, include_raw)
+    rows = await _run_event_query(query.open_stream(cursor, max_rows))
+    
+    async def ndjson():
+        try:
+            async for record in rows:
+                record["timestamp"] = record["timestamp"].isoformat()
+                yield json.dumps(record, ensure_ascii=False).encode() + b"\n"
+        except Exception as e:
+            # 응답이 이미 시작되었으므로 마지막 줄에 오류를 남김
+            yield json.dumps({"error": f"ClickHouse 조회 실패: {e}"}, ensure_ascii=False).encode() + b"\n"
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+def _check_stats_params(hours: int, limit: int = 10):
+    if not 1 <= hours <= settings.STATS_MAX_HOURS:
+        raise HTTPException(status_code=400, detail=f"hours 는 1~{settings.STATS_MAX_HOURS}")
+    if not 1 <= limit <= 1000:
+        raise HTTPException(status_code=400, detail="limit 는 1~1000")
+
+@app.get("/alerts/stats", response_model=AlertStats)
+async def get_alert_stats(hours: int = 24, top: int = 10):
+    """최근 hours 시간 alert 통계 (심각도별, 시간대별, 상위 시그니처/출발지 IP)"""
+    _check_stats_params(hours, top)
+    return await _run_event_query(EventStats.alert_summary(hours, top))
+
+@app.get("/stats/event-types", response_model=List[EventTypeCount])
+async def get_event_type_stats(hours: int = 24):
+    _check_stats_params(hours)
+    return await _run_event_query(EventStats.event_type_counts(hours))
+
+@app.get("/stats/alerts/hourly", response_model=List[HourlyCount])
+async def get_hourly_alert_stats(hours: int = 24):
+    _check_stats_params(hours)
+    return await _run_event_query(EventStats.alerts_hourly(hours))
+
+@app.get("/stats/top-signatures", response_model=List[SignatureStat])
+async def get_top_signatures(hours: int = 24, limit: int = 10):
+    _check_stats_params(hours, limit)
+    return await _run_event_query(EventStats.top_signatures(hours, limit))
+
+@app.get("/stats/top-src-ips", response_model=List[SourceIpStat])
+async def get_top_src_ips(hours: int = 24, limit: int = 10):
+    _check_stats_params(hours, limit)
+    return await _run_event_query(EventStats.top_src_ips(hours, limit))
+
+@app.get("/stats/http-methods", response_model=List[HttpMethodCount])
+async def get_http_method_stats(hours: int = 24):
+    _check_stats_params(hours)
+    return await _run_event_query(EventStats.http_methods(hours))
+
+@app.get("/stats/capture", response_model=List[CaptureStat])
+async def get_capture_stats(
+    hours: int = 1,
+    interval: int = 60,
+    sensor: str = "",
+    iface: Optional[str] = None
+):
+    """Suricata stats 이벤트 기준 구간(interval 초)별 패킷/드롭 수, 드롭률, pps, bps
+
+    iface 를 지정하지 않으면 전체 합계(iface '')와 인터페이스별 행을 모두 반환
+    """
+    _check_stats_params(hours)
+    return await _run_event_query(SensorMetrics.capture(hours, interval, sensor, iface))
+
+@app.get("/stats/metrics", response_model=List[str])
+async def get_metric_names(hours: int = 24, sensor: str = ""):
+    _check_stats_params(hours)
+    return await _run_event_query(SensorMetrics.metric_names(hours, sensor))
+
+@app.get("/stats/metrics/{metric}", response_model=List[MetricPoint])
+async def get_metric_series(
+    metric: str,
+    hours: int = 1,
+    interval: int = 60,
+    sensor: str = "",
+    iface: Optional[str] = None
+):
+    """카운터 1개(예: capture.kernel_drops, tcp.memuse)의 구간별 증가량과 마지막 값"""
+    _check_stats_params(hours)
+    return await _run_event_query(SensorMetrics.metric(metric, hours, interval, sensor, iface))
+
+@app.get("/stats/cache")
+async def get_stats_cache_status():
+    return stats_cache.status()
+
+def _rule_info(file: str, rule) -> RuleInfo:
+    return RuleInfo(
+        sid=rule.sid, gid=rule.gid, rev=rule.rev, msg=rule.msg, action=rule.action,
+        enabled=rule.enabled, file=file, rule=rule.text
+    )
+
+async def _apply_rules(batch: RuleBatch, wait: bool) -> RuleBatchResult:
+    """규칙 변경 적용 후 리로드 요청 (RULES_RELOAD_DEBOUNCE 안의 요청은 리로드 1번으로 합침)"""
+    try:
+        changes = await rule_store.apply(batch)
+    except RuleChangeError as e:
+        # 하나라도 오류가 있으면 아무것도 쓰지 않음
+        raise HTTPException(status_code=400, detail=[error.model_dump() for error in e.errors])
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=f"규칙 파일 쓰기 실패: {e}")
+    
+    reload = None
+    if changes.files:
+        if wait:
+            reload = await suricata_manager.request_reload()
+        else:
+            suricata_manager.schedule_reload()
+    return RuleBatchResult(
+        added=changes.added, updated=changes.updated, deleted=changes.deleted,
+        files=changes.files, reload=reload
+    )
+
+@app.get("/rules", response_model=List[RuleInfo])
+async def list_rules(file: Optional[str] = None, offset: int = 0, limit: int = 1000):
+    rules = await rule_store.list(file)
+    return [_rule_info(name, rule) for name, rule in rules[offset:offset + limit]]
+
+@app.get("/rules/{sid}", response_model=RuleInfo)
+async def get_rule(sid: int):
+    found = await rule_store.get(sid)
+    if found is None:
+        raise HTTPException(status_code=404, detail=f"sid {sid} 규칙이 없습니다")
+    return _rule_info(*found)
+
+@app.post("/rules/batch", response_model=RuleBatchResult)
+async def apply_rule_batch(batch: RuleBatch, wait: bool = True):
+    return await _apply_rules(batch, wait)
+
+@app.delete("/rules/{sid}", response_model=RuleBatchResult)
+async def delete_rule(sid: int, wait: bool = True):
+    return await _apply_rules(RuleBatch(delete=[sid]), wait)
+
+@app.post("/rules/add")
+async def add_rule(rule: RuleUpdate, wait: bool = True):
+    result = await _apply_rules(RuleBatch(add=[rule]), wait)
+    reload = result.reload
+    if reload is None:
+        return {"message": "Rule added, reload scheduled", "reload": None}
+    if reload.success:
+        return {"message": "Rule added and reloaded successfully", "reload": reload}
+    else:
+        return {"message": "Rule added but reload failed", "reload": reload}
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
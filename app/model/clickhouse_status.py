@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+from datetime import datetime
+
+class ClickHouseStatus(BaseModel):
+    state: str
+    last_ok_at: Optional[datetime]
+    last_error: Optional[str]
+    last_error_at: Optional[datetime]
+    consecutive_failures: int
+    reconnects: int
+    next_retry_in: Optional[float]
+    pool_size: int
+    pool_idle: int
+    schema_ready: bool
+    rollups_ready: bool
+    schema_version: int
+    schema_drift: Dict[str, List[str]]
+    buffered_events: int
+    pending_batches: int
+    inflight_inserts: int
+    dropped_events: int
+    spill_bytes: int
\ No newline at end of file
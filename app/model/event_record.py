@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+
+class EventRecord(BaseModel):
+    timestamp: datetime
+    event_type: str
+    src_ip: str
+    src_port: Optional[int]
+    dest_ip: str
+    dest_port: Optional[int]
+    proto: str
+    alert_signature: Optional[str]
+    alert_category: Optional[str]
+    alert_severity: Optional[int]
+    alert_action: Optional[str]
+    sensor: str = ""
+    source: str = ""
+    raw_json: Optional[str] = None
+
+class EventPage(BaseModel):
+    items: List[EventRecord]
+    next_cursor: Optional[str]
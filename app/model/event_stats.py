@@ -0,0 +1,33 @@
+from pydantic import BaseModel
+from typing import Dict, List
+from datetime import datetime
+
+class EventTypeCount(BaseModel):
+    event_type: str
+    count: int
+
+class HourlyCount(BaseModel):
+    hour: datetime
+    count: int
+
+class SignatureStat(BaseModel):
+    signature: str
+    count: int
+    last_seen: datetime
+
+class SourceIpStat(BaseModel):
+    src_ip: str
+    count: int
+    alert_count: int
+
+class HttpMethodCount(BaseModel):
+    method: str
+    count: int
+
+class AlertStats(BaseModel):
+    hours: int
+    total_alerts: int
+    by_severity: Dict[str, int]
+    hourly: List[HourlyCount]
+    top_signatures: List[SignatureStat]
+    top_src_ips: List[SourceIpStat]
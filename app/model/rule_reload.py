@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+
+class RuleReload(BaseModel):
+    success: bool
+    method: str  # socket (완료까지 확인) / signal (SIGUSR2 전송만, 완료 여부 모름)
+    message: Optional[str]
+    started_at: datetime
+    duration_ms: float
+    rules_loaded: Optional[int] = None  # 리로드 후 ruleset-stats (socket 일 때만)
+    rules_failed: Optional[int] = None
+    requests: int = 1  # 이 리로드로 합쳐진 규칙 변경 요청 수
@@ -1,5 +1,36 @@
 from pydantic import BaseModel
+from typing import List, Optional
+
+from app.model.rule_reload import RuleReload
 
 class RuleUpdate(BaseModel):
     rule_content: str
-    rule_file: str = "local.rules"
\ No newline at end of file
+    rule_file: str = "local.rules"
+
+class RuleBatch(BaseModel):
+    add: List[RuleUpdate] = []
+    update: List[str] = []  # 같은 sid 의 기존 규칙을 교체 (파일은 그대로)
+    delete: List[int] = []  # sid
+
+class RuleInfo(BaseModel):
+    sid: int
+    gid: int
+    rev: int
+    msg: str
+    action: str
+    enabled: bool
+    file: str
+    rule: str
+
+class RuleError(BaseModel):
+    op: str  # add / update / delete
+    index: int  # 요청 목록 안의 위치
+    sid: Optional[int] = None
+    error: str
+
+class RuleBatchResult(BaseModel):
+    added: int
+    updated: int
+    deleted: int
+    files: List[str]  # 다시 쓴 파일
+    reload: Optional[RuleReload] = None  # wait=false 이거나 변경이 없으면 null
@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from datetime import datetime
+
+class CaptureStat(BaseModel):
+    time: datetime
+    sensor: str
+    iface: str  # '' 는 전체 합계
+    packets: int
+    drops: int
+    decoded_packets: int
+    bytes: int
+    drop_rate: float
+    pps: float
+    bps: float
+
+class MetricPoint(BaseModel):
+    time: datetime
+    sensor: str
+    iface: str
+    delta: int
+    value: int
@@ -1,7 +1,14 @@
 from pydantic import BaseModel
 from typing import Optional
+from datetime import datetime
+
+from app.model.rule_reload import RuleReload
 
 class SuricataStatus(BaseModel):
     is_running: bool
     pid: Optional[int]
-    uptime: Optional[str]
\ No newline at end of file
+    uptime: Optional[str]
+    started_at: Optional[datetime] = None
+    checked_at: Optional[datetime] = None  # 상태를 마지막으로 확인한 시각 (캐시)
+    command_socket: bool = False  # unix command socket 연결 여부
+    last_reload: Optional[RuleReload] = None
@@ -0,0 +1,223 @@
+import json
+import base64
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.util.clickhouse_client import clickhouse_client
+from app.util.clickhouse_schema import cidr_range, display_ip, ip_param
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# 같은 (timestamp, src_ip, dest_ip) 행을 구분하는 해시
+# (raw_json 을 저장하지 않는 경우에도 구분되도록 타입/포트/flow/시그니처/센서를 함께 넣는다)
+# 완전히 같은 행(스필 재전송, 이전 스키마 데이터 재복사)은 해시도 같으므로 커서의 skip 으로 구분한다
+ROW_HASH = (
+    "cityHash64(raw_json, event_type, src_port, dest_port, proto, ifNull(flow_id, 0), "
+    "ifNull(alert_signature, ''), sensor, source)"
+)
+
+CursorKey = Tuple[int, str, str, int]
+
+# 조회 결과 컬럼 (ts_us/row_hash 는 keyset 커서용)
+RESULT_COLUMNS = (
+    "event_type", "src_ip", "src_port", "dest_ip", "dest_port", "proto",
+    "alert_signature", "alert_category", "alert_severity", "alert_action",
+    "sensor", "source",
+)
+
+
+def _to_micros(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - _EPOCH) // timedelta(microseconds=1)
+
+
+def encode_cursor(key: CursorKey, skip: int) -> str:
+    """마지막 행의 키 + 이미 돌려준 같은 키의 행 수"""
+    raw = json.dumps([*key, skip], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[CursorKey, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        # skip 이 없는 이전 형식의 커서도 받는다
+        ts_us, src_ip, dest_ip, row_hash, skip = values if len(values) == 5 else [*values, 0]
+        if not (isinstance(ts_us, int) and isinstance(src_ip, str) and isinstance(dest_ip, str)
+                and isinstance(row_hash, int) and isinstance(skip, int) and skip >= 0):
+            raise ValueError
+        return (ts_us, src_ip, dest_ip, row_hash), skip
+    except Exception:
+        raise ValueError("잘못된 cursor")
+
+
+class EventQuery:
+    """ClickHouse events view 이력 조회 (keyset 페이지네이션)
+
+    timestamp 범위로 읽고, 다음 페이지는 OFFSET 대신 마지막 행의
+    (timestamp, src_ip, dest_ip, ROW_HASH) 부터 읽는다. 키가 같은 행이 여러 개면
+    커서의 skip(이미 돌려준 같은 키 행 수)만큼 건너뛴다.
+    event_type 조건은 view 를 통해 해당 타입 테이블만 읽게 한다.
+    """
+
+    def __init__(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        event_types: Optional[List[str]] = None,
+        severity: Optional[int] = None,
+        src_ip: Optional[str] = None,
+        dest_ip: Optional[str] = None,
+        signature: Optional[str] = None,
+        sensor: Optional[str] = None,
+        descending: bool = True,
+        include_raw: bool = False
+    ):
+        end = end or datetime.now(timezone.utc)
+        start = start or end - timedelta(hours=settings.EVENT_QUERY_DEFAULT_HOURS)
+        if start >= end:
+            raise ValueError("start 는 end 보다 앞이어야 합니다")
+        self.start_us = _to_micros(start)
+        self.end_us = _to_micros(end)
+        self.descending = descending
+        self.include_raw = include_raw
+
+        conditions = [
+            "timestamp >= fromUnixTimestamp64Micro({start_us:Int64})",
+            "timestamp < fromUnixTimestamp64Micro({end_us:Int64})",
+            # date 는 로컬 날짜라 UTC 기준 범위에서 하루씩 여유를 둠 (파티션 pruning 용)
+            "date >= toDate(fromUnixTimestamp64Micro({start_us:Int64})) - 1",
+            "date <= toDate(fromUnixTimestamp64Micro({end_us:Int64})) + 1",
+        ]
+        parameters: Dict[str, Any] = {"start_us": self.start_us, "end_us": self.end_us}
+
+        if event_types:
+            if len(event_types) == 1:
+                conditions.insert(0, "event_type = {event_type:String}")
+                parameters["event_type"] = event_types[0]
+            else:
+                conditions.insert(0, "event_type IN {event_types:Array(String)}")
+                parameters["event_types"] = list(event_types)
+        if severity is not None:
+            conditions.append("alert_severity = {severity:UInt8}")
+            parameters["severity"] = severity
+        if signature:
+            conditions.append("alert_signature = {signature:String}")
+            parameters["signature"] = signature
+        if sensor:
+            conditions.append("sensor = {sensor:String}")
+            parameters["sensor"] = sensor
+        for column, value in (("src_ip", src_ip), ("dest_ip", dest_ip)):
+            if value:
+                condition, bound = self._ip_condition(column, value)
+                conditions.append(condition)
+                parameters.update(bound)
+
+        self.conditions = conditions
+        self.parameters = parameters
+
+    @staticmethod
+    def _ip_condition(column: str, value: str) -> Tuple[str, Dict[str, str]]:
+        """단일 IP 는 동등 비교, CIDR 은 IPv6 주소 범위(BETWEEN) 비교"""
+        try:
+            if "/" in value:
+                first, last = cidr_range(value)
+                return (
+                    f"{column} BETWEEN {{{column}_first:IPv6}} AND {{{column}_last:IPv6}}",
+                    {f"{column}_first": first, f"{column}_last": last},
+                )
+            return f"{column} = {{{column}:IPv6}}", {column: ip_param(value)}
+        except ValueError:
+            raise ValueError(f"잘못된 IP/CIDR: {value}")
+
+    def build_sql(self, cursor: Optional[str], limit: int) -> Tuple[str, Dict[str, Any]]:
+        conditions = list(self.conditions)
+        parameters = dict(self.parameters, limit=limit)
+        direction = "DESC" if self.descending else "ASC"
+
+        skip = 0
+        if cursor:
+            (ts_us, src_ip, dest_ip, row_hash), skip = decode_cursor(cursor)
+            op = "<=" if self.descending else ">="
+            # timestamp 단독 조건을 함께 두어 primary key 범위로 좁혀지도록 함
+            conditions.append(
+                f"timestamp {op} fromUnixTimestamp64Micro({{cursor_ts:Int64}})"
+            )
+            # 커서 키와 같은 행부터 (정렬상 맨 앞에 오므로 OFFSET skip 으로 이미 돌려준 것만 건너뜀)
+            conditions.append(
+                f"(timestamp, src_ip, dest_ip, row_hash) {op} "
+                "(fromUnixTimestamp64Micro({cursor_ts:Int64}), {cursor_src:IPv6}, "
+                "{cursor_dst:IPv6}, {cursor_hash:UInt64})"
+            )
+            parameters.update(
+                cursor_ts=ts_us, cursor_src=src_ip, cursor_dst=dest_ip, cursor_hash=row_hash, skip=skip
+            )
+
+        columns = ", ".join(RESULT_COLUMNS)
+        raw_column = ", raw_json" if self.include_raw else ""
+        sql = f"""
+        SELECT
+            toUnixTimestamp64Micro(timestamp) AS ts_us,
+            {ROW_HASH} AS row_hash,
+            {columns}{raw_column}
+        FROM {settings.CLICKHOUSE_DATABASE}.{settings.CLICKHOUSE_TABLE}
+        WHERE {" AND ".join(conditions)}
+        ORDER BY timestamp {direction}, src_ip {direction}, dest_ip {direction}, row_hash {direction}
+        LIMIT {{limit:UInt32}}{" OFFSET {skip:UInt32}" if skip else ""}
+        """
+        return sql, parameters
+
+    async def fetch_page(self, cursor: Optional[str], limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """한 페이지 조회. 다음 페이지가 없으면 next_cursor 는 None"""
+        sql, parameters = self.build_sql(cursor, limit)
+        result = await clickhouse_client.run_query(sql, parameters)
+
+        records = []
+        last_key = None
+        # 마지막 키와 같은 키로 돌려준 행 수 (커서 키와 같으면 이전 페이지까지의 수부터)
+        skip = 0
+        if cursor:
+            cursor_key, skip = decode_cursor(cursor)
+            last_key = cursor_key
+        for row in result.result_rows:
+            ts_us, row_hash = row[0], row[1]
+            record = dict(zip(RESULT_COLUMNS, row[2:]))
+            record["timestamp"] = _EPOCH + timedelta(microseconds=ts_us)
+            # raw_json 을 저장하지 않는 설정이면 빈 문자열
+            record["raw_json"] = (row[-1] or None) if self.include_raw else None
+            # 커서에는 IPv6 원래 값, 응답에는 표시용 문자열
+            key = (ts_us, str(record["src_ip"]), str(record["dest_ip"]), row_hash)
+            skip = skip + 1 if key == last_key else 1
+            last_key = key
+            record["src_ip"] = display_ip(record["src_ip"])
+            record["dest_ip"] = display_ip(record["dest_ip"])
+            records.append(record)
+
+        next_cursor = encode_cursor(last_key, skip) if records and len(records) >= limit else None
+        return records, next_cursor
+
+    async def open_stream(self, cursor: Optional[str] = None, max_rows: int = 0) -> AsyncIterator[Dict[str, Any]]:
+        """조건에 맞는 전체 행을 keyset 페이지 단위로 이어서 읽는 iterator
+
+        첫 페이지는 여기서 미리 읽어 연결/쿼리 오류가 응답 시작 전에 드러나게 한다.
+        페이지마다 짧은 쿼리를 실행하므로 느린 클라이언트가 풀 연결을 오래 잡지 않는다.
+        max_rows 가 0 이면 끝까지.
+        """
+        page_size = settings.EVENT_QUERY_STREAM_PAGE_SIZE
+        records, cursor = await self.fetch_page(cursor, min(page_size, max_rows) if max_rows else page_size)
+
+        async def rows():
+            nonlocal records, cursor
+            sent = 0
+            while True:
+                for record in records:
+                    yield record
+                sent += len(records)
+                if cursor is None or (max_rows and sent >= max_rows):
+                    return
+                size = min(page_size, max_rows - sent) if max_rows else page_size
+                records, cursor = await self.fetch_page(cursor, size)
+
+        return rows()
@@ -0,0 +1,208 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from app.core.config import settings
+from app.util.clickhouse_client import clickhouse_client
+from app.util.query_cache import QueryCache
+from app.util.clickhouse_rollups import rollup_table
+from app.util.clickhouse_schema import display_ip
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+TABLE = f"{settings.CLICKHOUSE_DATABASE}.{settings.CLICKHOUSE_TABLE}"
+
+# 최근 N시간 조건 (date 는 로컬 날짜라 하루 여유를 두고 파티션 pruning)
+WINDOW = """
+    timestamp >= now() - INTERVAL {hours:UInt32} HOUR
+    AND date >= toDate(now() - INTERVAL {hours:UInt32} HOUR) - 1
+"""
+
+# rollup 테이블 조건 (분/시간 단위로 잘린 시작 시각부터)
+MINUTE_WINDOW = "minute >= toStartOfMinute(now() - INTERVAL {hours:UInt32} HOUR)"
+HOUR_WINDOW = "hour >= toStartOfHour(now() - INTERVAL {hours:UInt32} HOUR)"
+
+stats_cache = QueryCache(settings.STATS_CACHE_MAX_ENTRIES)
+
+
+def cache_ttl(hours: int) -> float:
+    """조회 범위에 비례하는 캐시 TTL (1시간 범위 -> 5초, 최대 STATS_CACHE_MAX_TTL)"""
+    ttl = hours * 3600 / settings.STATS_CACHE_TTL_DIVISOR
+    return max(settings.STATS_CACHE_MIN_TTL, min(settings.STATS_CACHE_MAX_TTL, ttl))
+
+
+def _from_epoch(seconds: int) -> datetime:
+    return _EPOCH + timedelta(seconds=seconds)
+
+
+def _severity_key(value) -> str:
+    # rollup 은 심각도 없음을 0 으로 저장
+    return str(value) if value else "unknown"
+
+
+class EventStats:
+    """query_clickhouse.py 의 집계 쿼리를 API 용으로 제공 (결과 캐시 + 동일 요청 합치기)
+
+    rollup 테이블이 준비되어 있으면 사전 집계된 분/시간 단위 행을 합산하고,
+    아니면 원본 events 테이블을 집계한다. 시간 단위 rollup 은 시작 시각이
+    정시로 내림되므로 최대 1시간 가까이 더 넓은 범위가 포함될 수 있다.
+    """
+
+    @staticmethod
+    async def _cached(name: str, hours: int, limit: int, raw_sql: str, rollup_sql: str, convert) -> Any:
+        use_rollup = clickhouse_client.rollups_ready
+        sql = rollup_sql if use_rollup else raw_sql
+
+        async def compute():
+            parameters = {"hours": hours, "limit": limit} if limit else {"hours": hours}
+            result = await clickhouse_client.run_query(sql, parameters)
+            return convert(result.result_rows)
+        return await stats_cache.get_or_compute((name, hours, limit, use_rollup), cache_ttl(hours), compute)
+
+    @staticmethod
+    async def event_type_counts(hours: int) -> List[Dict[str, Any]]:
+        sql = f"""
+        SELECT event_type, count() AS cnt
+        FROM {TABLE}
+        WHERE {WINDOW}
+        GROUP BY event_type
+        ORDER BY cnt DESC
+        """
+        rollup_sql = f"""
+        SELECT event_type, sum(count) AS cnt
+        FROM {rollup_table("events_by_type_1m")}
+        WHERE {MINUTE_WINDOW}
+        GROUP BY event_type
+        ORDER BY cnt DESC
+        """
+        return await EventStats._cached(
+            "event_types", hours, 0, sql, rollup_sql,
+            lambda rows: [{"event_type": r[0], "count": r[1]} for r in rows]
+        )
+
+    @staticmethod
+    async def alerts_hourly(hours: int) -> List[Dict[str, Any]]:
+        sql = f"""
+        SELECT toUnixTimestamp(toStartOfHour(timestamp)) AS hour, count() AS cnt
+        FROM {TABLE}
+        WHERE event_type = 'alert' AND {WINDOW}
+        GROUP BY hour
+        ORDER BY hour DESC
+        """
+        rollup_sql = f"""
+        SELECT toUnixTimestamp(toStartOfHour(minute)) AS hour, sum(count) AS cnt
+        FROM {rollup_table("events_by_type_1m")}
+        WHERE event_type = 'alert' AND {MINUTE_WINDOW}
+        GROUP BY hour
+        ORDER BY hour DESC
+        """
+        return await EventStats._cached(
+            "alerts_hourly", hours, 0, sql, rollup_sql,
+            lambda rows: [{"hour": _from_epoch(r[0]), "count": r[1]} for r in rows]
+        )
+
+    @staticmethod
+    async def alerts_by_severity(hours: int) -> Dict[str, int]:
+        sql = f"""
+        SELECT alert_severity, count() AS cnt
+        FROM {TABLE}
+        WHERE event_type = 'alert' AND {WINDOW}
+        GROUP BY alert_severity
+        ORDER BY alert_severity
+        """
+        rollup_sql = f"""
+        SELECT alert_severity, sum(count) AS cnt
+        FROM {rollup_table("alerts_by_severity_1m")}
+        WHERE {MINUTE_WINDOW}
+        GROUP BY alert_severity
+        ORDER BY alert_severity
+        """
+        return await EventStats._cached(
+            "alerts_by_severity", hours, 0, sql, rollup_sql,
+            lambda rows: {_severity_key(r[0]): r[1] for r in rows}
+        )
+
+    @staticmethod
+    async def top_signatures(hours: int, limit: int) -> List[Dict[str, Any]]:
+        sql = f"""
+        SELECT alert_signature, count() AS cnt, toUnixTimestamp(max(timestamp)) AS last_seen
+        FROM {TABLE}
+        WHERE event_type = 'alert' AND alert_signature IS NOT NULL AND {WINDOW}
+        GROUP BY alert_signature
+        ORDER BY cnt DESC
+        LIMIT {{limit:UInt32}}
+        """
+        rollup_sql = f"""
+        SELECT alert_signature, sum(count) AS cnt, toUnixTimestamp(max(last_seen)) AS last_seen
+        FROM {rollup_table("alert_signatures_1h")}
+        WHERE {HOUR_WINDOW}
+        GROUP BY alert_signature
+        ORDER BY cnt DESC
+        LIMIT {{limit:UInt32}}
+        """
+        return await EventStats._cached(
+            "top_signatures", hours, limit, sql, rollup_sql,
+            lambda rows: [{"signature": r[0], "count": r[1], "last_seen": _from_epoch(r[2])} for r in rows]
+        )
+
+    @staticmethod
+    async def top_src_ips(hours: int, limit: int) -> List[Dict[str, Any]]:
+        sql = f"""
+        SELECT src_ip, count() AS cnt, countIf(event_type = 'alert') AS alert_cnt
+        FROM {TABLE}
+        WHERE src_ip != toIPv6('::ffff:0.0.0.0') AND {WINDOW}
+        GROUP BY src_ip
+        ORDER BY cnt DESC
+        LIMIT {{limit:UInt32}}
+        """
+        rollup_sql = f"""
+        SELECT src_ip, sum(count) AS cnt, sum(alert_count) AS alert_cnt
+        FROM {rollup_table("src_ips_1h")}
+        WHERE {HOUR_WINDOW}
+        GROUP BY src_ip
+        ORDER BY cnt DESC
+        LIMIT {{limit:UInt32}}
+        """
+        return await EventStats._cached(
+            "top_src_ips", hours, limit, sql, rollup_sql,
+            lambda rows: [{"src_ip": display_ip(r[0]), "count": r[1], "alert_count": r[2]} for r in rows]
+        )
+
+    @staticmethod
+    async def http_methods(hours: int) -> List[Dict[str, Any]]:
+        sql = f"""
+        SELECT http_http_method AS method, count() AS cnt
+        FROM {TABLE}
+        WHERE event_type = 'http' AND http_http_method IS NOT NULL AND {WINDOW}
+        GROUP BY method
+        ORDER BY cnt DESC
+        """
+        rollup_sql = f"""
+        SELECT method, sum(count) AS cnt
+        FROM {rollup_table("http_methods_1h")}
+        WHERE {HOUR_WINDOW}
+        GROUP BY method
+        ORDER BY cnt DESC
+        """
+        return await EventStats._cached(
+            "http_methods", hours, 0, sql, rollup_sql,
+            lambda rows: [{"method": r[0], "count": r[1]} for r in rows]
+        )
+
+    @staticmethod
+    async def alert_summary(hours: int, top: int) -> Dict[str, Any]:
+        """/alerts/stats 응답 (각 집계는 개별 캐시되어 다른 엔드포인트와 공유)"""
+        by_severity, hourly, signatures, src_ips = await asyncio.gather(
+            EventStats.alerts_by_severity(hours),
+            EventStats.alerts_hourly(hours),
+            EventStats.top_signatures(hours, top),
+            EventStats.top_src_ips(hours, top),
+        )
+        return {
+            "hours": hours,
+            "total_alerts": sum(by_severity.values()),
+            "by_severity": by_severity,
+            "hourly": hourly,
+            "top_signatures": signatures,
+            "top_src_ips": src_ips,
+        }
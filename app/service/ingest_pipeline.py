@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import queue
+import signal
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.util.checkpoint import LogPosition, ingest_checkpoint
+from app.util.clickhouse_client import clickhouse_client
+from app.util.eve_decoder import JSON_BACKEND
+from app.util.ingest_worker import ChunkResult, reader_main, worker_main
+from app.util.log_config import configure_logging
+from app.util.metrics import registry, start_metrics_server
+from app.util import ingest_metrics
+
+log = logging.getLogger(__name__)
+
+
+class IngestPipeline:
+    """멀티 프로세스 수집 파이프라인 (INGEST_MODE=process)
+
+    reader 프로세스 1개 -> 디코딩 워커 프로세스 N개 -> writer (이 프로세스)
+    - reader 는 eve 파일들을 라인 경계 블록으로 잘라 순번을 붙인다.
+    - 워커는 블록을 디코딩하여 테이블별 컬럼 배치를 만든다 (CPU 작업).
+    - writer 는 워커 결과를 순번 순서대로 다시 맞춰 clickhouse_client 의 삽입
+      대기열에 넣는다. 블록 1개가 배치 1개가 되므로 체크포인트는 파일별로
+      블록 끝 위치 단위로, 읽은 순서대로만 전진한다.
+    큐는 모두 크기 제한이 있어 ClickHouse 가 밀리면 워커와 reader 도 멈춘다.
+    워커가 비정상 종료하면 그 순번 이후로 진행할 수 없으므로 파이프라인을 멈추고,
+    재시작 시 체크포인트부터 다시 수집한다.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        # fork 는 부모의 스레드/이벤트 루프 상태를 복사하므로 spawn 사용
+        self._ctx = multiprocessing.get_context("spawn")
+        self.tasks = self._ctx.Queue(settings.INGEST_QUEUE_CHUNKS)
+        self.results = self._ctx.Queue(settings.INGEST_QUEUE_CHUNKS)
+        self.stop_event = self._ctx.Event()
+        self.reader: Optional[multiprocessing.Process] = None
+        self.worker_processes: List[multiprocessing.Process] = []
+        # 결과 큐 get 은 blocking 이므로 전용 스레드에서
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-results")
+        self._waiting: Dict[int, ChunkResult] = {}
+        self._next_seq = 0
+        self.events = 0
+        self.invalid_lines = 0
+
+    def start(self):
+        """체크포인트 위치부터 reader/워커 프로세스 시작"""
+        ingest_checkpoint.load()
+
+        for index in range(self.workers):
+            process = self._ctx.Process(
+                target=worker_main, args=(self.tasks, self.results),
+                name=f"ingest-worker-{index}", daemon=True
+            )
+            process.start()
+            self.worker_processes.append(process)
+
+        self.reader = self._ctx.Process(
+            target=reader_main,
+            args=(ingest_checkpoint.resume_positions(), self.tasks, self.stop_event),
+            name="ingest-reader", daemon=True
+        )
+        self.reader.start()
+        log.info("수집 프로세스 시작: reader 1 + 워커 %d (JSON 디코더: %s)", self.workers, JSON_BACKEND)
+
+    def _check_processes(self):
+        if self.reader.exitcode not in (None, 0):
+            raise RuntimeError(f"reader 프로세스 비정상 종료 (exitcode {self.reader.exitcode})")
+        for process in self.worker_processes:
+            if process.exitcode not in (None, 0):
+                raise RuntimeError(f"{process.name} 비정상 종료 (exitcode {process.exitcode})")
+
+    async def write_results(self):
+        """워커 결과를 순번 순서대로 삽입 대기열에 넣기 (모든 워커가 끝날 때까지)"""
+        loop = asyncio.get_running_loop()
+        finished = 0
+        while finished < len(self.worker_processes):
+            try:
+                result = await loop.run_in_executor(self._executor, self.results.get, True, 1.0)
+            except queue.Empty:
+                self._check_processes()
+                continue
+            if result is None:
+                finished += 1
+                continue
+
+            self._waiting[result.seq] = result
+            while self._next_seq in self._waiting:
+                await self._write(self._waiting.pop(self._next_seq))
+                self._next_seq += 1
+
+    async def _write(self, result: ChunkResult):
+        dev, inode = result.identity
+        await clickhouse_client.add_prepared_batch(
+            result.batch, LogPosition(result.source, dev, inode, result.end)
+        )
+        self.events += len(result.batch)
+        self.invalid_lines += result.invalid
+        ingest_metrics.lines_read.inc(result.lines)
+        ingest_metrics.bytes_read.inc(result.size)
+        ingest_metrics.events.inc_counts(result.event_types)
+        if result.invalid:
+            ingest_metrics.parse_errors.inc(result.invalid)
+        ingest_metrics.tail_positions.update(LogPosition(result.source, dev, inode, result.end))
+        if len(result.batch) > 0:
+            log.debug("%d개 이벤트 처리 완료 (Alert: %d개)", len(result.batch), result.alerts)
+
+    async def shutdown(self, timeout: float):
+        """reader 를 멈추고, 이미 읽은 블록까지 처리한 뒤 워커 종료"""
+        loop = asyncio.get_running_loop()
+        self.stop_event.set()
+        await loop.run_in_executor(None, self.reader.join, timeout)
+        if self.reader.is_alive():
+            # ClickHouse 가 밀려 큐가 가득 찬 경우 - 체크포인트 이후는 재시작 시 다시 수집
+            log.warning("reader 종료 지연 - 강제 종료")
+            self.reader.terminate()
+        for _ in self.worker_processes:
+            await loop.run_in_executor(None, self.tasks.put, None, True, timeout)
+
+    def terminate(self):
+        for process in [self.reader, *self.worker_processes]:
+            if process is not None and process.is_alive():
+                process.terminate()
+        for process in [self.reader, *self.worker_processes]:
+            if process is not None:
+                process.join(5)
+        self._executor.shutdown(wait=False)
+
+
+async def run_ingest() -> int:
+    """수집 전용 프로세스 진입점. 종료 코드 반환 (비정상 종료면 1)"""
+    configure_logging()
+    if clickhouse_client.connect():
+        clickhouse_client.ensure_database()
+    else:
+        log.warning("ClickHouse 연결 실패 - 백그라운드에서 재연결을 시도합니다")
+
+    metrics_server = None
+    if settings.INGEST_METRICS_PORT:
+        try:
+            metrics_server = await start_metrics_server(registry, "0.0.0.0", settings.INGEST_METRICS_PORT)
+            log.info("수집 지표: http://0.0.0.0:%d/metrics", settings.INGEST_METRICS_PORT)
+        except OSError as e:
+            log.error("지표 서버 시작 실패 (포트 %d): %s", settings.INGEST_METRICS_PORT, e)
+
+    background = [
+        asyncio.create_task(clickhouse_client.periodic_flush()),
+        asyncio.create_task(clickhouse_client.maintain_connection()),
+        asyncio.create_task(clickhouse_client.migrate_legacy_data()),
+    ]
+
+    pipeline = IngestPipeline(settings.INGEST_WORKERS)
+    pipeline.start()
+
+    loop = asyncio.get_running_loop()
+    stopping = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    writer = asyncio.create_task(pipeline.write_results())
+    stop_wait = asyncio.create_task(stopping.wait())
+    exit_code = 0
+    try:
+        await asyncio.wait({writer, stop_wait}, return_when=asyncio.FIRST_COMPLETED)
+        if writer.done():
+            # 종료 요청 없이 끝났으면 프로세스 오류
+            writer.result()
+        else:
+            log.info("수집 종료 중 - 읽은 블록까지 저장")
+            await pipeline.shutdown(settings.INGEST_SHUTDOWN_TIMEOUT)
+            await asyncio.wait_for(writer, settings.INGEST_SHUTDOWN_TIMEOUT)
+    except Exception as e:
+        log.error("수집 파이프라인 오류: %s", e)
+        exit_code = 1
+    finally:
+        stop_wait.cancel()
+        writer.cancel()
+        pipeline.terminate()
+        for task in background:
+            task.cancel()
+        if metrics_server is not None:
+            metrics_server.close()
+        await clickhouse_client.flush_batch()
+        clickhouse_client.disconnect()
+        log.info("수집 종료: %s개 이벤트 (디코딩 실패 %s개 라인)", f"{pipeline.events:,}", f"{pipeline.invalid_lines:,}")
+    return exit_code
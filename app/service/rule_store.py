@@ -0,0 +1,225 @@
+import os
+import asyncio
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.model.rule_update import RuleBatch, RuleError
+from app.util.suricata_rules import (
+    Entry, Rule, RuleSyntaxError, parse_rule, read_rule_file, stage_rule_file
+)
+
+
+class RuleChangeError(Exception):
+    """배치에 오류가 있어 아무 파일도 쓰지 않음"""
+
+    def __init__(self, errors: List[RuleError]):
+        super().__init__(f"규칙 변경 오류 {len(errors)}개")
+        self.errors = errors
+
+
+class RuleChanges(NamedTuple):
+    added: int
+    updated: int
+    deleted: int
+    files: List[str]
+
+
+class _RuleFile(NamedTuple):
+    entries: List[Entry]
+    mtime_ns: int
+    size: int
+
+
+def check_rule_file_name(name: str) -> Optional[str]:
+    """규칙 디렉터리 밖이나 다른 형식의 파일을 가리키면 오류 메시지"""
+    if not name or Path(name).name != name or name.startswith("."):
+        return f"잘못된 규칙 파일 이름: {name}"
+    if not name.endswith(".rules"):
+        return f"규칙 파일은 .rules 로 끝나야 함: {name}"
+    return None
+
+
+class RuleStore:
+    """SURICATA_RULES_PATH 의 *.rules 를 sid / 파일별로 색인한 규칙 저장소
+
+    - 변경은 배치 단위로 먼저 전부 검증하고 (문법, sid 중복, 없는 sid),
+      오류가 하나라도 있으면 아무 파일도 쓰지 않는다.
+    - 바뀐 파일만 임시 파일에 모두 쓴 뒤 os.replace 로 교체한다.
+    - 파일은 mtime/크기가 바뀐 경우에만 다시 읽는다 (suricata-update 등 외부 수정 반영).
+    파일 입출력은 executor 에서 하고, 변경은 lock 으로 하나씩 처리한다.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.files: Dict[str, _RuleFile] = {}
+        self.sids: Dict[int, str] = {}  # sid -> 파일 이름 (비활성 규칙 포함)
+        self.duplicates: Dict[int, List[str]] = {}  # 이미 파일에 중복으로 있는 sid
+        self._lock = asyncio.Lock()
+
+    # 읽기 ------------------------------------------------------------------
+
+    def _refresh(self):
+        """디렉터리의 규칙 파일 중 바뀐 것만 다시 읽고 색인 갱신"""
+        changed = False
+        names = set()
+        for path in self.path.glob("*.rules"):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            names.add(path.name)
+            cached = self.files.get(path.name)
+            if cached is not None and (cached.mtime_ns, cached.size) == (stat.st_mtime_ns, stat.st_size):
+                continue
+            self.files[path.name] = _RuleFile(read_rule_file(path), stat.st_mtime_ns, stat.st_size)
+            changed = True
+        for name in set(self.files) - names:
+            del self.files[name]
+            changed = True
+        if changed:
+            self._rebuild_index()
+
+    def _rebuild_index(self):
+        self.sids = {}
+        self.duplicates = {}
+        for name in sorted(self.files):
+            for entry in self.files[name].entries:
+                if isinstance(entry, str):
+                    continue
+                if entry.sid in self.sids:
+                    self.duplicates.setdefault(entry.sid, [self.sids[entry.sid]]).append(name)
+                else:
+                    self.sids[entry.sid] = name
+
+    def _list(self, file: Optional[str]) -> List[Tuple[str, Rule]]:
+        self._refresh()
+        rules = []
+        for name in sorted(self.files):
+            if file is not None and name != file:
+                continue
+            rules.extend((name, entry) for entry in self.files[name].entries if not isinstance(entry, str))
+        return rules
+
+    async def list(self, file: Optional[str] = None) -> List[Tuple[str, Rule]]:
+        """(파일 이름, 규칙) 목록"""
+        async with self._lock:
+            return await asyncio.get_running_loop().run_in_executor(None, self._list, file)
+
+    async def get(self, sid: int) -> Optional[Tuple[str, Rule]]:
+        async with self._lock:
+            await asyncio.get_running_loop().run_in_executor(None, self._refresh)
+            name = self.sids.get(sid)
+            if name is None:
+                return None
+            return name, next(
+                entry for entry in self.files[name].entries
+                if not isinstance(entry, str) and entry.sid == sid
+            )
+
+    # 변경 ------------------------------------------------------------------
+
+    def _plan(self, batch: RuleBatch) -> Tuple[Dict[str, List[Entry]], RuleChanges]:
+        """배치 검증 -> 파일별 새 항목 목록 (오류가 있으면 RuleChangeError)"""
+        errors: List[RuleError] = []
+        seen: Set[int] = set()
+        additions: Dict[str, List[Rule]] = {}
+        replacements: Dict[int, Rule] = {}
+        deletions: Set[int] = set()
+
+        def claim(op: str, index: int, sid: int, must_exist: bool) -> bool:
+            if sid in seen:
+                errors.append(RuleError(op=op, index=index, sid=sid, error="배치 안에서 sid 가 중복됨"))
+                return False
+            seen.add(sid)
+            if must_exist and sid not in self.sids:
+                errors.append(RuleError(op=op, index=index, sid=sid, error="없는 sid"))
+                return False
+            if not must_exist and sid in self.sids:
+                errors.append(RuleError(
+                    op=op, index=index, sid=sid, error=f"이미 있는 sid ({self.sids[sid]})"
+                ))
+                return False
+            return True
+
+        for index, item in enumerate(batch.add):
+            message = check_rule_file_name(item.rule_file)
+            if message is not None:
+                errors.append(RuleError(op="add", index=index, error=message))
+                continue
+            try:
+                rule = parse_rule(item.rule_content)
+            except RuleSyntaxError as e:
+                errors.append(RuleError(op="add", index=index, error=str(e)))
+                continue
+            if claim("add", index, rule.sid, must_exist=False):
+                additions.setdefault(item.rule_file, []).append(rule)
+
+        for index, text in enumerate(batch.update):
+            try:
+                rule = parse_rule(text)
+            except RuleSyntaxError as e:
+                errors.append(RuleError(op="update", index=index, error=str(e)))
+                continue
+            if claim("update", index, rule.sid, must_exist=True):
+                replacements[rule.sid] = rule
+
+        for index, sid in enumerate(batch.delete):
+            if claim("delete", index, sid, must_exist=True):
+                deletions.add(sid)
+
+        if errors:
+            raise RuleChangeError(errors)
+
+        touched = set(additions)
+        touched.update(self.sids[sid] for sid in replacements)
+        touched.update(self.sids[sid] for sid in deletions)
+
+        planned: Dict[str, List[Entry]] = {}
+        for name in sorted(touched):
+            current = self.files[name].entries if name in self.files else []
+            entries: List[Entry] = []
+            for entry in current:
+                if isinstance(entry, str) or self.sids.get(entry.sid) != name:
+                    # 다른 파일에 먼저 색인된 중복 sid 는 건드리지 않음
+                    entries.append(entry)
+                elif entry.sid in deletions:
+                    continue
+                else:
+                    entries.append(replacements.get(entry.sid, entry))
+            entries.extend(additions.get(name, ()))
+            planned[name] = entries
+
+        changes = RuleChanges(
+            sum(len(rules) for rules in additions.values()),
+            len(replacements), len(deletions), sorted(touched)
+        )
+        return planned, changes
+
+    def _apply(self, batch: RuleBatch) -> RuleChanges:
+        self._refresh()
+        planned, changes = self._plan(batch)
+
+        # 모든 파일을 임시 파일로 먼저 쓴 뒤 교체 (쓰기 실패 시 기존 파일은 그대로)
+        staged = []
+        try:
+            for name, entries in planned.items():
+                staged.append((stage_rule_file(self.path / name, entries), name))
+        except OSError:
+            for tmp_path, _ in staged:
+                tmp_path.unlink(missing_ok=True)
+            raise
+        for tmp_path, name in staged:
+            os.replace(tmp_path, self.path / name)
+            stat = os.stat(self.path / name)
+            self.files[name] = _RuleFile(planned[name], stat.st_mtime_ns, stat.st_size)
+        self._rebuild_index()
+        return changes
+
+    async def apply(self, batch: RuleBatch) -> RuleChanges:
+        """규칙 추가/교체/삭제를 한 번에 적용 (검증 실패 시 RuleChangeError, 파일은 그대로)"""
+        async with self._lock:
+            return await asyncio.get_running_loop().run_in_executor(None, self._apply, batch)
+
+
+rule_store = RuleStore(settings.SURICATA_RULES_PATH)
@@ -0,0 +1,122 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from app.service.event_stats import cache_ttl, stats_cache
+from app.util.clickhouse_client import clickhouse_client
+from app.util.stats_metrics import METRICS_TABLE
+
+TABLE = METRICS_TABLE.qualified_name
+
+# 최근 N시간 + 센서/인터페이스 조건 (빈 값이면 전체)
+WINDOW = """
+    timestamp >= now() - INTERVAL {hours:UInt32} HOUR
+    AND date >= toDate(now() - INTERVAL {hours:UInt32} HOUR) - 1
+    AND ({sensor:String} = '' OR sensor = {sensor:String})
+    AND ({iface:Nullable(String)} IS NULL OR iface = {iface:Nullable(String)})
+"""
+
+BUCKET = "toUnixTimestamp(toStartOfInterval(timestamp, INTERVAL {interval:UInt32} SECOND))"
+
+CAPTURE_METRICS = ("capture.kernel_packets", "capture.kernel_drops", "decoder.pkts", "decoder.bytes")
+
+# 한 응답의 최대 구간 수 (센서/인터페이스별)
+MAX_BUCKETS = 10000
+
+
+def _from_epoch(seconds: int) -> datetime:
+    return datetime.fromtimestamp(seconds, timezone.utc)
+
+
+def check_interval(hours: int, interval: int):
+    if not 1 <= interval <= 86400:
+        raise ValueError("interval 은 1~86400 초")
+    if hours * 3600 // interval > MAX_BUCKETS:
+        raise ValueError(f"구간이 너무 많음 (hours*3600/interval <= {MAX_BUCKETS})")
+
+
+class SensorMetrics:
+    """stats 이벤트 카운터 시계열 조회 (metrics 테이블의 delta 를 구간별로 합산)
+
+    delta 는 수집 시점에 재시작(uptime 감소)까지 고려해 계산되어 있으므로
+    구간 합계가 곧 그 구간의 증가량이다. 결과는 통계 API 와 같은 캐시를 쓴다.
+    """
+
+    @staticmethod
+    async def _cached(key: tuple, hours: int, sql: str, parameters: Dict[str, Any], convert) -> Any:
+        async def compute():
+            result = await clickhouse_client.run_query(sql, parameters)
+            return convert(result.result_rows)
+        return await stats_cache.get_or_compute(key, cache_ttl(hours), compute)
+
+    @staticmethod
+    async def capture(hours: int, interval: int, sensor: str = "", iface: Optional[str] = None) -> List[Dict[str, Any]]:
+        """구간별 캡처 패킷/드롭/바이트와 드롭률, pps, bps (iface '' 는 전체 합계)"""
+        check_interval(hours, interval)
+        packets, drops, decoded, decoded_bytes = CAPTURE_METRICS
+        sql = f"""
+        SELECT {BUCKET} AS bucket, sensor, iface,
+               sumIf(delta, metric = '{packets}') AS packets,
+               sumIf(delta, metric = '{drops}') AS drops,
+               sumIf(delta, metric = '{decoded}') AS decoded,
+               sumIf(delta, metric = '{decoded_bytes}') AS bytes
+        FROM {TABLE}
+        WHERE metric IN {CAPTURE_METRICS} AND {WINDOW}
+        GROUP BY bucket, sensor, iface
+        ORDER BY sensor, iface, bucket
+        """
+
+        def convert(rows) -> List[Dict[str, Any]]:
+            return [{
+                "time": _from_epoch(r[0]),
+                "sensor": r[1],
+                "iface": r[2],
+                "packets": r[3],
+                "drops": r[4],
+                "decoded_packets": r[5],
+                "bytes": r[6],
+                # kernel_packets 는 드롭된 패킷도 포함
+                "drop_rate": r[4] / r[3] if r[3] > 0 else 0.0,
+                "pps": r[5] / interval,
+                "bps": r[6] * 8 / interval,
+            } for r in rows]
+
+        parameters = {"hours": hours, "interval": interval, "sensor": sensor, "iface": iface}
+        return await SensorMetrics._cached(
+            ("capture", hours, interval, sensor, iface), hours, sql, parameters, convert
+        )
+
+    @staticmethod
+    async def metric(
+        name: str, hours: int, interval: int, sensor: str = "", iface: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """카운터 1개의 구간별 증가량(delta 합)과 마지막 값 (gauge 는 value 를 사용)"""
+        check_interval(hours, interval)
+        sql = f"""
+        SELECT {BUCKET} AS bucket, sensor, iface, sum(delta), argMax(value, timestamp)
+        FROM {TABLE}
+        WHERE metric = {{metric:String}} AND {WINDOW}
+        GROUP BY bucket, sensor, iface
+        ORDER BY sensor, iface, bucket
+        """
+        parameters = {"metric": name, "hours": hours, "interval": interval, "sensor": sensor, "iface": iface}
+        return await SensorMetrics._cached(
+            ("metric", name, hours, interval, sensor, iface), hours, sql, parameters,
+            lambda rows: [
+                {"time": _from_epoch(r[0]), "sensor": r[1], "iface": r[2], "delta": r[3], "value": r[4]}
+                for r in rows
+            ]
+        )
+
+    @staticmethod
+    async def metric_names(hours: int, sensor: str = "") -> List[str]:
+        """최근 hours 시간 동안 기록된 카운터 이름"""
+        sql = f"""
+        SELECT DISTINCT metric
+        FROM {TABLE}
+        WHERE {WINDOW}
+        ORDER BY metric
+        """
+        parameters = {"hours": hours, "sensor": sensor, "iface": None}
+        return await SensorMetrics._cached(
+            ("metric_names", hours, sensor), hours, sql, parameters, lambda rows: [r[0] for r in rows]
+        )
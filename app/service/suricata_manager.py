@@ -1,115 +1,366 @@
-import subprocess
-from typing import Optional
+import logging
+import os
 import time
+import asyncio
+import tempfile
+import contextlib
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from app.core.config import settings
+from app.model.rule_reload import RuleReload
+from app.util.suricata_socket import (
+    SuricataCommandError, SuricataSocketError, SuricataSocketTimeout, suricata_socket
+)
+
+log = logging.getLogger(__name__)
+
+
+class ProcessStatus(NamedTuple):
+    """마지막으로 확인한 Suricata 프로세스 상태"""
+    is_running: bool
+    pid: Optional[int]
+    started_at: Optional[datetime]
+    checked_at: Optional[datetime]
+
+
+_UNKNOWN = ProcessStatus(False, None, None, None)
+
+
+def _is_suricata(args: str) -> bool:
+    """명령행의 실행 파일 이름이 suricata 인지 (pgrep -f 처럼 경로에 포함된 것은 제외)"""
+    argv0 = args.split(None, 1)[0] if args.strip() else ""
+    return os.path.basename(argv0) == "suricata"
+
 
 class SuricataManager:
-    @staticmethod
-    def is_running() -> bool:
-        """Suricata 실행 상태 확인 (WSL에서)"""
+    """Suricata 프로세스 관리
+
+    상태는 백그라운드 watcher 가 SURICATA_STATUS_INTERVAL 마다 확인하여 캐시하고,
+    /status 등은 캐시를 그대로 반환한다 (요청마다 프로세스를 띄우지 않음).
+    - 같은 호스트(Linux/WSL 안)에서는 pidfile 과 /proc 를 직접 읽는다.
+    - SURICATA_COMMAND_PREFIX(Windows 에서 wsl)가 있으면 ps 를 비동기 subprocess 로 실행한다.
+    시작/중지/리로드 명령도 asyncio subprocess 로 실행하여 이벤트 루프를 막지 않는다.
+    리로드와 종료는 unix command socket 을 우선 사용하고 (완료까지 확인),
+    소켓을 쓸 수 없을 때만 메인 pid 에 신호를 보낸다.
+    """
+
+    def __init__(self):
+        self.prefix: List[str] = settings.SURICATA_COMMAND_PREFIX.split()
+        self.pid_file = Path(settings.SURICATA_PID_FILE)
+        self.status = _UNKNOWN
+        self._use_proc = not self.prefix and os.path.isdir("/proc")
+        self._boot_time: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self.last_reload: Optional[RuleReload] = None
+        self._reload_lock = asyncio.Lock()
+        self._reload_pending: Optional[asyncio.Future] = None
+        self._reload_task: Optional[asyncio.Task] = None
+        self._reload_requests = 0
+
+    # 캐시된 상태 ------------------------------------------------------------
+
+    @property
+    def is_running(self) -> bool:
+        return self.status.is_running
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.status.pid
+
+    def uptime(self) -> Optional[str]:
+        if self.status.started_at is None:
+            return None
+        seconds = (datetime.now(timezone.utc) - self.status.started_at).total_seconds()
+        return str(timedelta(seconds=max(0, int(seconds))))
+
+    # 프로세스 확인 ----------------------------------------------------------
+
+    def _read_pid_file(self) -> Optional[int]:
         try:
-            result = subprocess.run(
-                ["wsl", "pgrep", "-f", "suricata"],
-                capture_output=True,
-                text=True
-            )
-            return result.returncode == 0
-        except:
-            return False
-    
+            return int(self.pid_file.read_text().strip())
+        except (OSError, ValueError):
+            return None
+
     @staticmethod
-    def get_pid() -> Optional[int]:
-        """Suricata PID 가져오기 (WSL에서)"""
+    def _proc_args(pid: int) -> Optional[str]:
         try:
-            result = subprocess.run(
-                ["wsl", "pgrep", "-f", "suricata"],
-                capture_output=True,
-                text=True
-            )
-            if result.returncode == 0:
-                pids = result.stdout.strip().split('\n')
-                return int(pids[0]) if pids[0] else None
-        except:
-            pass
-        return None
-    
-    @staticmethod
-    async def start():
-        """Suricata 시작 (WSL에서)"""
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                return f.read().replace(b"\0", b" ").decode(errors="replace")
+        except OSError:
+            return None
+
+    def _proc_start_time(self, pid: int) -> Optional[float]:
+        """프로세스 시작 시각 (epoch 초, /proc/<pid>/stat 의 starttime + 부팅 시각)"""
         try:
-            # 먼저 실행 중인지 확인
-            if SuricataManager.is_running():
-                print("Suricata가 이미 실행 중입니다.")
-                return True
-            
-            # stale pidfile 삭제
-            subprocess.run(
-                ["wsl", "sudo", "rm", "-f", "/var/run/suricata.pid"],
-                capture_output=True
+            if self._boot_time is None:
+                with open("/proc/stat") as f:
+                    self._boot_time = next(
+                        float(line.split()[1]) for line in f if line.startswith("btime ")
+                    )
+            with open(f"/proc/{pid}/stat") as f:
+                # comm 에 공백/괄호가 있을 수 있어 마지막 ')' 뒤부터 나눈다 (3번째 필드부터)
+                fields = f.read().rsplit(")", 1)[1].split()
+            return self._boot_time + int(fields[19]) / os.sysconf("SC_CLK_TCK")
+        except (OSError, ValueError, IndexError, StopIteration):
+            return None
+
+    def _proc_pids(self) -> Iterable[int]:
+        pid = self._read_pid_file()
+        if pid is not None:
+            yield pid
+        # pidfile 이 없거나 오래된 경우 (-D 없이 실행 등)
+        for entry in os.scandir("/proc"):
+            if entry.name.isdigit() and int(entry.name) != pid:
+                yield int(entry.name)
+
+    def _check_proc(self) -> Tuple[Optional[int], Optional[float]]:
+        """/proc 에서 Suricata 찾기 -> (pid, 시작 시각)"""
+        for pid in self._proc_pids():
+            args = self._proc_args(pid)
+            if args is not None and _is_suricata(args):
+                return pid, self._proc_start_time(pid)
+        return None, None
+
+    async def _check_ps(self) -> Tuple[Optional[int], Optional[float]]:
+        """ps 로 Suricata 찾기 (WSL 밖에서 실행 중일 때)"""
+        code, out, _ = await self._run("ps", "-eo", "pid=,etimes=,args=")
+        if code != 0:
+            raise RuntimeError("ps 실행 실패")
+        found = None
+        for line in out.splitlines():
+            parts = line.split(None, 2)
+            if len(parts) < 3 or not _is_suricata(parts[2]):
+                continue
+            pid, elapsed = int(parts[0]), int(parts[1])
+            # 가장 오래 실행된 프로세스(메인)를 선택
+            if found is None or elapsed > found[1]:
+                found = (pid, elapsed)
+        if found is None:
+            return None, None
+        return found[0], time.time() - found[1]
+
+    async def refresh(self) -> ProcessStatus:
+        """지금 상태를 확인하여 캐시 갱신"""
+        async with self._lock:
+            try:
+                if self._use_proc:
+                    loop = asyncio.get_running_loop()
+                    pid, started = await loop.run_in_executor(None, self._check_proc)
+                else:
+                    pid, started = await self._check_ps()
+            except Exception as e:
+                log.error("Suricata 상태 확인 실패: %s", e)
+                return self.status
+            self.status = ProcessStatus(
+                pid is not None,
+                pid,
+                datetime.fromtimestamp(started, timezone.utc) if started is not None else None,
+                datetime.now(timezone.utc),
             )
-            
-            # Suricata 시작
-            result = subprocess.run(
-                ["wsl", "sudo", "suricata", "-c", "/etc/suricata/suricata.yaml", "-i", "eth0", "-D"],
-                capture_output=True,
-                text=True
+            return self.status
+
+    async def _check_socket(self):
+        """실행 중이면 command socket 연결 유지, 중지되었으면 연결 정리"""
+        if not self.is_running:
+            if suricata_socket.connected:
+                await suricata_socket.close()
+            return
+        if not suricata_socket.connected:
+            with contextlib.suppress(SuricataSocketError, SuricataCommandError):
+                await suricata_socket.command("uptime")
+
+    async def watch(self):
+        """상태 캐시 갱신 (백그라운드 태스크)"""
+        while True:
+            await self.refresh()
+            await self._check_socket()
+            await asyncio.sleep(settings.SURICATA_STATUS_INTERVAL)
+
+    # 명령 ------------------------------------------------------------------
+
+    async def _run(self, *args: str, detach: bool = False) -> Tuple[int, str, str]:
+        """명령 실행 (SURICATA_COMMAND_PREFIX 를 앞에 붙임) -> (returncode, stdout, stderr)
+
+        detach 는 데몬을 띄우는 명령용으로, 파이프 대신 임시 파일로 stderr 를 받아
+        데몬이 출력을 물려받아도 명령 프로세스가 끝나면 바로 반환한다 (stdout 은 버림).
+        """
+        with tempfile.TemporaryFile() if detach else contextlib.nullcontext() as errors:
+            process = await asyncio.create_subprocess_exec(
+                *self.prefix, *args,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.DEVNULL if detach else asyncio.subprocess.PIPE,
+                stderr=errors if detach else asyncio.subprocess.PIPE
             )
-            
-            if result.returncode == 0:
-                print("Suricata 시작 성공")
+            try:
+                if detach:
+                    await asyncio.wait_for(process.wait(), settings.SURICATA_COMMAND_TIMEOUT)
+                    errors.seek(0)
+                    stdout, stderr = b"", errors.read()
+                else:
+                    stdout, stderr = await asyncio.wait_for(process.communicate(), settings.SURICATA_COMMAND_TIMEOUT)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                raise RuntimeError(f"명령 시간 초과 ({settings.SURICATA_COMMAND_TIMEOUT}초): {' '.join(args)}")
+        return process.returncode, stdout.decode(errors="replace"), stderr.decode(errors="replace")
+
+    async def _wait_for(self, running: bool, timeout: float) -> bool:
+        """상태가 running 이 될 때까지 짧은 간격으로 확인"""
+        deadline = time.monotonic() + timeout
+        while True:
+            status = await self.refresh()
+            if status.is_running == running:
                 return True
-            else:
-                print(f"Suricata 시작 실패: {result.stderr}")
+            if time.monotonic() >= deadline:
                 return False
-        except Exception as e:
-            print(f"Suricata 시작 오류: {e}")
-            return False
-    
-    @staticmethod
-    async def stop():
-        """Suricata 중지 (WSL에서)"""
+            await asyncio.sleep(0.2)
+
+    async def start(self) -> bool:
+        """Suricata 시작"""
         try:
-            result = subprocess.run(
-                ["wsl", "sudo", "pkill", "-f", "suricata"],
-                capture_output=True,
-                text=True
-            )
-            time.sleep(1)
+            if (await self.refresh()).is_running:
+                log.info("Suricata가 이미 실행 중입니다.")
+                return True
 
-            check_result = subprocess.run(
-                ["wsl", "pgrep", "-f", "suricata"],
-                capture_output=True,
-                text=True
-            )
+            # stale pidfile 삭제 (남아 있으면 -D 시작이 실패함)
+            await self._run("sudo", "rm", "-f", str(self.pid_file))
 
-            if check_result.returncode == 0:
-                subprocess.run(
-                    ["wsl", "sudo", "pkill", "-9", "-f", "suricata"],
-                    capture_output=True,
-                    text=True
-                )
+            code, _, stderr = await self._run(
+                "sudo", "suricata",
+                "-c", settings.SURICATA_CONFIG_PATH,
+                "-i", settings.SURICATA_INTERFACE,
+                "--pidfile", str(self.pid_file),
+                "-D",
+                detach=True
+            )
+            if code != 0:
+                log.error("Suricata 시작 실패: %s", stderr)
+                return False
 
+            # -D 는 fork 후 바로 반환하므로 프로세스가 보일 때까지 확인
+            if not await self._wait_for(True, settings.SURICATA_STOP_TIMEOUT):
+                log.error("Suricata 시작 명령은 성공했지만 프로세스를 찾을 수 없습니다")
+                return False
+            log.info("Suricata 시작 성공")
             return True
         except Exception as e:
-            print(f"Stop error: {e}")
+            log.error("Suricata 시작 오류: %s", e)
             return False
-    
-    @staticmethod
-    async def reload_rules():
-        """Suricata 규칙 리로드 (WSL에서)"""
+
+    async def stop(self) -> bool:
+        """Suricata 중지 (socket shutdown, 안 되면 SIGTERM. SURICATA_STOP_TIMEOUT 안에 끝나지 않으면 SIGKILL)"""
         try:
-            result = subprocess.run(
-                ["wsl", "pgrep", "-f", "suricata"],
-                capture_output=True,
-                text=True
-            )
-            if result.returncode == 0:
-                pids = result.stdout.strip().split('\n')
-                for pid in pids:
-                    if pid:  # 빈 문자열이 아닌 경우만 처리
-                        subprocess.run(
-                            ["wsl", "sudo", "kill", "-USR2", pid],
-                            check=True
-                        )
-            return True
-        except:
-            return False
\ No newline at end of file
+            status = await self.refresh()
+            if not status.is_running:
+                return True
+
+            try:
+                await suricata_socket.shutdown()
+            except (SuricataSocketError, SuricataCommandError) as e:
+                log.warning("command socket 종료 실패 (%s) - SIGTERM 전송", e)
+                await self._run("sudo", "kill", "-TERM", str(status.pid))
+            if await self._wait_for(False, settings.SURICATA_STOP_TIMEOUT):
+                return True
+
+            log.warning("Suricata 가 종료되지 않아 강제 종료")
+            await self._run("sudo", "kill", "-KILL", str(status.pid))
+            return await self._wait_for(False, 2.0)
+        except Exception as e:
+            log.error("Stop error: %s", e)
+            return False
+
+    async def _signal_reload(self) -> Tuple[bool, str]:
+        """SIGUSR2 로 리로드 (전송 여부만 알 수 있음)"""
+        status = await self.refresh()
+        if not status.is_running:
+            return False, "Suricata 가 실행 중이 아닙니다"
+        code, _, stderr = await self._run("sudo", "kill", "-USR2", str(status.pid))
+        if code != 0:
+            return False, f"리로드 신호 전송 실패: {stderr.strip()}"
+        return True, "SIGUSR2 전송 (완료 여부 확인 불가)"
+
+    async def _rule_counts(self) -> Tuple[Optional[int], Optional[int]]:
+        """ruleset-stats 의 로드/실패 규칙 수 (tenant 가 여러 개면 합계)"""
+        try:
+            stats = await suricata_socket.ruleset_stats()
+        except (SuricataSocketError, SuricataCommandError):
+            return None, None
+        return (
+            sum(entry.get("rules_loaded", 0) for entry in stats),
+            sum(entry.get("rules_failed", 0) for entry in stats),
+        )
+
+    async def reload_rules(self, requests: int = 1) -> RuleReload:
+        """Suricata 규칙 리로드 (한 번에 하나씩). 결과와 걸린 시간은 last_reload 에도 보관
+
+        socket 의 reload-rules 는 새 규칙이 적용된 뒤에 응답하므로 걸린 시간이 곧 적용 시간이다.
+        requests 는 이 리로드로 합쳐진 요청 수 (request_reload).
+        """
+        async with self._reload_lock:
+            return await self._reload_rules(requests)
+
+    def schedule_reload(self) -> asyncio.Future:
+        """규칙 변경 후 리로드 예약. RULES_RELOAD_DEBOUNCE 초 안에 들어온 요청은 리로드 1번으로 합친다
+
+        반환하는 future 는 이 요청의 변경이 포함된 리로드의 결과(RuleReload)로 완료된다.
+        """
+        if self._reload_pending is None:
+            self._reload_pending = asyncio.get_running_loop().create_future()
+            self._reload_task = asyncio.create_task(self._debounced_reload(self._reload_pending))
+        self._reload_requests += 1
+        return self._reload_pending
+
+    async def request_reload(self) -> RuleReload:
+        """schedule_reload 후 리로드가 끝날 때까지 대기"""
+        return await asyncio.shield(self.schedule_reload())
+
+    async def _debounced_reload(self, pending: asyncio.Future):
+        await asyncio.sleep(settings.RULES_RELOAD_DEBOUNCE)
+        # 이후 요청은 파일이 이번 리로드 전에 쓰였다는 보장이 없으므로 다음 리로드로
+        requests, self._reload_requests = self._reload_requests, 0
+        self._reload_pending = None
+        try:
+            pending.set_result(await self.reload_rules(requests))
+        except Exception as e:
+            log.error("규칙 리로드 오류: %s", e)
+            pending.set_exception(e)
+            # wait=false 요청만 있었던 경우 경고가 남지 않도록
+            pending.exception()
+
+    async def _reload_rules(self, requests: int) -> RuleReload:
+        started_at = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        method = "socket"
+        loaded = failed = None
+        try:
+            message = str(await suricata_socket.reload_rules())
+            success = True
+        except SuricataCommandError as e:
+            success, message = False, str(e)
+        except SuricataSocketTimeout as e:
+            # 리로드가 진행 중일 수 있으므로 신호를 또 보내지 않음
+            success, message = False, str(e)
+        except SuricataSocketError as e:
+            log.warning("command socket 사용 불가 (%s) - SIGUSR2 로 리로드", e)
+            method = "signal"
+            try:
+                success, message = await self._signal_reload()
+            except Exception as e:
+                success, message = False, str(e)
+        duration_ms = (time.perf_counter() - started) * 1000
+
+        if method == "socket":
+            loaded, failed = await self._rule_counts()
+        if not success:
+            log.error("규칙 리로드 실패: %s", message)
+
+        self.last_reload = RuleReload(
+            success=success, method=method, message=message,
+            started_at=started_at, duration_ms=round(duration_ms, 1),
+            rules_loaded=loaded, rules_failed=failed, requests=requests
+        )
+        return self.last_reload
+
+suricata_manager = SuricataManager()
@@ -0,0 +1,151 @@
+import logging
+import asyncio
+from typing import Any, Dict, List, Optional, Set
+
+from app.util.alert_store import pack_ip
+
+log = logging.getLogger(__name__)
+
+
+class StreamFilter:
+    """구독자별 이벤트 필터 (None 인 조건은 무시)"""
+
+    def __init__(
+        self,
+        event_type: Optional[str] = "alert",
+        severity: Optional[int] = None,
+        src_ip: Optional[str] = None,
+        dest_ip: Optional[str] = None,
+        signature: Optional[str] = None
+    ):
+        self.event_type = event_type
+        self.severity = severity
+        # IP 는 캐시와 같은 방식으로 정규화해서 비교 (IPv6 표기 차이 무시)
+        self.src_ip = pack_ip(src_ip) if src_ip else None
+        self.dest_ip = pack_ip(dest_ip) if dest_ip else None
+        self.signature = signature
+
+    def matches(self, data: Dict[str, Any]) -> bool:
+        if self.event_type is not None and data.get("event_type") != self.event_type:
+            return False
+        if self.severity is not None or self.signature is not None:
+            alert_info = data.get("alert") or {}
+            if self.severity is not None and alert_info.get("severity") != self.severity:
+                return False
+            if self.signature is not None and alert_info.get("signature") != self.signature:
+                return False
+        if self.src_ip is not None and pack_ip(data.get("src_ip")) != self.src_ip:
+            return False
+        if self.dest_ip is not None and pack_ip(data.get("dest_ip")) != self.dest_ip:
+            return False
+        return True
+
+
+class StreamSubscriber:
+    """실시간 스트림 구독자 1명 (크기 제한 큐)"""
+
+    def __init__(self, stream_filter: StreamFilter, queue_size: int):
+        self.filter = stream_filter
+        self.queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue(queue_size)
+        self.sent = 0
+        self.dropped = False
+        self.closed = False
+
+    async def next_batch(self, timeout: float) -> Optional[List[bytes]]:
+        """대기 중인 이벤트(원본 JSON bytes)를 한꺼번에 꺼냄
+
+        timeout 동안 이벤트가 없으면 빈 리스트, 연결이 끊겼으면 None.
+        """
+        if self.closed and self.queue.empty():
+            return None
+        try:
+            message = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        messages = []
+        while message is not None:
+            messages.append(message)
+            if self.queue.empty():
+                break
+            message = self.queue.get_nowait()
+        return messages if messages else None
+
+
+class AlertBroadcaster:
+    """수집 파이프라인의 이벤트를 여러 구독자(SSE/WebSocket)에게 전달
+
+    이벤트는 디코딩 전 원본 라인 bytes 를 그대로 보내므로 구독자 수와 무관하게
+    다시 직렬화하지 않는다. 구독자 큐가 가득 차면 (느린 소비자) 기다리지 않고
+    해당 구독자를 끊어 수집 파이프라인이 막히지 않도록 한다. 수집 루프는
+    YIELD_EVERY 개마다 이벤트 루프에 양보하여 전송 루프가 큐를 비울 기회를 준다.
+    """
+
+    YIELD_EVERY = 100
+
+    def __init__(self, queue_size: int, max_subscribers: int):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.subscribers: Set[StreamSubscriber] = set()
+        self.published = 0
+        self.disconnected_slow = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.subscribers)
+
+    def subscribe(self, stream_filter: StreamFilter) -> StreamSubscriber:
+        if len(self.subscribers) >= self.max_subscribers:
+            raise RuntimeError(f"스트림 구독자 수 초과 (최대 {self.max_subscribers})")
+        subscriber = StreamSubscriber(stream_filter, self.queue_size)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: StreamSubscriber):
+        self.subscribers.discard(subscriber)
+
+    def publish(self, data: Dict[str, Any], raw: bytes):
+        """이벤트 1개를 조건에 맞는 구독자 큐에 넣음 (이벤트 루프 스레드에서 호출)"""
+        slow = None
+        for subscriber in self.subscribers:
+            if not subscriber.filter.matches(data):
+                continue
+            try:
+                subscriber.queue.put_nowait(raw)
+                subscriber.sent += 1
+            except asyncio.QueueFull:
+                if slow is None:
+                    slow = []
+                slow.append(subscriber)
+        self.published += 1
+
+        if slow:
+            for subscriber in slow:
+                self._drop(subscriber)
+
+    def _drop(self, subscriber: StreamSubscriber):
+        """느린 구독자 연결 끊기: 큐를 비우고 종료 표시(None)를 넣음"""
+        subscriber.dropped = True
+        self._close_subscriber(subscriber)
+        self.disconnected_slow += 1
+        log.warning("느린 스트림 구독자 연결 끊음 (큐 %d개 초과, 전송 %d개)", self.queue_size, subscriber.sent)
+
+    def close(self):
+        """모든 구독자 종료 (애플리케이션 종료 시)"""
+        for subscriber in list(self.subscribers):
+            self._close_subscriber(subscriber)
+
+    def _close_subscriber(self, subscriber: StreamSubscriber):
+        """큐를 비우고 종료 표시(None)를 넣어 대기 중인 전송 루프를 깨움"""
+        self.subscribers.discard(subscriber)
+        subscriber.closed = True
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self.subscribers),
+            "max_subscribers": self.max_subscribers,
+            "queue_size": self.queue_size,
+            "published": self.published,
+            "disconnected_slow": self.disconnected_slow,
+        }
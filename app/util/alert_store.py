@@ -0,0 +1,307 @@
+import socket
+import ipaddress
+from array import array
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Deque, Dict, List, Optional, Union
+
+from app.model.alert import Alert
+from app.util.eve_time import eve_utc_offset_minutes, parse_eve_ticks
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+IpKey = Union[int, str]
+
+
+def pack_ip(value: Optional[str]) -> IpKey:
+    """IPv4 는 32비트 정수로, 그 외(IPv6, 'unknown' 등)는 정규화된 문자열로"""
+    if not value:
+        return ""
+    try:
+        return int.from_bytes(socket.inet_aton(value), "big") if value.count(".") == 3 else _canonical(value)
+    except OSError:
+        return _canonical(value)
+
+
+def _canonical(value: str) -> str:
+    try:
+        return ipaddress.ip_address(value).compressed
+    except ValueError:
+        return value
+
+
+def _str_or(value: Any, default: Optional[str]) -> Optional[str]:
+    return value if value.__class__ is str and value else default
+
+
+class StringTable:
+    """반복되는 문자열(시그니처, 프로토콜 등)을 정수 id 로 저장"""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def id_of(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = len(self.values)
+            self._ids[value] = string_id
+            self.values.append(value)
+        return string_id
+
+    def lookup(self, value: str) -> Optional[int]:
+        return self._ids.get(value)
+
+    def get(self, string_id: int) -> Optional[str]:
+        return self.values[string_id] if string_id >= 0 else None
+
+
+class AlertStore:
+    """고정 용량 ring buffer alert 캐시 + 보조 인덱스
+
+    alert 마다 증가하는 seq 를 부여하고 slot = seq % capacity 에 저장한다.
+    각 필드는 slot 별 타입 배열(array)에 담는다. IPv4 는 32비트 정수, 시그니처 등
+    반복 문자열은 StringTable id 로 저장하며, payload 는 더 작은 별도 ring 에
+    최신 것만 보관한다. Alert(pydantic) 모델은 조회 응답을 만들 때만 생성한다.
+
+    인덱스는 필드 값 -> seq deque 로, seq 가 항상 증가 순서로 들어가므로
+    가장 오래된 alert 를 밀어낼 때 각 인덱스 deque 의 맨 앞만 빼면 된다(O(1)).
+    """
+
+    INDEXED_FIELDS = ("alert_severity", "src_ip", "dest_ip", "alert_signature")
+    IP_KEY_CACHE_SIZE = 65536
+
+    def __init__(self, capacity: int, payload_capacity: int = 0):
+        self.capacity = capacity
+        self._next_seq = 0
+
+        self._timestamp = array("q", bytes(8 * capacity))   # epoch 마이크로초
+        self._tz_minutes = array("h", bytes(2 * capacity))  # UTC 오프셋(분)
+        self._src_ip = array("L", bytes(array("L").itemsize * capacity))
+        self._dest_ip = array("L", bytes(array("L").itemsize * capacity))
+        self._src_port = array("l", [-1]) * capacity        # -1 = None
+        self._dest_port = array("l", [-1]) * capacity
+        self._severity = array("b", [-1]) * capacity
+        self._proto = array("l", [-1]) * capacity           # StringTable id
+        self._event_type = array("l", [-1]) * capacity
+        self._signature = array("l", [-1]) * capacity
+        # IPv4 가 아닌 주소는 slot -> 문자열로 따로 보관
+        self._src_ip_ext: Dict[int, str] = {}
+        self._dest_ip_ext: Dict[int, str] = {}
+        self.strings = StringTable()
+
+        # payload 는 최신 payload_capacity 개만 보관 (slot 의 seq 가 일치할 때만 유효)
+        self.payload_capacity = payload_capacity
+        self._payloads: List[Optional[str]] = [None] * payload_capacity
+        self._payload_seq = array("q", [-1]) * payload_capacity
+
+        self._indexes: Dict[str, Dict[Any, Deque[int]]] = {
+            field: {} for field in self.INDEXED_FIELDS
+        }
+        self._timezones: Dict[int, timezone] = {}
+        self._ip_keys: Dict[Optional[str], IpKey] = {}
+
+    def __len__(self) -> int:
+        return min(self._next_seq, self.capacity)
+
+    def add_event(self, data: Dict[str, Any]) -> int:
+        """디코딩된 alert 이벤트 추가 (가득 차 있으면 가장 오래된 alert 를 밀어냄)"""
+        # 입력 검증/변환을 먼저 끝낸다 (예외가 나도 slot 과 인덱스는 그대로 유지)
+        timestamp = data.get("timestamp")
+        if timestamp:
+            ticks = parse_eve_ticks(timestamp)[0]
+            tz_minutes = eve_utc_offset_minutes(timestamp)
+        else:
+            ticks = (datetime.now(timezone.utc) - _EPOCH) // timedelta(microseconds=1)
+            tz_minutes = 0
+
+        # null 이나 문자열이 아닌 값은 기본값으로 (조회 시 Alert 모델 검증에 걸리지 않도록)
+        src_key = self._ip_key(_str_or(data.get("src_ip"), "unknown"))
+        dest_key = self._ip_key(_str_or(data.get("dest_ip"), "unknown"))
+
+        port = data.get("src_port")
+        src_port = port if port.__class__ is int and 0 <= port <= 0xFFFF else -1
+        port = data.get("dest_port")
+        dest_port = port if port.__class__ is int and 0 <= port <= 0xFFFF else -1
+
+        alert_info = data.get("alert")
+        if not isinstance(alert_info, dict):
+            alert_info = {}
+        severity = alert_info.get("severity")
+        if severity.__class__ is not int or not 0 <= severity <= 127:
+            severity = -1
+        id_of = self.strings.id_of
+        signature = id_of(_str_or(alert_info.get("signature"), None))
+        proto = id_of(_str_or(data.get("proto"), "unknown"))
+        event_type = id_of(_str_or(data.get("event_type"), "alert"))
+        payload = _str_or(data.get("payload"), None)
+
+        seq = self._next_seq
+        slot = seq % self.capacity
+        if seq >= self.capacity:
+            self._unindex(slot)
+
+        self._timestamp[slot] = ticks
+        self._tz_minutes[slot] = tz_minutes
+        if src_key.__class__ is int:
+            self._src_ip[slot] = src_key
+            if self._src_ip_ext:
+                self._src_ip_ext.pop(slot, None)
+        else:
+            self._src_ip[slot] = 0
+            self._src_ip_ext[slot] = src_key
+        if dest_key.__class__ is int:
+            self._dest_ip[slot] = dest_key
+            if self._dest_ip_ext:
+                self._dest_ip_ext.pop(slot, None)
+        else:
+            self._dest_ip[slot] = 0
+            self._dest_ip_ext[slot] = dest_key
+        self._src_port[slot] = src_port
+        self._dest_port[slot] = dest_port
+        self._severity[slot] = severity
+        self._signature[slot] = signature
+        self._proto[slot] = proto
+        self._event_type[slot] = event_type
+
+        if self.payload_capacity:
+            payload_slot = seq % self.payload_capacity
+            self._payloads[payload_slot] = payload
+            self._payload_seq[payload_slot] = seq
+
+        indexes = self._indexes
+        for index, key in (
+            (indexes["alert_severity"], severity),
+            (indexes["src_ip"], src_key),
+            (indexes["dest_ip"], dest_key),
+            (indexes["alert_signature"], signature),
+        ):
+            seqs = index.get(key)
+            if seqs is None:
+                index[key] = seqs = deque()
+            seqs.append(seq)
+
+        self._next_seq = seq + 1
+        return seq
+
+    def _ip_key(self, value: Optional[str]) -> IpKey:
+        """pack_ip 결과 캐시 (alert 의 IP 는 반복이 많음)"""
+        key = self._ip_keys.get(value)
+        if key is None:
+            if len(self._ip_keys) >= self.IP_KEY_CACHE_SIZE:
+                self._ip_keys.clear()
+            key = self._ip_keys[value] = pack_ip(value)
+        return key
+
+    def _slot_keys(self, slot: int):
+        return (
+            ("alert_severity", self._severity[slot]),
+            ("src_ip", self._src_ip_ext.get(slot, self._src_ip[slot])),
+            ("dest_ip", self._dest_ip_ext.get(slot, self._dest_ip[slot])),
+            ("alert_signature", self._signature[slot]),
+        )
+
+    def _unindex(self, slot: int):
+        for field, key in self._slot_keys(slot):
+            index = self._indexes[field]
+            seqs = index[key]
+            seqs.popleft()
+            if not seqs:
+                del index[key]
+
+    def _filter_keys(self, filters: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """API 필터 값을 인덱스 키로 변환 (존재할 수 없는 값이면 None)"""
+        keys = {}
+        for field, value in filters.items():
+            if field in ("src_ip", "dest_ip"):
+                keys[field] = pack_ip(value)
+            elif field == "alert_signature":
+                string_id = self.strings.lookup(value)
+                if string_id is None:
+                    return None
+                keys[field] = string_id
+            else:
+                keys[field] = value
+        return keys
+
+    def query(self, limit: int = 100, **filters: Any) -> List[Alert]:
+        """조건에 맞는 최신 alert 최대 limit 개 (오래된 것 -> 최신 순)
+
+        filters 는 INDEXED_FIELDS 의 필드명=값 이며 None 인 조건은 무시한다.
+        """
+        filters = {field: value for field, value in filters.items() if value is not None}
+        unknown = set(filters) - set(self.INDEXED_FIELDS)
+        if unknown:
+            raise ValueError(f"인덱스가 없는 필드: {', '.join(sorted(unknown))}")
+        if limit <= 0:
+            return []
+
+        keys = self._filter_keys(filters)
+        if keys is None:
+            return []
+
+        if keys:
+            # 가장 후보가 적은 인덱스를 기준으로 최신부터 훑는다
+            candidates = None
+            for field, key in keys.items():
+                seqs = self._indexes[field].get(key)
+                if seqs is None:
+                    return []
+                if candidates is None or len(seqs) < len(candidates):
+                    candidates = seqs
+            seq_iter = reversed(candidates)
+        else:
+            seq_iter = range(self._next_seq - 1, self._next_seq - 1 - len(self), -1)
+
+        seqs: List[int] = []
+        for seq in seq_iter:
+            slot = seq % self.capacity
+            if keys and any(keys[field] != key for field, key in self._slot_keys(slot) if field in keys):
+                continue
+            seqs.append(seq)
+            if len(seqs) >= limit:
+                break
+
+        seqs.reverse()
+        return [self._to_model(seq) for seq in seqs]
+
+    def _ip_str(self, column: array, ext: Dict[int, str], slot: int) -> str:
+        value = ext.get(slot)
+        if value is not None:
+            return value
+        return socket.inet_ntoa(column[slot].to_bytes(4, "big"))
+
+    def _to_model(self, seq: int) -> Alert:
+        slot = seq % self.capacity
+        tz_minutes = self._tz_minutes[slot]
+        tz = self._timezones.get(tz_minutes)
+        if tz is None:
+            tz = self._timezones[tz_minutes] = timezone(timedelta(minutes=tz_minutes))
+
+        payload = None
+        if self.payload_capacity:
+            payload_slot = seq % self.payload_capacity
+            if self._payload_seq[payload_slot] == seq:
+                payload = self._payloads[payload_slot]
+
+        src_port = self._src_port[slot]
+        dest_port = self._dest_port[slot]
+        severity = self._severity[slot]
+        # 저장 시 이미 정리된 값이므로 검증 없이 생성
+        return Alert.model_construct(
+            timestamp=(_EPOCH + timedelta(microseconds=self._timestamp[slot])).astimezone(tz),
+            event_type=self.strings.get(self._event_type[slot]),
+            src_ip=self._ip_str(self._src_ip, self._src_ip_ext, slot),
+            src_port=src_port if src_port >= 0 else None,
+            dest_ip=self._ip_str(self._dest_ip, self._dest_ip_ext, slot),
+            dest_port=dest_port if dest_port >= 0 else None,
+            proto=self.strings.get(self._proto[slot]),
+            alert_signature=self.strings.get(self._signature[slot]),
+            alert_severity=severity if severity >= 0 else None,
+            payload=payload,
+        )
+
+    def clear(self):
+        self.__init__(self.capacity, self.payload_capacity)
@@ -0,0 +1,92 @@
+import logging
+import os
+import json
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import Dict, Any, NamedTuple, Optional, Tuple
+
+from app.core.config import settings
+
+log = logging.getLogger(__name__)
+
+
+class LogPosition(NamedTuple):
+    """로그 파일 내 위치 (파일 식별자 + 바이트 오프셋)"""
+    source: str
+    dev: int
+    inode: int
+    offset: int
+
+
+class IngestCheckpoint:
+    """수집 체크포인트 관리
+
+    ClickHouse 삽입이 성공한 뒤에만 commit 되므로, 재시작 시 마지막으로
+    저장된 이벤트 바로 다음 라인부터 이어서 읽는다.
+    파일은 임시 파일에 쓴 뒤 os.replace 로 교체하여 중간 상태가 남지 않는다.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.sources: Dict[str, LogPosition] = {}
+        self.last_batch: Optional[Dict[str, Any]] = None
+        self.batch_seq = 0
+
+    def load(self) -> bool:
+        """체크포인트 파일 읽기"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            log.error("체크포인트 읽기 실패, 처음부터 수집: %s", e)
+            return False
+
+        self.sources = {
+            source: LogPosition(source, pos["dev"], pos["inode"], pos["offset"])
+            for source, pos in data.get("sources", {}).items()
+        }
+        self.last_batch = data.get("last_batch")
+        if self.last_batch:
+            self.batch_seq = self.last_batch.get("seq", 0)
+        return True
+
+    def get(self, source: str) -> Optional[LogPosition]:
+        return self.sources.get(source)
+
+    def resume_positions(self) -> Dict[str, Tuple[int, Tuple[int, int]]]:
+        """소스별 (offset, (dev, inode)) - MultiTailer 시작 위치"""
+        return {source: (pos.offset, (pos.dev, pos.inode)) for source, pos in self.sources.items()}
+
+    def commit(self, positions: Dict[str, LogPosition], event_count: int):
+        """삽입 완료된 배치의 마지막 위치를 저장"""
+        if not positions:
+            return
+
+        self.sources.update(positions)
+        self.batch_seq += 1
+        self.last_batch = {
+            "seq": self.batch_seq,
+            "events": event_count,
+            "flushed_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+        data = {
+            "sources": {
+                source: {"dev": pos.dev, "inode": pos.inode, "offset": pos.offset}
+                for source, pos in self.sources.items()
+            },
+            "last_batch": self.last_batch,
+        }
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+ingest_checkpoint = IngestCheckpoint(settings.INGEST_CHECKPOINT_PATH)
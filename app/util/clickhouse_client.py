@@ -1,306 +1,690 @@
 import clickhouse_connect
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+from clickhouse_connect.driver.client import Client
+from clickhouse_connect.driver.exceptions import OperationalError
+from clickhouse_connect.driver.query import QueryResult
+from typing import Deque, Dict, Any, List, NamedTuple, Optional, Sequence, Set, Tuple
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import time
 import asyncio
+import logging
 from app.core.config import settings
+from app.util.checkpoint import LogPosition, ingest_checkpoint
+from app.util.column_batch import RoutedBatch
+from app.util.event_tables import EVENT_TABLES, table_columns
+from app.util.spill_queue import SpillQueue
+from app.util.stats_metrics import METRICS_COLUMNS, METRICS_TABLE, last_values_query, stats_tracker
+from app.util.clickhouse_pool import ClickHousePool, ConnectionHealth, is_retryable
+from app.util.clickhouse_schema import WIDE_SUFFIX, copy_legacy_partitions
+from app.util.clickhouse_migrations import (
+    EVENT_TABLES_VERSION, ROLLUPS_VERSION, check_column_drift, current_version, run_migrations
+)
+from app.util import ingest_metrics
+
+log = logging.getLogger(__name__)
+
+
+class PendingBatch(NamedTuple):
+    """삽입 대기/진행 중인 배치"""
+    seq: int
+    batch: RoutedBatch
+    positions: Dict[str, LogPosition]
+
 
 class ClickHouseClient:
-    """ClickHouse 클라이언트 관리"""
+    """ClickHouse 클라이언트 관리
+    
+    배치 삽입은 전용 스레드 풀에서 실행되어 이벤트 루프를 막지 않는다.
+    버퍼는 flush 시점에 통째로 교체되므로 삽입 중에도 수집은 계속된다.
+    
+    메모리에 쌓인 이벤트가 INGEST_MAX_BUFFERED_EVENTS 를 넘으면
+    INGEST_BACKPRESSURE_POLICY 에 따라 수집을 멈추거나(block), 지정된 타입을
+    버리거나(drop), 대기 중인 배치를 디스크로 내린다(spill).
+    스필된 배치는 연결이 살아 있고 대기열이 비었을 때 다시 전송된다.
+    
+    연결/일시적 서버 오류로 실패한 배치는 재시도하고, 그 외 오류(데이터/스키마)로
+    거부된 테이블은 dead letter 큐(INGEST_DEAD_LETTER_DIR)로 옮겨 체크포인트를 막지 않게 한다.
+    """
     
     def __init__(self):
-        self.client: Optional[clickhouse_connect.driver.client.Client] = None
-        self.batch_buffer: List[Dict[str, Any]] = []
+        # 관리(DDL)/스크립트용 클라이언트. 삽입과 조회는 pool 을 사용
+        self.client: Optional[Client] = None
+        self.pool: Optional[ClickHousePool] = None
+        self.health = ConnectionHealth(
+            settings.CLICKHOUSE_RECONNECT_MIN_DELAY,
+            settings.CLICKHOUSE_RECONNECT_MAX_DELAY
+        )
+        self.schema_ready = False
+        # 마이그레이션 실행 여부 (별도 수집 프로세스가 있으면 API 프로세스는 확인만)
+        self.manage_schema = True
+        # 통계용 rollup 테이블 사용 가능 여부 (실패 시 원본 테이블 집계)
+        self.rollups_ready = False
+        self.schema_version = 0
+        self.schema_drift: Dict[str, List[str]] = {"missing": [], "unfilled": []}
+        self._query_executor: Optional[ThreadPoolExecutor] = None
+        self.batch_buffer = RoutedBatch()
+        # 버퍼에 담긴 마지막 이벤트의 로그 위치 (소스별)
+        self.batch_positions: Dict[str, LogPosition] = {}
         self.batch_lock = asyncio.Lock()
-        self.is_connected = False
+        
+        # 삽입 대기 중인 배치 (순서 유지, 실패한 배치는 앞에 다시 넣는다)
+        self.pending_batches: Deque[PendingBatch] = deque()
+        self._inflight: Set[asyncio.Task] = set()
+        self._insert_executor: Optional[ThreadPoolExecutor] = None
+        self._next_seq = 0
+        # 체크포인트는 seq 순서대로만 전진 (동시 삽입 시 뒤 배치가 먼저 끝날 수 있음)
+        self._next_commit_seq = 0
+        self._completed: Dict[int, Tuple[Dict[str, LogPosition], int]] = {}
+        
+        # 버퍼 + 대기열 + 삽입 중인 이벤트 수
+        self.buffered_events = 0
+        self.dropped_events = 0
+        self.spilled_batches = 0
+        self._space_available = asyncio.Event()
+        self._blocked_reported = False
+        self.spill_queue = SpillQueue(
+            settings.INGEST_SPILL_DIR,
+            max_bytes=settings.INGEST_SPILL_MAX_BYTES
+        )
+        self._spill_executor: Optional[ThreadPoolExecutor] = None
+        self.dead_letter_events = 0
+        self.dead_letters = SpillQueue(
+            settings.INGEST_DEAD_LETTER_DIR,
+            max_bytes=settings.INGEST_DEAD_LETTER_MAX_BYTES
+        )
+    
+    def _create_client(self) -> Client:
+        return clickhouse_connect.get_client(
+            host=settings.CLICKHOUSE_HOST,
+            port=settings.CLICKHOUSE_PORT,
+            username=settings.CLICKHOUSE_USER,
+            password=settings.CLICKHOUSE_PASSWORD,
+            database=settings.CLICKHOUSE_DATABASE,
+            # 세션을 쓰지 않아야 풀의 클라이언트를 여러 스레드에서 번갈아 쓸 수 있다
+            autogenerate_session_id=False
+        )
+    
+    @property
+    def is_connected(self) -> bool:
+        return self.health.connected
     
     def connect(self) -> bool:
-        """ClickHouse 연결"""
+        """ClickHouse 연결 (관리용 클라이언트 + 삽입/조회용 풀)"""
+        self.health.state = "connecting"
+        client = None
         try:
-            self.client = clickhouse_connect.get_client(
-                host=settings.CLICKHOUSE_HOST,
-                port=settings.CLICKHOUSE_PORT,
-                username=settings.CLICKHOUSE_USER,
-                password=settings.CLICKHOUSE_PASSWORD,
-                database=settings.CLICKHOUSE_DATABASE
-            )
-            self.is_connected = True
-            print(f"ClickHouse connected: {settings.CLICKHOUSE_HOST}:{settings.CLICKHOUSE_PORT}")
-            return True
+            client = self._create_client()
+            pool = ClickHousePool(self._create_client, settings.CLICKHOUSE_POOL_SIZE)
+            pool.open()
         except Exception as e:
-            print(f"✗ ClickHouse 연결 실패: {e}")
-            self.is_connected = False
+            if client is not None:
+                client.close()
+            self.health.record_failure(e)
+            log.error("ClickHouse 연결 실패: %s", e)
             return False
+        
+        # 새 풀로 먼저 바꾼 뒤 이전 것을 닫는다 (삽입/조회 스레드가 이전 풀을 쓰는 중일 수 있음)
+        old_client, old_pool = self.client, self.pool
+        self.client = client
+        self.pool = pool
+        if old_pool is not None:
+            old_pool.close()
+        if old_client is not None:
+            old_client.close()
+        self.health.record_ok()
+        log.info(
+            "ClickHouse connected: %s:%d (pool %d)",
+            settings.CLICKHOUSE_HOST, settings.CLICKHOUSE_PORT, settings.CLICKHOUSE_POOL_SIZE
+        )
+        return True
+    
+    def _close_clients(self):
+        """연결 종료 (삽입/조회 executor 를 정리한 뒤 호출)"""
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+        if self.client is not None:
+            self.client.close()
+            self.client = None
     
     def disconnect(self):
         """ClickHouse 연결 종료"""
+        for executor in (self._insert_executor, self._query_executor, self._spill_executor):
+            if executor:
+                executor.shutdown(wait=True)
+        self._insert_executor = None
+        self._query_executor = None
+        self._spill_executor = None
+        self.spill_queue.close()
+        self.dead_letters.close()
         if self.client:
             try:
-                self.client.close()
-                self.is_connected = False
-                print(" ClickHouse 연결 종료")
+                self._close_clients()
+                self.health.state = "disconnected"
+                log.info("ClickHouse 연결 종료")
             except Exception as e:
-                print(f"✗ ClickHouse 연결 종료 중 오류: {e}")
+                log.error("ClickHouse 연결 종료 중 오류: %s", e)
+    
+    def _record_error(self, error: Exception):
+        """삽입/조회 오류 중 연결 문제는 상태에 반영하여 재연결을 유도"""
+        if isinstance(error, OperationalError) and self.health.connected:
+            log.error("ClickHouse 연결 끊김 감지: %s", error)
+            self.health.record_failure(error)
+    
+    def _acquire(self):
+        """풀에서 클라이언트 빌리기 (호출 시점의 풀, 연결이 없으면 ConnectionError)"""
+        pool = self.pool
+        if pool is None:
+            raise ConnectionError("ClickHouse 연결 안됨")
+        return pool.acquire(timeout=settings.CLICKHOUSE_POOL_TIMEOUT)
+    
+    def _ping(self) -> bool:
+        with self._acquire() as client:
+            return client.ping()
+    
+    async def maintain_connection(self):
+        """연결 상태 확인 및 backoff 재연결 (백그라운드 태스크)"""
+        loop = asyncio.get_running_loop()
+        last_check = 0.0
+        
+        while True:
+            await asyncio.sleep(1)
+            now = loop.time()
+            
+            if self.health.connected:
+                if now - last_check < settings.CLICKHOUSE_HEALTH_INTERVAL:
+                    continue
+                last_check = now
+                try:
+                    alive = await loop.run_in_executor(self._get_query_executor(), self._ping)
+                except Exception:
+                    alive = False
+                if not alive:
+                    self.health.record_failure(ConnectionError("ping 실패"))
+                    log.error("ClickHouse ping 실패 - 재연결 대기")
+                elif not self.schema_ready:
+                    # 마이그레이션이 실패했거나 (process 모드 API) 수집 프로세스가 아직 적용 전이면 다시 확인
+                    if await loop.run_in_executor(self._get_query_executor(), self.ensure_database):
+                        self._start_inserts()
+                continue
+            
+            if not self.health.retry_due():
+                continue
+            
+            log.info("ClickHouse 재연결 시도 (%d회 실패 후)", self.health.consecutive_failures)
+            if await loop.run_in_executor(self._get_query_executor(), self.connect):
+                if not self.schema_ready:
+                    await loop.run_in_executor(self._get_query_executor(), self.ensure_database)
+                last_check = now
+                # 연결이 끊긴 동안 쌓인 배치 전송 재개
+                self._start_inserts()
+    
+    async def run_query(self, query: str, parameters: Optional[Dict[str, Any]] = None, **kwargs) -> QueryResult:
+        """풀의 클라이언트로 조회 실행 (이벤트 루프 밖에서)"""
+        if not self.is_connected:
+            raise ConnectionError("ClickHouse 연결 안됨")
+        
+        def run():
+            try:
+                with self._acquire() as client:
+                    return client.query(query, parameters=parameters, **kwargs)
+            except Exception as e:
+                self._record_error(e)
+                raise
+        
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_query_executor(), run)
+    
+    def status(self) -> Dict[str, Any]:
+        """연결 및 수집 버퍼 상태"""
+        return {
+            **self.health.to_dict(),
+            "pool_size": self.pool.size if self.pool else 0,
+            "pool_idle": self.pool.idle if self.pool else 0,
+            "schema_ready": self.schema_ready,
+            "rollups_ready": self.rollups_ready,
+            "schema_version": self.schema_version,
+            "schema_drift": self.schema_drift,
+            "buffered_events": self.buffered_events,
+            "pending_batches": len(self.pending_batches),
+            "inflight_inserts": len(self._inflight),
+            "dropped_events": self.dropped_events,
+            "spill_bytes": self.spill_queue.total_bytes,
+            "dead_letter_events": self.dead_letter_events,
+        }
     
     def ensure_database(self):
-        """데이터베이스가 없으면 생성"""
+        """데이터베이스 생성 및 스키마 마이그레이션 적용
+
+        manage_schema 가 False 이면 마이그레이션은 수집 프로세스에 맡기고
+        현재 버전만 확인한다. 배치 컬럼이 테이블에 없으면(schema_drift missing)
+        schema_ready 를 세우지 않고 False 를 반환한다.
+        """
         try:
             if not self.client:
                 self.connect()
             
-            self.client.command(f"CREATE DATABASE IF NOT EXISTS {settings.CLICKHOUSE_DATABASE}")
-            print(f"DB: {settings.CLICKHOUSE_DATABASE}")
+            if not self.manage_schema:
+                self.schema_version = current_version(self.client)
+            else:
+                self.client.command(f"CREATE DATABASE IF NOT EXISTS {settings.CLICKHOUSE_DATABASE}")
+                log.info("DB: %s", settings.CLICKHOUSE_DATABASE)
+                try:
+                    self.schema_version = run_migrations(self.client)
+                except Exception as e:
+                    # 실패한 버전 직전까지는 적용된 상태
+                    self.schema_version = current_version(self.client)
+                    log.error("스키마 마이그레이션 실패 (현재 버전 %d): %s", self.schema_version, e)
+            log.info("schema version: %d", self.schema_version)
+            
+            self.rollups_ready = self.schema_version >= ROLLUPS_VERSION
+            # 수집은 이벤트 타입별 테이블에 기록하므로 해당 버전까지 적용되어야 한다
+            if self.schema_version < EVENT_TABLES_VERSION:
+                return False
             
-            create_table_query = f"""
-            CREATE TABLE IF NOT EXISTS {settings.CLICKHOUSE_DATABASE}.{settings.CLICKHOUSE_TABLE}
-            (
-                timestamp DateTime64(6),
-                event_type String,
-                src_ip String,
-                src_port UInt16,
-                dest_ip String,
-                dest_port UInt16,
-                proto String,
-                
-                -- Alert 관련 필드
-                alert_signature Nullable(String),
-                alert_category Nullable(String),
-                alert_severity Nullable(UInt8),
-                alert_action Nullable(String),
-                
-                -- Flow 관련 필드
-                flow_id Nullable(UInt64),
-                flow_pkts_toserver Nullable(UInt32),
-                flow_pkts_toclient Nullable(UInt32),
-                flow_bytes_toserver Nullable(UInt64),
-                flow_bytes_toclient Nullable(UInt64),
-                flow_start Nullable(DateTime64(6)),
-                flow_end Nullable(DateTime64(6)),
-                flow_age Nullable(UInt32),
-                flow_state Nullable(String),
-                flow_reason Nullable(String),
-                
-                -- HTTP 관련 필드
-                http_hostname Nullable(String),
-                http_url Nullable(String),
-                http_http_user_agent Nullable(String),
-                http_http_method Nullable(String),
-                http_protocol Nullable(String),
-                http_status Nullable(UInt16),
-                http_length Nullable(UInt32),
-                
-                -- DNS 관련 필드
-                dns_type Nullable(String),
-                dns_id Nullable(UInt16),
-                dns_rrname Nullable(String),
-                dns_rrtype Nullable(String),
-                dns_rcode Nullable(String),
-                
-                -- TLS 관련 필드
-                tls_subject Nullable(String),
-                tls_issuerdn Nullable(String),
-                tls_fingerprint Nullable(String),
-                tls_sni Nullable(String),
-                tls_version Nullable(String),
-                
-                -- 원본 JSON 데이터 (분석용)
-                raw_json String,
-                
-                -- 인덱스 필드
-                date Date DEFAULT toDate(timestamp)
-            )
-            ENGINE = MergeTree()
-            PARTITION BY toYYYYMM(date)
-            ORDER BY (event_type, timestamp, src_ip, dest_ip)
-            TTL date + INTERVAL 90 DAY
-            SETTINGS index_granularity = 8192
-            """
+            # 배치 컬럼과 실제 테이블 컬럼이 어긋나지 않았는지 확인 (table.column 형태로 모음)
+            drift: Dict[str, List[str]] = {"missing": [], "unfilled": []}
+            batch_tables = [(t.name, table_columns(t)) for t in EVENT_TABLES.values()]
+            batch_tables.append((METRICS_TABLE.name, list(METRICS_COLUMNS)))
+            for table_name, column_names in batch_tables:
+                table_drift = check_column_drift(self.client, table_name, column_names)
+                for kind, columns in table_drift.items():
+                    drift[kind].extend(f"{table_name}.{column}" for column in columns)
+            self.schema_drift = drift
+            if drift["unfilled"]:
+                log.warning("수집기가 채우지 않는 컬럼: %s", ", ".join(drift["unfilled"]))
             
-            self.client.command(create_table_query)
-            print(f" table checked: {settings.CLICKHOUSE_TABLE}")
+            log.info("tables checked: %s", ", ".join(name for name, _ in batch_tables))
+            if drift["missing"]:
+                # 삽입하면 모두 dead letter 로 빠지므로 컬럼이 생길 때까지 삽입을 보류 (상태 확인 주기마다 재확인)
+                log.error("테이블에 없는 컬럼 - 해결될 때까지 삽입 보류: %s", ", ".join(drift["missing"]))
+                return False
+            
+            # 재시작 전에 저장된 카운터 값을 기준으로 stats delta 를 이어서 계산
+            try:
+                last_values = self.client.query(last_values_query()).result_rows
+                stats_tracker.restore(last_values)
+                log.info("stats counters restored: %d", len(last_values))
+            except Exception as e:
+                log.warning("stats 카운터 기준값 조회 실패 (첫 샘플의 delta 는 0): %s", e)
+            self.schema_ready = True
             return True
             
         except Exception as e:
-            print(f"✗ 데이터베이스/테이블 생성 실패: {e}")
+            log.error("데이터베이스/테이블 생성 실패: %s", e)
             return False
     
-    async def add_to_batch(self, event: Dict[str, Any]):
-        """배치 버퍼에 이벤트 추가"""
+    async def migrate_legacy_data(self):
+        """이전 스키마 테이블의 데이터를 새 테이블로 옮김 (백그라운드, 파티션 단위)"""
+        while not self.schema_ready:
+            await asyncio.sleep(settings.CLICKHOUSE_HEALTH_INTERVAL)
+        
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(self._get_query_executor(), copy_legacy_partitions, self.client)
+                return
+            except Exception as e:
+                self._record_error(e)
+                log.error("이전 스키마 데이터 이전 실패, 나중에 다시 시도: %s", e)
+                await asyncio.sleep(60)
+    
+    async def add_to_batch(
+        self,
+        event: Dict[str, Any],
+        position: Optional[LogPosition] = None,
+        raw: Optional[bytes] = None,
+        sensor: str = ""
+    ):
+        """배치 버퍼에 이벤트 추가
+
+        position 은 이 이벤트 라인의 끝 위치로, 배치가 저장된 뒤 체크포인트에 기록된다.
+        (position.source 는 source 컬럼에도 기록된다)
+        raw 는 원본 라인 bytes 로, 있으면 raw_json 에 그대로 저장된다.
+        """
+        if self.buffered_events >= settings.INGEST_MAX_BUFFERED_EVENTS:
+            if not await self._apply_backpressure(event.get("event_type")):
+                return
+        
         async with self.batch_lock:
-            self.batch_buffer.append(event)
+            self.batch_buffer.append(event, raw, sensor, position.source if position is not None else "")
+            self.buffered_events += 1
+            if position is not None:
+                self.batch_positions[position.source] = position
             
             if len(self.batch_buffer) >= settings.CLICKHOUSE_BATCH_SIZE:
-                await self.flush_batch()
+                self._seal_locked()
+        
+        self._start_inserts()
+    
+    async def add_prepared_batch(self, batch: RoutedBatch, position: Optional[LogPosition] = None):
+        """워커 프로세스가 미리 만든 배치를 그대로 삽입 대기열에 추가
+
+        position 은 배치의 마지막 라인 끝 위치. 호출 순서대로 seq 가 매겨지므로
+        호출 측은 로그 순서대로 넘겨야 체크포인트가 순서대로 전진한다.
+        drop 정책이면 버릴 수 있는 타입의 테이블만 빼고, 나머지는 spill/block 으로 처리한다.
+        """
+        if self.buffered_events >= settings.INGEST_MAX_BUFFERED_EVENTS:
+            if settings.INGEST_BACKPRESSURE_POLICY == "drop":
+                self._drop_tables(batch)
+            await self._apply_backpressure(None)
+        
+        async with self.batch_lock:
+            # 버퍼에 먼저 들어온 이벤트가 있으면 순서를 지키도록 먼저 봉인
+            self._seal_locked()
+            batch.compute_metrics(stats_tracker)
+            ingest_metrics.batch_size.observe(len(batch))
+            positions = {position.source: position} if position is not None else {}
+            self.pending_batches.append(PendingBatch(self._next_seq, batch, positions))
+            self._next_seq += 1
+            self.buffered_events += len(batch)
+        
+        self._start_inserts()
+    
+    def _drop_tables(self, batch: RoutedBatch):
+        """배치에서 INGEST_DROP_EVENT_TYPES 에 해당하는 테이블 제거"""
+        for event_type in list(batch.batches):
+            if event_type not in settings.INGEST_DROP_EVENT_TYPES:
+                continue
+            dropped = len(batch.batches.pop(event_type))
+            batch.size -= dropped
+            self.dropped_events += dropped
+            ingest_metrics.dropped_events.inc(dropped)
+            log.warning("버퍼 가득 참 - %s 이벤트 %d개 폐기 (누적 %d개)", event_type, dropped, self.dropped_events)
     
     async def flush_batch(self):
-        """배치 버퍼의 데이터를 ClickHouse에 삽입"""
+        """버퍼를 봉인하고 대기 중인 배치를 모두 삽입 (진행 중인 삽입 완료까지 대기)"""
         async with self.batch_lock:
-            if not self.batch_buffer:
-                return
+            self._seal_locked()
+        
+        if self.pending_batches and not (self.is_connected and self.schema_ready):
+            log.warning("ClickHouse 연결 안됨 (또는 스키마 준비 전), 배치 버퍼 유지")
+            return
+        
+        self._start_inserts()
+        # 완료된 삽입이 다음 배치를 이어서 시작하므로 진행 중인 삽입이 없을 때까지 대기
+        while self._inflight:
+            await asyncio.gather(*list(self._inflight), return_exceptions=True)
+    
+    async def _apply_backpressure(self, event_type: Optional[str]) -> bool:
+        """버퍼가 가득 찼을 때 정책 적용. 이벤트를 버렸으면 False"""
+        policy = settings.INGEST_BACKPRESSURE_POLICY
+        
+        if policy == "drop" and event_type in settings.INGEST_DROP_EVENT_TYPES:
+            self.dropped_events += 1
+            ingest_metrics.dropped_events.inc()
+            if self.dropped_events % 10000 == 1:
+                log.warning("버퍼 가득 참 - %s 이벤트 폐기 (누적 %d개)", event_type, self.dropped_events)
+            return False
+        
+        if policy == "spill" and await self._spill_pending():
+            return True
+        
+        # block: 삽입이 완료되어 공간이 생길 때까지 수집 중지
+        while self.buffered_events >= settings.INGEST_MAX_BUFFERED_EVENTS:
+            if not self._blocked_reported:
+                log.warning("버퍼 가득 참 (%d개) - 수집 일시 중지", self.buffered_events)
+                self._blocked_reported = True
+            self._space_available.clear()
+            await self._space_available.wait()
+        return True
+    
+    async def _spill_pending(self) -> bool:
+        """삽입 대기 중인 배치를 오래된 것부터 디스크로 내리기. 스필 용량 초과면 False
+
+        오래된 배치부터 내려야 체크포인트가 연속적으로 전진할 수 있다.
+        """
+        async with self.batch_lock:
+            self._seal_locked()
+        
+        loop = asyncio.get_running_loop()
+        while self.pending_batches and self.buffered_events >= settings.INGEST_MAX_BUFFERED_EVENTS:
+            pending = self.pending_batches.popleft()
+            batches = pending.batch.batches
+            written = True
+            # 테이블별로 스필하고, 기록된 테이블은 재시도 시 다시 쓰지 않도록 배치에서 뺀다
+            for event_type in list(batches):
+                part = batches[event_type]
+                try:
+                    written = await loop.run_in_executor(
+                        self._get_spill_executor(), self.spill_queue.append,
+                        part.table.qualified_name, part.column_names, part.column_data
+                    )
+                except OSError as e:
+                    log.error("스필 기록 실패: %s", e)
+                    written = False
+                if not written:
+                    break
+                del batches[event_type]
             
-            if not self.is_connected:
-                print("⚠ ClickHouse 연결 안됨, 배치 버퍼 유지")
+            if not written:
+                self._requeue(pending)
+                return False
+            
+            self.spilled_batches += 1
+            if self.spilled_batches % 100 == 1:
+                log.warning("ClickHouse 지연 - 배치를 디스크로 스필 (%d bytes)", self.spill_queue.total_bytes)
+            # 디스크에 안전하게 기록되었으므로 체크포인트를 전진시켜도 된다
+            self._complete(pending)
+        
+        return self.buffered_events < settings.INGEST_MAX_BUFFERED_EVENTS
+    
+    def _get_insert_executor(self) -> ThreadPoolExecutor:
+        if self._insert_executor is None:
+            self._insert_executor = ThreadPoolExecutor(
+                max_workers=settings.CLICKHOUSE_MAX_INFLIGHT_INSERTS,
+                thread_name_prefix="clickhouse-insert"
+            )
+        return self._insert_executor
+    
+    def _get_query_executor(self) -> ThreadPoolExecutor:
+        if self._query_executor is None:
+            self._query_executor = ThreadPoolExecutor(
+                max_workers=settings.CLICKHOUSE_POOL_SIZE,
+                thread_name_prefix="clickhouse-query"
+            )
+        return self._query_executor
+    
+    def _get_spill_executor(self) -> ThreadPoolExecutor:
+        # 스필 큐는 단일 스레드에서만 접근
+        if self._spill_executor is None:
+            self._spill_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="clickhouse-spill")
+        return self._spill_executor
+    
+    async def replay_spill(self):
+        """스필된 배치를 ClickHouse 로 재전송 (대기열이 비어 있을 때만)
+
+        연결 오류면 멈췄다가 다음 주기에 같은 레코드부터 다시 보내고,
+        재시도해도 실패할 레코드는 dead letter 로 옮긴 뒤 다음 레코드로 넘어간다.
+        """
+        loop = asyncio.get_running_loop()
+        spill_executor = self._get_spill_executor()
+        
+        while self.is_connected and self.schema_ready and not self.pending_batches:
+            record = await loop.run_in_executor(spill_executor, self.spill_queue.peek)
+            if record is None:
                 return
             
+            table = record.table
+            if table == f"{settings.CLICKHOUSE_DATABASE}.{settings.CLICKHOUSE_TABLE}" \
+                    and self.schema_version >= EVENT_TABLES_VERSION:
+                # 타입별 테이블로 나누기 전에 스필된 배치 (events 는 이제 view)
+                table += WIDE_SUFFIX
             try:
-                rows_dict = []
-                for event in self.batch_buffer:
-                    row = self._prepare_row(event)
-                    rows_dict.append(row)
-                
-                if not rows_dict:
-                    return
-                
-                column_names = list(rows_dict[0].keys())
-                
-                data_to_insert = []
-                for row_dict in rows_dict:
-                    row_list = [row_dict[col] for col in column_names]
-                    data_to_insert.append(row_list)
-                
-                self.client.insert(
-                    f"{settings.CLICKHOUSE_DATABASE}.{settings.CLICKHOUSE_TABLE}",
-                    data_to_insert,
-                    column_names=column_names
+                await loop.run_in_executor(
+                    self._get_insert_executor(), self._insert_columns,
+                    table, record.column_names, record.columns
                 )
-                
-                print(f" ClickHouse에 {len(self.batch_buffer)}개 이벤트 저장 완료")
-                self.batch_buffer.clear()
-                
             except Exception as e:
-                import traceback
-                print(f"✗ ClickHouse 배치 삽입 실패: {e}")
-                print(f"상세 오류:\n{traceback.format_exc()}")
-                # 실패 시 버퍼를 유지하여 다음에 재시도
-    
-    def _prepare_row(self, event: Dict[str, Any]) -> Dict[str, Any]:
-        """이벤트 데이터를 ClickHouse 행 형식으로 변환"""
-        import json
-        from dateutil import parser
-        
-        # timestamp 변환 (ISO 문자열 -> datetime 객체)
-        timestamp_str = event.get('timestamp')
-        if timestamp_str:
-            try:
-                timestamp = parser.isoparse(timestamp_str)
-            except:
-                timestamp = datetime.now()
-        else:
-            timestamp = datetime.now()
-        
-        row = {
-            'timestamp': timestamp,
-            'event_type': event.get('event_type', 'unknown'),
-            'src_ip': event.get('src_ip', '0.0.0.0'),
-            'src_port': event.get('src_port', 0),
-            'dest_ip': event.get('dest_ip', '0.0.0.0'),
-            'dest_port': event.get('dest_port', 0),
-            'proto': event.get('proto', 'unknown'),
-            'raw_json': json.dumps(event, ensure_ascii=False),
-            'date': timestamp.date(),  # date 컬럼 추가
-            
-            'alert_signature': None,
-            'alert_category': None,
-            'alert_severity': None,
-            'alert_action': None,
-            
-            'flow_id': None,
-            'flow_pkts_toserver': None,
-            'flow_pkts_toclient': None,
-            'flow_bytes_toserver': None,
-            'flow_bytes_toclient': None,
-            'flow_start': None,
-            'flow_end': None,
-            'flow_age': None,
-            'flow_state': None,
-            'flow_reason': None,
-            
-            'http_hostname': None,
-            'http_url': None,
-            'http_http_user_agent': None,
-            'http_http_method': None,
-            'http_protocol': None,
-            'http_status': None,
-            'http_length': None,
-            
-            'dns_type': None,
-            'dns_id': None,
-            'dns_rrname': None,
-            'dns_rrtype': None,
-            'dns_rcode': None,
+                if is_retryable(e) or not self.schema_ready or not self.is_connected:
+                    log.error("스필 배치 재전송 실패: %s", e)
+                    return
+                # 다시 보내도 실패할 레코드는 dead letter 로 옮기고 다음 레코드로 진행
+                ingest_metrics.insert_errors.inc()
+                await self._dead_letter(table, record.column_names, record.columns, e)
+            else:
+                log.info("스필된 배치 %d개 이벤트 재전송 완료", len(record.columns[0]))
             
-            'tls_subject': None,
-            'tls_issuerdn': None,
-            'tls_fingerprint': None,
-            'tls_sni': None,
-            'tls_version': None,
-        }
+            await loop.run_in_executor(spill_executor, self.spill_queue.advance, record)
+    
+    def _seal_locked(self):
+        """현재 버퍼를 삽입 대기열로 옮기고 새 버퍼로 교체 (batch_lock 필요)"""
+        if not self.batch_buffer:
+            return
         
-        if 'alert' in event:
-            alert = event['alert']
-            row['alert_signature'] = alert.get('signature')
-            row['alert_category'] = alert.get('category')
-            row['alert_severity'] = alert.get('severity')
-            row['alert_action'] = alert.get('action')
+        # stats delta 는 로그 순서대로 계산되어야 하므로 seq 를 매길 때 함께
+        self.batch_buffer.compute_metrics(stats_tracker)
+        ingest_metrics.batch_size.observe(len(self.batch_buffer))
+        self.pending_batches.append(
+            PendingBatch(self._next_seq, self.batch_buffer, self.batch_positions)
+        )
+        self._next_seq += 1
+        self.batch_buffer = RoutedBatch()
+        self.batch_positions = {}
+    
+    def _start_inserts(self):
+        """동시 삽입 한도 내에서 대기 중인 배치 전송 시작
+
+        스키마 마이그레이션이 끝나기 전(schema_ready)에는 삽입하지 않는다.
+        rollup backfill 과 materialized view 생성 사이에 삽입된 행은 두 번 집계되기 때문.
+        """
+        if not self.pending_batches:
+            return
         
-        if 'flow' in event:
-            flow = event['flow']
-            row['flow_id'] = flow.get('flow_id')
-            row['flow_pkts_toserver'] = flow.get('pkts_toserver')
-            row['flow_pkts_toclient'] = flow.get('pkts_toclient')
-            row['flow_bytes_toserver'] = flow.get('bytes_toserver')
-            row['flow_bytes_toclient'] = flow.get('bytes_toclient')
-            
-            # flow_start, flow_end를 datetime 객체로 변환
-            from dateutil import parser as date_parser
-            flow_start_str = flow.get('start')
-            flow_end_str = flow.get('end')
-            if flow_start_str:
-                try:
-                    row['flow_start'] = date_parser.isoparse(flow_start_str)
-                except:
-                    pass
-            if flow_end_str:
-                try:
-                    row['flow_end'] = date_parser.isoparse(flow_end_str)
-                except:
-                    pass
-            
-            row['flow_age'] = flow.get('age')
-            row['flow_state'] = flow.get('state')
-            row['flow_reason'] = flow.get('reason')
+        if not self.is_connected or not self.schema_ready:
+            return
         
-        if 'http' in event:
-            http = event['http']
-            row['http_hostname'] = http.get('hostname')
-            row['http_url'] = http.get('url')
-            row['http_http_user_agent'] = http.get('http_user_agent')
-            row['http_http_method'] = http.get('http_method')
-            row['http_protocol'] = http.get('protocol')
-            row['http_status'] = http.get('status')
-            row['http_length'] = http.get('length')
+        while self.pending_batches and len(self._inflight) < settings.CLICKHOUSE_MAX_INFLIGHT_INSERTS:
+            pending = self.pending_batches.popleft()
+            task = asyncio.create_task(self._insert_pending(pending))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+    
+    async def _insert_pending(self, pending: PendingBatch):
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            rejected = await loop.run_in_executor(self._get_insert_executor(), self._insert_sync, pending.batch)
+        except Exception as e:
+            ingest_metrics.insert_errors.inc()
+            log.error("ClickHouse 배치 삽입 실패: %s", e)
+            # 실패한 배치는 다음 flush 때 재시도
+            self._requeue(pending)
+            return
         
-        if 'dns' in event:
-            dns = event['dns']
-            row['dns_type'] = dns.get('type')
-            row['dns_id'] = dns.get('id')
-            row['dns_rrname'] = dns.get('rrname')
-            row['dns_rrtype'] = dns.get('rrtype')
-            row['dns_rcode'] = dns.get('rcode')
+        # 삽입 스레드 수 = 동시 삽입 한도라 executor 대기 없이 삽입 시간만 측정된다
+        ingest_metrics.insert_duration.observe(time.perf_counter() - started)
+        rejected_events = 0
+        for event_type, error in rejected.items():
+            ingest_metrics.insert_errors.inc()
+            part = pending.batch.batches.pop(event_type)
+            rejected_events += len(part)
+            await self._dead_letter(part.table.qualified_name, part.column_names, part.column_data, error)
+        ingest_metrics.inserted_events.inc(len(pending.batch) - rejected_events)
+        log.debug("ClickHouse에 %d개 이벤트 저장 완료", len(pending.batch) - rejected_events)
+        self._complete(pending)
+        self._start_inserts()
+    
+    async def _dead_letter(self, table: str, column_names: List[str], columns: List[Sequence], error: Exception):
+        """삽입할 수 없는 테이블 배치를 dead letter 큐로 옮기기 (기록 실패 시 폐기)"""
+        count = len(columns[0]) if columns else 0
+        self.dead_letter_events += count
+        ingest_metrics.dead_letter_events.inc(count, (table,))
+        loop = asyncio.get_running_loop()
+        try:
+            written = await loop.run_in_executor(
+                self._get_spill_executor(), self.dead_letters.append, table, column_names, columns
+            )
+        except Exception as e:
+            log.error("dead letter 기록 실패: %s", e)
+            written = False
+        if written:
+            log.error(
+                "%s 배치 %d개 이벤트 삽입 불가 - dead letter 로 이동 (%s): %s",
+                table, count, settings.INGEST_DEAD_LETTER_DIR, error
+            )
+        else:
+            log.error("%s 배치 %d개 이벤트 삽입 불가 - 폐기: %s", table, count, error)
+    
+    def _requeue(self, pending: PendingBatch):
+        """실패한 배치를 seq 순서를 지켜 대기열에 다시 넣기"""
+        index = 0
+        for queued in self.pending_batches:
+            if queued.seq > pending.seq:
+                break
+            index += 1
+        self.pending_batches.insert(index, pending)
+    
+    def _insert_sync(self, batch: RoutedBatch) -> Dict[str, Exception]:
+        """삽입 스레드에서 실행 - 이벤트 타입별 테이블에 차례로 삽입
+
+        성공한 테이블은 배치에서 빼서, 중간에 실패해 재시도할 때 중복 삽입되지 않게 한다.
+        재시도해도 실패할 오류로 거부된 테이블은 배치에 남기고 {event_type: 오류} 로 반환하며,
+        연결 오류는 그대로 발생시켜 배치 전체를 재시도하게 한다.
+        """
+        rejected: Dict[str, Exception] = {}
+        for event_type in list(batch.batches):
+            part = batch.batches[event_type]
+            try:
+                self._insert_columns(part.table.qualified_name, part.column_names, part.column_data)
+            except Exception as e:
+                # 스키마 준비 전에는 테이블/컬럼이 없어서 실패할 수 있으므로 재시도
+                if is_retryable(e) or not self.schema_ready or not self.is_connected:
+                    raise
+                rejected[event_type] = e
+                continue
+            del batch.batches[event_type]
+        return rejected
+    
+    def _insert_columns(self, table: str, column_names: List[str], columns: List[Sequence]):
+        try:
+            with self._acquire() as client:
+                client.insert(
+                    table,
+                    columns,
+                    column_names=column_names,
+                    column_oriented=True
+                )
+        except Exception as e:
+            self._record_error(e)
+            raise
+    
+    def _complete(self, pending: PendingBatch):
+        """삽입(또는 스필) 완료 처리 - 앞선 배치가 모두 끝난 경우에만 체크포인트 전진"""
+        # 배치 데이터는 더 이상 필요 없으므로 위치와 개수만 보관
+        self._completed[pending.seq] = (pending.positions, len(pending.batch))
+        self.buffered_events -= len(pending.batch)
+        if self.buffered_events < settings.INGEST_MAX_BUFFERED_EVENTS:
+            self._space_available.set()
+            if self.buffered_events < settings.INGEST_MAX_BUFFERED_EVENTS // 2:
+                self._blocked_reported = False
+        
+        positions: Dict[str, LogPosition] = {}
+        event_count = 0
+        while self._next_commit_seq in self._completed:
+            done_positions, done_count = self._completed.pop(self._next_commit_seq)
+            positions.update(done_positions)
+            event_count += done_count
+            self._next_commit_seq += 1
         
-        if 'tls' in event:
-            tls = event['tls']
-            row['tls_subject'] = tls.get('subject')
-            row['tls_issuerdn'] = tls.get('issuerdn')
-            row['tls_fingerprint'] = tls.get('fingerprint')
-            row['tls_sni'] = tls.get('sni')
-            row['tls_version'] = tls.get('version')
+        if not positions:
+            return
         
-        return row
+        # 삽입이 성공한 뒤에만 체크포인트 기록
+        try:
+            ingest_checkpoint.commit(positions, event_count)
+        except OSError as e:
+            log.error("체크포인트 저장 실패: %s", e)
     
     async def periodic_flush(self):
         """주기적으로 배치 버퍼 플러시 (백그라운드 태스크)"""
         while True:
             await asyncio.sleep(settings.CLICKHOUSE_BATCH_INTERVAL)
             await self.flush_batch()
+            await self.replay_spill()
 
 clickhouse_client = ClickHouseClient()
+ingest_metrics.buffered_events.set_function(lambda: clickhouse_client.buffered_events)
+ingest_metrics.pending_batches.set_function(lambda: len(clickhouse_client.pending_batches))
+ingest_metrics.spill_bytes.set_function(lambda: clickhouse_client.spill_queue.total_bytes)
+ingest_metrics.clickhouse_connected.set_function(lambda: int(clickhouse_client.is_connected))
@@ -0,0 +1,226 @@
+"""ClickHouse 스키마 버전 관리
+
+적용된 마이그레이션 버전은 {database}.schema_migrations 테이블에 기록하고,
+시작 시 아직 적용되지 않은 마이그레이션을 버전 순서대로 실행한다.
+
+마이그레이션은 이미 일부 적용된 DB 에서도 안전하도록 IF NOT EXISTS 형태로 작성한다.
+운영 중인 테이블을 바꿀 때는 아래 helper 처럼 온라인으로 가능한 단계만 사용한다.
+- ADD COLUMN (메타데이터만 변경, 기존 파트는 DEFAULT 로 읽힘)
+- MATERIALIZE COLUMN/INDEX, MODIFY TTL (백그라운드 mutation, 기다리지 않음)
+ORDER BY/파티션 키 변경처럼 테이블을 다시 써야 하는 변경은
+clickhouse_schema 의 테이블 교체 + 파티션 복사 방식을 따른다.
+"""
+import logging
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from clickhouse_connect.driver.client import Client
+
+from app.core.config import settings
+from app.util.clickhouse_rollups import drop_rollup_views, drop_rollups, ensure_rollups
+from app.util.clickhouse_schema import (
+    WIDE_SUFFIX, events_table_ddl, replace_legacy_events_table, table_engine, table_exists
+)
+from app.util.event_tables import (
+    EVENT_TABLES, ORIGIN_COLUMNS, ORIGIN_TYPE, EventTable, compat_view_ddl, event_table_ddl, field_columns,
+    field_definition, table_fields
+)
+from app.util.stats_metrics import metrics_table_ddl
+
+log = logging.getLogger(__name__)
+
+MIGRATIONS_TABLE = "schema_migrations"
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable[[Client], None]
+
+
+def _table(name: str) -> str:
+    return f"{settings.CLICKHOUSE_DATABASE}.{name}"
+
+
+# 온라인 변경 helper --------------------------------------------------------
+
+def add_column(client: Client, table: str, column: str, definition: str, after: Optional[str] = None):
+    """컬럼 추가 (기존 데이터는 다시 쓰지 않음)"""
+    position = f" AFTER {after}" if after else ""
+    client.command(f"ALTER TABLE {_table(table)} ADD COLUMN IF NOT EXISTS {column} {definition}{position}")
+
+
+def materialize_column(client: Client, table: str, column: str):
+    """DEFAULT/MATERIALIZED 컬럼 값을 기존 파트에 기록 (백그라운드 mutation)"""
+    client.command(
+        f"ALTER TABLE {_table(table)} MATERIALIZE COLUMN {column}",
+        settings={"mutations_sync": 0}
+    )
+
+
+def add_index(client: Client, table: str, index: str, definition: str):
+    """skip index 추가 후 기존 파트에도 생성 (백그라운드 mutation)"""
+    client.command(f"ALTER TABLE {_table(table)} ADD INDEX IF NOT EXISTS {index} {definition}")
+    client.command(
+        f"ALTER TABLE {_table(table)} MATERIALIZE INDEX {index}",
+        settings={"mutations_sync": 0}
+    )
+
+
+def modify_default(client: Client, table: str, column: str, default: str):
+    """컬럼 DEFAULT 식 변경 (메타데이터만 변경)"""
+    client.command(f"ALTER TABLE {_table(table)} MODIFY COLUMN {column} DEFAULT {default}")
+
+
+def modify_ttl(client: Client, table: str, ttl: str):
+    """TTL 변경 (기존 파트는 다음 merge 때 적용되도록 즉시 재계산하지 않음)"""
+    client.command(
+        f"ALTER TABLE {_table(table)} MODIFY TTL {ttl}",
+        settings={"materialize_ttl_after_modify": 0}
+    )
+
+
+def table_column_defaults(client: Client, table: str) -> Dict[str, str]:
+    """실제 테이블 컬럼 -> default_kind ('' 이면 DEFAULT 없음)"""
+    rows = client.query(
+        "SELECT name, default_kind FROM system.columns WHERE database = {database:String} AND table = {table:String}",
+        parameters={"database": settings.CLICKHOUSE_DATABASE, "table": table}
+    ).result_rows
+    return {name: default_kind for name, default_kind in rows}
+
+
+def sync_event_table(client: Client, event_table: EventTable):
+    """EVENT_TABLES 에 새로 정의된 필드를 기존 테이블에 컬럼으로 추가"""
+    client.command(event_table_ddl(event_table))
+    existing = table_column_defaults(client, event_table.name)
+    for field in table_fields(event_table):
+        if field_columns(field)[0] not in existing:
+            add_column(client, event_table.name, field.column, field_definition(field))
+
+
+# 마이그레이션 목록 (버전은 증가만, 이미 배포된 항목은 수정하지 않는다) ------------
+
+def _create_events(client: Client):
+    client.command(events_table_ddl(settings.CLICKHOUSE_TABLE))
+    # 이전 스키마 테이블이면 교체 (기존 데이터는 백그라운드에서 파티션 단위로 옮김)
+    replace_legacy_events_table(client, drop_rollups)
+
+
+def _create_rollups(client: Client):
+    ensure_rollups(client)
+
+
+def _split_event_tables(client: Client):
+    for event_table in EVENT_TABLES.values():
+        client.command(event_table_ddl(event_table))
+
+    database = settings.CLICKHOUSE_DATABASE
+    table = settings.CLICKHOUSE_TABLE
+    if table_engine(client, table) not in (None, "View"):
+        # materialized view 는 원본 테이블 이름에 묶여 있으므로 지우고 새 원본 기준으로 다시 만든다
+        drop_rollup_views(client)
+        # 기존 데이터는 옮기지 않고 compat view 에 포함시켜 TTL 까지 조회되게 둔다
+        client.command(f"RENAME TABLE {database}.{table} TO {database}.{table}{WIDE_SUFFIX}")
+    client.command(compat_view_ddl(table_exists(client, table + WIDE_SUFFIX)))
+    ensure_rollups(client)
+
+
+def _extend_eve_fields(client: Client):
+    for event_table in EVENT_TABLES.values():
+        sync_event_table(client, event_table)
+        # raw_json 저장을 끌 수 있도록 빈 문자열 DEFAULT
+        modify_default(client, event_table.name, "raw_json", "''")
+    # 새 타입 테이블(drop/ssh/smtp)을 view 와 rollup 에 포함
+    table = settings.CLICKHOUSE_TABLE
+    client.command(compat_view_ddl(table_exists(client, table + WIDE_SUFFIX)))
+    ensure_rollups(client)
+
+
+def _add_origin_columns(client: Client):
+    for event_table in EVENT_TABLES.values():
+        client.command(event_table_ddl(event_table))
+        after = "dest_port"
+        for column in ORIGIN_COLUMNS:
+            add_column(client, event_table.name, column, f"{ORIGIN_TYPE} DEFAULT ''", after=after)
+            after = column
+    table = settings.CLICKHOUSE_TABLE
+    client.command(compat_view_ddl(table_exists(client, table + WIDE_SUFFIX)))
+
+
+def _create_metrics_table(client: Client):
+    client.command(metrics_table_ddl())
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "events 테이블 (LowCardinality/IPv6/codec/skip index 스키마)", _create_events),
+    Migration(2, "통계 rollup 테이블 + materialized view", _create_rollups),
+    Migration(3, "이벤트 타입별 테이블 + events compat view", _split_event_tables),
+    Migration(4, "EVE 필드 확장 (Array/Nested/Map 컬럼, drop/ssh/smtp 테이블)", _extend_eve_fields),
+    Migration(5, "sensor/source 컬럼 (여러 센서/파일 수집)", _add_origin_columns),
+    Migration(6, "stats 이벤트 카운터 시계열 테이블", _create_metrics_table),
+]
+
+# 이 버전까지 적용되어야 통계를 rollup 에서 읽는다
+ROLLUPS_VERSION = 2
+# 수집기가 쓰는 타입별 테이블/컬럼(EVENT_TABLES, metrics 테이블)이 모두 준비되는 버전 (바꾸면 올린다)
+EVENT_TABLES_VERSION = 6
+
+
+def ensure_migrations_table(client: Client):
+    client.command(f"""
+    CREATE TABLE IF NOT EXISTS {_table(MIGRATIONS_TABLE)}
+    (
+        version UInt32,
+        description String,
+        applied_at DateTime64(3) DEFAULT now64(3),
+        duration_ms UInt64
+    )
+    ENGINE = MergeTree()
+    ORDER BY version
+    """)
+
+
+def current_version(client: Client) -> int:
+    result = client.query(f"SELECT max(version) FROM {_table(MIGRATIONS_TABLE)}")
+    return (result.result_rows[0][0] or 0) if result.result_rows else 0
+
+
+def run_migrations(client: Client, migrations: List[Migration] = MIGRATIONS) -> int:
+    """적용되지 않은 마이그레이션을 순서대로 실행. 적용 후 버전 반환
+
+    실패하면 그 버전에서 멈추고 예외를 올린다 (이전 버전까지는 기록되어 있음).
+    """
+    ensure_migrations_table(client)
+    version = current_version(client)
+
+    for migration in sorted(migrations, key=lambda m: m.version):
+        if migration.version <= version:
+            continue
+        log.info("마이그레이션 %d: %s", migration.version, migration.description)
+        started = time.monotonic()
+        migration.apply(client)
+        client.insert(
+            _table(MIGRATIONS_TABLE),
+            [[migration.version, migration.description, int((time.monotonic() - started) * 1000)]],
+            column_names=["version", "description", "duration_ms"]
+        )
+        version = migration.version
+
+    return version
+
+
+def check_column_drift(client: Client, table: str, column_names: List[str]) -> Dict[str, List[str]]:
+    """배치가 만드는 컬럼과 실제 테이블 컬럼 비교
+
+    missing: 배치에는 있는데 테이블에 없는 컬럼 (삽입 실패)
+    unfilled: 테이블에만 있고 DEFAULT 도 없는 컬럼 (항상 타입 기본값으로 채워짐)
+    """
+    table_columns = table_column_defaults(client, table)
+    batch_columns = set(column_names)
+    return {
+        "missing": [name for name in column_names if name not in table_columns],
+        "unfilled": sorted(
+            name for name, default_kind in table_columns.items()
+            if name not in batch_columns and not default_kind
+        ),
+    }
@@ -0,0 +1,148 @@
+import re
+import time
+import queue
+import random
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from clickhouse_connect.driver.client import Client
+from clickhouse_connect.driver.exceptions import OperationalError
+
+# 다시 보내면 성공할 수 있는 서버 오류 코드
+# (TIMEOUT_EXCEEDED, TOO_MANY_SIMULTANEOUS_QUERIES, SOCKET_TIMEOUT, NETWORK_ERROR,
+#  MEMORY_LIMIT_EXCEEDED, TABLE_IS_READ_ONLY, TOO_MANY_PARTS, KEEPER_EXCEPTION)
+RETRYABLE_SERVER_CODES = frozenset((159, 202, 209, 210, 241, 242, 252, 999))
+_ERROR_CODE = re.compile(r"\bCode:\s*(\d+)")
+
+
+def is_retryable(error: BaseException) -> bool:
+    """연결/일시적 서버 오류면 True (그 외 데이터/쿼리 오류는 재시도해도 같은 결과)"""
+    if isinstance(error, (OperationalError, OSError, queue.Empty)):
+        return True
+    code = getattr(error, "code", None)
+    if code is None:
+        match = _ERROR_CODE.search(str(error))
+        code = int(match.group(1)) if match else None
+    return code in RETRYABLE_SERVER_CODES
+
+
+class ConnectionHealth:
+    """ClickHouse 연결 상태 추적 (재연결 backoff 포함)"""
+
+    def __init__(self, backoff_min: float, backoff_max: float):
+        self.backoff_min = backoff_min
+        self.backoff_max = backoff_max
+        self.state = "disconnected"  # connected | disconnected | connecting
+        self.last_ok_at: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+        self.last_error_at: Optional[datetime] = None
+        self.consecutive_failures = 0
+        self.reconnects = 0
+        self.next_retry_at = 0.0  # time.monotonic() 기준
+        self._lock = threading.Lock()
+
+    @property
+    def connected(self) -> bool:
+        return self.state == "connected"
+
+    def record_ok(self):
+        with self._lock:
+            if self.state != "connected" and self.last_ok_at is not None:
+                self.reconnects += 1
+            self.state = "connected"
+            self.last_ok_at = datetime.now(timezone.utc)
+            self.consecutive_failures = 0
+            self.next_retry_at = 0.0
+
+    def record_failure(self, error: BaseException):
+        """연결 실패 기록 후 다음 재시도 시각 계산 (지수 backoff + jitter)"""
+        with self._lock:
+            self.state = "disconnected"
+            self.last_error = f"{type(error).__name__}: {error}"
+            self.last_error_at = datetime.now(timezone.utc)
+            self.consecutive_failures += 1
+            delay = min(self.backoff_max, self.backoff_min * (2 ** (self.consecutive_failures - 1)))
+            delay *= random.uniform(0.8, 1.2)
+            self.next_retry_at = time.monotonic() + delay
+
+    def retry_due(self) -> bool:
+        return time.monotonic() >= self.next_retry_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "last_ok_at": self.last_ok_at,
+            "last_error": self.last_error,
+            "last_error_at": self.last_error_at,
+            "consecutive_failures": self.consecutive_failures,
+            "reconnects": self.reconnects,
+            "next_retry_in": max(0.0, self.next_retry_at - time.monotonic()) if self.state != "connected" else None,
+        }
+
+
+class ClickHousePool:
+    """스레드 간에 나눠 쓰는 ClickHouse 클라이언트 풀
+
+    clickhouse-connect 클라이언트는 한 번에 한 스레드에서만 쓰도록 빌려주고 돌려받는다.
+    close() 후에 반납되는 클라이언트는 그때 닫고, 기다리던 acquire 는 ConnectionError 로 깨운다
+    (재연결 시 새 풀로 교체한 뒤 이전 풀을 닫아도 사용 중인 클라이언트를 건드리지 않는다).
+    """
+
+    def __init__(self, factory: Callable[[], Client], size: int):
+        self.factory = factory
+        self.size = size
+        # None 은 close() 가 넣는 종료 신호
+        self._idle: "queue.Queue[Optional[Client]]" = queue.Queue()
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def open(self):
+        """클라이언트 생성 (생성 시 서버 ping 수행, 실패하면 예외)"""
+        try:
+            for _ in range(self.size):
+                self._idle.put(self.factory())
+        except Exception:
+            self.close()
+            raise
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None) -> Iterator[Client]:
+        client = self._idle.get(timeout=timeout)
+        if client is None:
+            # 다른 대기자도 깨어나도록 신호를 되돌려 둔다
+            self._idle.put(None)
+            raise ConnectionError("ClickHouse 풀이 닫힘")
+        try:
+            yield client
+        finally:
+            with self._lock:
+                if self._closed:
+                    _close_quietly(client)
+                else:
+                    self._idle.put(client)
+
+    @property
+    def idle(self) -> int:
+        return 0 if self._closed else self._idle.qsize()
+
+    def close(self):
+        """대기 중인 클라이언트는 바로 닫고, 빌려 간 클라이언트는 반납될 때 닫는다"""
+        with self._lock:
+            self._closed = True
+            while True:
+                try:
+                    client = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                if client is not None:
+                    _close_quietly(client)
+            self._idle.put(None)
+
+
+def _close_quietly(client: Client):
+    try:
+        client.close()
+    except Exception:
+        pass
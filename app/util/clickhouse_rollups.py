@@ -0,0 +1,212 @@
+"""ClickHouse 사전 집계(rollup) 테이블
+
+events 테이블에 삽입될 때마다 materialized view 가 분/시간 단위로 미리 합산해
+rollup 테이블에 넣는다. 통계 API 는 원본 대신 이 테이블을 읽는다.
+
+이벤트 타입별 테이블로 나뉜 뒤에는 rollup 마다 해당 타입 테이블(+ 이전 단일 테이블)에
+각각 materialized view 를 둔다 (view 는 삽입된 테이블 기준으로만 동작).
+
+rollup 테이블을 처음 만들 때 기존 events 데이터로 한 번 채운다(backfill).
+materialized view 를 먼저 만든 뒤 backfill 하므로 그 사이에 들어온 삽입은
+집계가 두 번 될 수 있다. 그래서 마이그레이션(ensure_database)이 끝나
+schema_ready 가 되기 전에는 수집기가 삽입하지 않는다 (재연결 후 마이그레이션 포함).
+"""
+import logging
+from typing import List, NamedTuple, Optional, Tuple
+
+from clickhouse_connect.driver.client import Client
+
+from app.core.config import settings
+from app.util.clickhouse_schema import WIDE_SUFFIX, table_engine, table_exists
+from app.util.event_tables import EVENT_TABLES
+
+log = logging.getLogger(__name__)
+
+
+class Rollup(NamedTuple):
+    """rollup 테이블 1개와 이를 채우는 materialized view"""
+    name: str
+    columns: str
+    engine: str
+    order_by: str
+    time_column: str
+    select: str  # {source} 에 원본 테이블, {event_type} 에 event_type 식이 들어감
+    event_types: Optional[Tuple[str, ...]] = None  # 읽는 타입별 테이블 (None = 전체)
+
+
+ROLLUPS: List[Rollup] = [
+    # 분 단위 이벤트 타입별 개수
+    Rollup(
+        name="events_by_type_1m",
+        columns="""
+            minute DateTime CODEC(Delta, ZSTD),
+            event_type LowCardinality(String),
+            count UInt64
+        """,
+        engine="SummingMergeTree",
+        order_by="(event_type, minute)",
+        time_column="minute",
+        select="""
+            SELECT toStartOfMinute(timestamp) AS minute, {event_type} AS event_type, count() AS count
+            FROM {source}
+            GROUP BY minute, event_type
+        """,
+    ),
+    # 분 단위 alert 심각도별 개수 (심각도 없음 = 0)
+    Rollup(
+        name="alerts_by_severity_1m",
+        columns="""
+            minute DateTime CODEC(Delta, ZSTD),
+            alert_severity UInt8,
+            count UInt64
+        """,
+        engine="SummingMergeTree",
+        order_by="(alert_severity, minute)",
+        time_column="minute",
+        select="""
+            SELECT toStartOfMinute(timestamp) AS minute, ifNull(alert_severity, 0) AS alert_severity, count() AS count
+            FROM {source}
+            WHERE {event_type} = 'alert'
+            GROUP BY minute, alert_severity
+        """,
+        event_types=("alert",),
+    ),
+    # 시간 단위 시그니처별 개수 + 마지막 발생 시각
+    Rollup(
+        name="alert_signatures_1h",
+        columns="""
+            hour DateTime CODEC(Delta, ZSTD),
+            alert_signature String,
+            count SimpleAggregateFunction(sum, UInt64),
+            last_seen SimpleAggregateFunction(max, DateTime64(6))
+        """,
+        engine="AggregatingMergeTree",
+        order_by="(hour, alert_signature)",
+        time_column="hour",
+        select="""
+            SELECT toStartOfHour(timestamp) AS hour, assumeNotNull(alert_signature) AS alert_signature,
+                   count() AS count, max(timestamp) AS last_seen
+            FROM {source}
+            WHERE {event_type} = 'alert' AND alert_signature IS NOT NULL
+            GROUP BY hour, alert_signature
+        """,
+        event_types=("alert",),
+    ),
+    # 시간 단위 출발지 IP별 이벤트/alert 개수
+    Rollup(
+        name="src_ips_1h",
+        columns="""
+            hour DateTime CODEC(Delta, ZSTD),
+            src_ip IPv6,
+            count UInt64,
+            alert_count UInt64
+        """,
+        engine="SummingMergeTree",
+        order_by="(hour, src_ip)",
+        time_column="hour",
+        select="""
+            SELECT toStartOfHour(timestamp) AS hour, src_ip, count() AS count,
+                   countIf({event_type} = 'alert') AS alert_count
+            FROM {source}
+            WHERE src_ip != toIPv6('::ffff:0.0.0.0')
+            GROUP BY hour, src_ip
+        """,
+    ),
+    # 시간 단위 HTTP 메소드별 개수
+    Rollup(
+        name="http_methods_1h",
+        columns="""
+            hour DateTime CODEC(Delta, ZSTD),
+            method LowCardinality(String),
+            count UInt64
+        """,
+        engine="SummingMergeTree",
+        order_by="(hour, method)",
+        time_column="hour",
+        select="""
+            SELECT toStartOfHour(timestamp) AS hour, assumeNotNull(http_http_method) AS method, count() AS count
+            FROM {source}
+            WHERE {event_type} = 'http' AND ifNull(http_http_method, '') != ''
+            GROUP BY hour, method
+        """,
+        event_types=("http",),
+    ),
+]
+
+
+def rollup_table(name: str) -> str:
+    return f"{settings.CLICKHOUSE_DATABASE}.{name}"
+
+
+def rollup_sources(client: Client, rollup: Rollup) -> List[Tuple[str, str, str]]:
+    """rollup 을 채우는 원본 테이블 목록 (view 이름 접미사, 테이블, event_type 식)
+
+    events 가 아직 단일 테이블이면 그 테이블 하나, view 로 바뀌었으면 타입별 테이블과
+    남아 있는 이전 단일 테이블({table}_wide).
+    """
+    database = settings.CLICKHOUSE_DATABASE
+    table = settings.CLICKHOUSE_TABLE
+    if table_engine(client, table) != "View":
+        return [("", f"{database}.{table}", "event_type")]
+
+    sources = [
+        (f"_{event_table.event_type}", event_table.qualified_name, event_table.event_type_expr)
+        for event_table in EVENT_TABLES.values()
+        if rollup.event_types is None or event_table.event_type in rollup.event_types
+    ]
+    if table_exists(client, table + WIDE_SUFFIX):
+        sources.append(("", f"{database}.{table}{WIDE_SUFFIX}", "event_type"))
+    return sources
+
+
+def ensure_rollups(client: Client) -> List[str]:
+    """rollup 테이블/materialized view 생성, 새로 만든 rollup 은 backfill. 생성한 이름 목록 반환"""
+    database = settings.CLICKHOUSE_DATABASE
+    existing = {row[0] for row in client.query(
+        "SELECT name FROM system.tables WHERE database = {database:String}",
+        parameters={"database": database}
+    ).result_rows}
+
+    created = []
+    for rollup in ROLLUPS:
+        table = rollup_table(rollup.name)
+        sources = rollup_sources(client, rollup)
+
+        if rollup.name not in existing:
+            client.command(f"""
+            CREATE TABLE IF NOT EXISTS {table}
+            ({rollup.columns})
+            ENGINE = {rollup.engine}()
+            PARTITION BY toYYYYMM({rollup.time_column})
+            ORDER BY {rollup.order_by}
+            TTL {rollup.time_column} + INTERVAL {settings.CLICKHOUSE_ROLLUP_TTL_DAYS} DAY
+            """)
+            created.append(rollup.name)
+
+        for suffix, source, event_type in sources:
+            view = f"{rollup.name}_mv{suffix}"
+            select = rollup.select.format(source=source, event_type=event_type)
+            if view not in existing:
+                client.command(f"CREATE MATERIALIZED VIEW IF NOT EXISTS {rollup_table(view)} TO {table} AS {select}")
+            if rollup.name in created:
+                # 기존 데이터로 채우기 (view 가 생성된 이후 삽입분은 view 가 처리)
+                client.command(f"INSERT INTO {table} {select}")
+
+        if rollup.name in created:
+            log.info("rollup created: %s", rollup.name)
+
+    return created
+
+
+def drop_rollup_views(client: Client):
+    """rollup 을 채우는 materialized view 만 제거 (rollup 데이터는 유지)"""
+    for rollup in ROLLUPS:
+        for suffix in [""] + [f"_{event_type}" for event_type in EVENT_TABLES]:
+            client.command(f"DROP VIEW IF EXISTS {rollup_table(f'{rollup.name}_mv{suffix}')}")
+
+
+def drop_rollups(client: Client):
+    """rollup materialized view 와 테이블 제거 (events 테이블 교체 전)"""
+    drop_rollup_views(client)
+    for rollup in ROLLUPS:
+        client.command(f"DROP TABLE IF EXISTS {rollup_table(rollup.name)}")
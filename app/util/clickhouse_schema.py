@@ -0,0 +1,225 @@
+"""ClickHouse events 단일 테이블 스키마 (이벤트 타입별 테이블로 나누기 전)
+
+현재 수집은 event_tables 의 타입별 테이블에 기록하고, 이 스키마의 테이블은
+{table}_wide 로 남아 compat view 를 통해 TTL 까지 조회된다.
+
+- 값 종류가 적은 문자열은 LowCardinality, IP 는 IPv6 (IPv4 는 ::ffff:a.b.c.d 로 저장)
+- timestamp 는 Delta+ZSTD, 정렬되지 않은 카운터는 T64+ZSTD, 긴 문자열은 ZSTD
+- IP/시그니처/SNI/rrname 에 bloom filter skip index
+
+이전 스키마(모든 문자열/IP 가 String)의 테이블은 새 스키마 테이블로 교체한 뒤
+기존 파티션을 하나씩 새 테이블로 다시 써 넣는다 (copy_legacy_partitions).
+교체가 먼저 일어나므로 수집은 곧바로 새 테이블에 기록되고, 옮기는 중에는
+과거 데이터 일부가 조회되지 않을 수 있다.
+"""
+import logging
+import re
+from ipaddress import IPv6Address, ip_address, ip_network
+from typing import Any, Optional, Tuple
+
+from clickhouse_connect.driver.client import Client
+
+from app.core.config import settings
+
+log = logging.getLogger(__name__)
+
+LEGACY_SUFFIX = "_legacy"
+# 이벤트 타입별 테이블로 나누기 전의 단일 테이블 (compat view 에 포함되어 TTL 까지 조회됨)
+WIDE_SUFFIX = "_wide"
+
+
+# 이전(단일 테이블) 스키마의 컬럼 (이름, 타입, 코덱)
+WIDE_COLUMNS: Tuple[Tuple[str, str, str], ...] = (
+    ("timestamp", "DateTime64(6)", "Delta, ZSTD(1)"),
+    ("event_type", "LowCardinality(String)", ""),
+    ("src_ip", "IPv6", "ZSTD(1)"),
+    ("src_port", "UInt16", "ZSTD(1)"),
+    ("dest_ip", "IPv6", "ZSTD(1)"),
+    ("dest_port", "UInt16", "ZSTD(1)"),
+    ("proto", "LowCardinality(String)", ""),
+
+    # Alert 관련 필드
+    ("alert_signature", "LowCardinality(Nullable(String))", ""),
+    ("alert_category", "LowCardinality(Nullable(String))", ""),
+    ("alert_severity", "Nullable(UInt8)", ""),
+    ("alert_action", "LowCardinality(Nullable(String))", ""),
+
+    # Flow 관련 필드
+    ("flow_id", "Nullable(UInt64)", "ZSTD(1)"),
+    ("flow_pkts_toserver", "Nullable(UInt32)", "T64, ZSTD(1)"),
+    ("flow_pkts_toclient", "Nullable(UInt32)", "T64, ZSTD(1)"),
+    ("flow_bytes_toserver", "Nullable(UInt64)", "T64, ZSTD(1)"),
+    ("flow_bytes_toclient", "Nullable(UInt64)", "T64, ZSTD(1)"),
+    ("flow_start", "Nullable(DateTime64(6))", "Delta, ZSTD(1)"),
+    ("flow_end", "Nullable(DateTime64(6))", "Delta, ZSTD(1)"),
+    ("flow_age", "Nullable(UInt32)", "T64, ZSTD(1)"),
+    ("flow_state", "LowCardinality(Nullable(String))", ""),
+    ("flow_reason", "LowCardinality(Nullable(String))", ""),
+
+    # HTTP 관련 필드
+    ("http_hostname", "Nullable(String)", "ZSTD(1)"),
+    ("http_url", "Nullable(String)", "ZSTD(1)"),
+    ("http_http_user_agent", "Nullable(String)", "ZSTD(1)"),
+    ("http_http_method", "LowCardinality(Nullable(String))", ""),
+    ("http_protocol", "LowCardinality(Nullable(String))", ""),
+    ("http_status", "Nullable(UInt16)", ""),
+    ("http_length", "Nullable(UInt32)", "T64, ZSTD(1)"),
+
+    # DNS 관련 필드
+    ("dns_type", "LowCardinality(Nullable(String))", ""),
+    ("dns_id", "Nullable(UInt16)", "ZSTD(1)"),
+    ("dns_rrname", "Nullable(String)", "ZSTD(1)"),
+    ("dns_rrtype", "LowCardinality(Nullable(String))", ""),
+    ("dns_rcode", "LowCardinality(Nullable(String))", ""),
+
+    # TLS 관련 필드
+    ("tls_subject", "Nullable(String)", "ZSTD(1)"),
+    ("tls_issuerdn", "Nullable(String)", "ZSTD(1)"),
+    ("tls_fingerprint", "Nullable(String)", "ZSTD(1)"),
+    ("tls_sni", "Nullable(String)", "ZSTD(1)"),
+    ("tls_version", "LowCardinality(Nullable(String))", ""),
+
+    # 원본 JSON 데이터 (분석용)
+    ("raw_json", "String", "ZSTD(3)"),
+)
+
+WIDE_COLUMN_NAMES: Tuple[str, ...] = tuple(name for name, _, _ in WIDE_COLUMNS) + ("date",)
+
+
+def column_ddl(name: str, column_type: str, codec: str) -> str:
+    return f"{name} {column_type} CODEC({codec})" if codec else f"{name} {column_type}"
+
+
+def events_table_ddl(table: str) -> str:
+    columns = ",\n        ".join(column_ddl(*column) for column in WIDE_COLUMNS)
+    return f"""
+    CREATE TABLE IF NOT EXISTS {settings.CLICKHOUSE_DATABASE}.{table}
+    (
+        {columns},
+
+        -- 인덱스 필드
+        date Date DEFAULT toDate(timestamp),
+
+        -- data skipping index
+        INDEX idx_src_ip src_ip TYPE bloom_filter(0.01) GRANULARITY 4,
+        INDEX idx_dest_ip dest_ip TYPE bloom_filter(0.01) GRANULARITY 4,
+        INDEX idx_alert_signature alert_signature TYPE bloom_filter(0.01) GRANULARITY 4,
+        INDEX idx_tls_sni tls_sni TYPE bloom_filter(0.01) GRANULARITY 4,
+        INDEX idx_dns_rrname dns_rrname TYPE bloom_filter(0.01) GRANULARITY 4
+    )
+    ENGINE = MergeTree()
+    PARTITION BY toYYYYMM(date)
+    ORDER BY (event_type, timestamp, src_ip, dest_ip)
+    TTL date + INTERVAL 90 DAY
+    SETTINGS index_granularity = 8192
+    """
+
+
+def display_ip(value: Any) -> str:
+    """IPv6 컬럼 값을 표시용 문자열로 (IPv4-mapped 는 a.b.c.d)"""
+    if isinstance(value, IPv6Address):
+        return str(value.ipv4_mapped or value)
+    return str(value)
+
+
+def ip_param(value: str) -> str:
+    """IP 문자열을 IPv6 컬럼과 비교할 파라미터 값으로 (IPv4 -> ::ffff:a.b.c.d)"""
+    address = ip_address(value)
+    if address.version == 4:
+        return f"::ffff:{address}"
+    return address.compressed
+
+
+def cidr_range(value: str) -> Tuple[str, str]:
+    """CIDR 을 IPv6 컬럼의 BETWEEN 범위(첫 주소, 마지막 주소)로"""
+    network = ip_network(value, strict=False)
+    return ip_param(str(network[0])), ip_param(str(network[-1]))
+
+
+def _column_type(client: Client, table: str, column: str) -> Optional[str]:
+    result = client.query(
+        "SELECT type FROM system.columns WHERE database = {database:String} AND table = {table:String} AND name = {column:String}",
+        parameters={"database": settings.CLICKHOUSE_DATABASE, "table": table, "column": column}
+    )
+    return result.result_rows[0][0] if result.result_rows else None
+
+
+def table_engine(client: Client, table: str) -> Optional[str]:
+    """테이블 엔진 이름 (MergeTree, View, ...). 없으면 None"""
+    result = client.query(
+        "SELECT engine FROM system.tables WHERE database = {database:String} AND name = {table:String}",
+        parameters={"database": settings.CLICKHOUSE_DATABASE, "table": table}
+    )
+    return result.result_rows[0][0] if result.result_rows else None
+
+
+def table_exists(client: Client, table: str) -> bool:
+    return table_engine(client, table) is not None
+
+
+def replace_legacy_events_table(client: Client, drop_dependents) -> bool:
+    """events 가 이전 스키마(src_ip String)면 새 스키마 테이블로 교체. 교체했으면 True
+
+    drop_dependents(client) 는 events 를 읽는 materialized view 를 제거하는 함수
+    (교체 후 새 테이블 기준으로 다시 만든다).
+    """
+    table = settings.CLICKHOUSE_TABLE
+    if _column_type(client, table, "src_ip") != "String":
+        return False
+
+    database = settings.CLICKHOUSE_DATABASE
+    legacy = table + LEGACY_SUFFIX
+    if table_exists(client, legacy):
+        raise RuntimeError(f"{legacy} 테이블이 이미 있어 스키마 교체를 진행할 수 없습니다")
+
+    log.warning("이전 스키마 감지: %s -> %s 로 옮기고 새 테이블 생성", table, legacy)
+    drop_dependents(client)
+    client.command(events_table_ddl(table + "_new"))
+    client.command(
+        f"RENAME TABLE {database}.{table} TO {database}.{legacy}, "
+        f"{database}.{table}_new TO {database}.{table}"
+    )
+    return True
+
+
+def copy_legacy_partitions(client: Client) -> int:
+    """이전 스키마 테이블의 파티션을 하나씩 새 테이블로 복사 후 삭제. 복사한 파티션 수 반환
+
+    파티션 단위로 복사 -> 원본 파티션 삭제 순서라 중간에 멈춰도 이어서 진행된다.
+    (복사 직후 삭제 전에 멈추면 그 파티션은 한 번 더 복사될 수 있다)
+    이벤트 타입별 테이블로 나뉜 뒤에는 compat view 에 포함된 {table}_wide 로 복사한다.
+    """
+    database = settings.CLICKHOUSE_DATABASE
+    legacy = settings.CLICKHOUSE_TABLE + LEGACY_SUFFIX
+    if not table_exists(client, legacy):
+        return 0
+    table = settings.CLICKHOUSE_TABLE + WIDE_SUFFIX
+    if not table_exists(client, table):
+        table = settings.CLICKHOUSE_TABLE
+    column_names = list(WIDE_COLUMN_NAMES)
+
+    partitions = [row[0] for row in client.query(
+        "SELECT DISTINCT partition_id FROM system.parts "
+        "WHERE database = {database:String} AND table = {table:String} AND active ORDER BY partition_id",
+        parameters={"database": database, "table": legacy}
+    ).result_rows]
+
+    # IP 는 문자열 -> IPv6 (IPv4 는 mapped 주소로), 나머지는 삽입 시 자동 변환
+    select_columns = ", ".join(
+        f"toIPv6OrDefault({name})" if name in ("src_ip", "dest_ip") else name
+        for name in column_names
+    )
+    for partition_id in partitions:
+        if not re.fullmatch(r"[\w-]+", partition_id):
+            raise RuntimeError(f"예상치 못한 파티션 ID: {partition_id}")
+        client.command(
+            f"INSERT INTO {database}.{table} ({', '.join(column_names)}) "
+            f"SELECT {select_columns} FROM {database}.{legacy} WHERE _partition_id = {{partition_id:String}}",
+            parameters={"partition_id": partition_id}
+        )
+        client.command(f"ALTER TABLE {database}.{legacy} DROP PARTITION ID '{partition_id}'")
+        log.info("파티션 %s 새 스키마로 복사 완료", partition_id)
+
+    client.command(f"DROP TABLE IF EXISTS {database}.{legacy}")
+    log.info("%s 제거 - 스키마 교체 완료", legacy)
+    return len(partitions)
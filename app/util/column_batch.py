@@ -0,0 +1,203 @@
+import json
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from app.util.eve_time import event_ticks
+from app.util.event_tables import (
+    ORIGIN_COLUMNS, PORT_COLUMNS, UINT_MAX, EventTable, Field, field_converter, field_default, table_columns, table_fields,
+    table_for, type_converter, type_default
+)
+from app.util.stats_metrics import STATS_TYPE, MetricsBatch, StatsDeltaTracker
+
+
+def _nested_values(key: str, column_type: str):
+    """객체 목록에서 key 값만 모아 Nested 하위 컬럼(Array) 값으로
+
+    하위 컬럼끼리 배열 길이가 같아야 하므로 값이 없거나 변환할 수 없는 원소는 기본값으로 채운다.
+    """
+    default = type_default(column_type)
+    convert_item = type_converter(column_type)
+
+    def convert(items: list) -> list:
+        if not isinstance(items, list):
+            raise TypeError(f"목록이 아닌 값: {items!r}")
+        values = []
+        for item in items:
+            value = item.get(key) if isinstance(item, dict) else None
+            if value is not None:
+                try:
+                    value = convert_item(value)
+                except (ValueError, TypeError, OverflowError):
+                    value = None
+            values.append(default if value is None else value)
+        return values
+    return convert
+
+
+def _writers(field: Field, columns: Dict[str, Sequence]) -> list:
+    """필드 1개를 (append, key, convert, default, exact, limit) 목록으로 (Nested 는 하위 컬럼마다 1개)
+
+    exact 는 변환 없이 그대로 넣어도 되는 값의 클래스로, 대부분의 값은 convert 호출 없이 들어간다
+    (문자열 컬럼의 str, 부호 없는 정수 컬럼은 0 ~ limit 범위의 int).
+    """
+    if not field.subfields:
+        exact, limit = None, 0
+        if field.convert is None:
+            if field.type in ("String", "LowCardinality(String)"):
+                exact = str
+            elif field.type in UINT_MAX:
+                exact, limit = int, UINT_MAX[field.type]
+        return [(columns[field.column].append, field.key, field_converter(field), field_default(field), exact, limit)]
+    return [
+        (columns[f"{field.column}.{name}"].append, field.key, _nested_values(key, column_type), [], None, 0)
+        for name, key, column_type in field.subfields
+    ]
+
+
+class ColumnarBatch:
+    """이벤트를 컬럼별 배열에 바로 쌓는 배치
+
+    이벤트 타입별 테이블 1개 분량. 이벤트마다 행(dict/list)을 만들지 않고
+    각 필드를 해당 컬럼 배열에 append 한다.
+    clickhouse-connect 의 column_oriented insert 에 columns 를 그대로 넘긴다.
+    raw_json 컬럼은 bytes 로 유지하여 드라이버가 인코딩 없이 그대로 전송한다
+    (CLICKHOUSE_STORE_RAW_JSON 이 꺼져 있으면 raw_json 컬럼을 보내지 않는다).
+    """
+
+    def __init__(self, table: EventTable):
+        self.table = table
+        self.size = 0
+        self.columns: Dict[str, Sequence] = {}
+        for name in table_columns(table):
+            self.columns[name] = []
+        # timestamp/date 는 epoch 마이크로초/일수 정수로 담는다 (DateTime64(6), Date)
+        self.columns['timestamp'] = array('q')
+        self.columns['date'] = array('H')
+        for name in PORT_COLUMNS:
+            self.columns[name] = array('H')
+        self._bind()
+
+    def _bind(self):
+        """append 마다 dict 조회를 하지 않도록 컬럼 배열의 bound method 를 미리 묶어 둔다"""
+        table = self.table
+        cols = self.columns
+        self._timestamp = cols['timestamp'].append
+        self._date = cols['date'].append
+        self._raw_json = cols['raw_json'].append if 'raw_json' in cols else None
+        self._ports = [(cols[name].append, name) for name in PORT_COLUMNS]
+        self._sensor, self._source = (cols[name].append for name in ORIGIN_COLUMNS)
+        # 필드를 하위 객체(alert, tls.ja3, ...) 경로별로 묶는다 (() = 이벤트 최상위)
+        sections: Dict[tuple, list] = {}
+        for field in table_fields(table):
+            path = tuple(field.section.split('.')) if field.section else ()
+            sections.setdefault(path, []).extend(_writers(field, cols))
+        self._sections = list(sections.items())
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getstate__(self):
+        # 워커 프로세스 -> writer 전달용: 테이블은 이름으로, 컬럼 배열만 pickle
+        return self.table.event_type, self.size, self.columns
+
+    def __setstate__(self, state):
+        event_type, self.size, self.columns = state
+        self.table = table_for(event_type)
+        self._bind()
+
+    def append(self, event: Dict[str, Any], raw: Optional[bytes] = None, sensor: str = "", source: str = ""):
+        """이벤트 하나를 각 컬럼에 추가
+
+        raw 는 eve.json 의 원본 라인으로, 다시 직렬화하지 않고 raw_json 에 그대로 저장한다.
+        sensor/source 는 이벤트를 읽은 센서 이름과 eve 파일 경로.
+        """
+        # 배열 컬럼에 넣을 값은 먼저 모두 검증한다 (중간에 예외가 나면 컬럼 길이가 어긋남)
+        micros, days = event_ticks(event.get('timestamp'))
+        ports = []
+        for _, key in self._ports:
+            port = event.get(key)
+            ports.append(port if isinstance(port, int) and 0 <= port <= 0xFFFF else 0)
+
+        self._timestamp(micros)
+        self._date(days)
+        for (append, _), port in zip(self._ports, ports):
+            append(port)
+        self._sensor(sensor)
+        self._source(source)
+
+        for path, fields in self._sections:
+            sub = event
+            for part in path:
+                sub = sub.get(part)
+                if not isinstance(sub, dict):
+                    break
+            if not sub or not isinstance(sub, dict):
+                for append, _, _, default, _, _ in fields:
+                    append(default)
+                continue
+            for append, key, convert, default, exact, limit in fields:
+                value = sub.get(key)
+                if value is None:
+                    value = default
+                elif value.__class__ is not exact or (limit and not 0 <= value <= limit):
+                    # 컬럼 타입에 맞지 않는 값은 기본값으로 (배치 전체가 삽입 실패하지 않도록)
+                    try:
+                        value = convert(value)
+                    except (ValueError, TypeError, AttributeError, OverflowError):
+                        value = default
+                append(value)
+
+        if self._raw_json is not None:
+            if raw is None:
+                raw = json.dumps(event, ensure_ascii=False).encode('utf-8')
+            self._raw_json(raw)
+        self.size += 1
+
+    @property
+    def column_names(self) -> List[str]:
+        return list(self.columns.keys())
+
+    @property
+    def column_data(self) -> List[Sequence]:
+        return list(self.columns.values())
+
+
+class RoutedBatch:
+    """이벤트를 event_type 별 테이블의 ColumnarBatch 로 나눠 담는 배치
+
+    stats 이벤트는 카운터 시계열 테이블용 MetricsBatch 에 담고,
+    삽입 대기열에 넣기 전에 compute_metrics() 로 행을 만든다.
+    size 는 추가된 전체 이벤트 수로, 테이블별 배치가 삽입되어 빠져도 줄지 않는다.
+    """
+
+    def __init__(self):
+        self.size = 0
+        self.batches: Dict[str, Union[ColumnarBatch, MetricsBatch]] = {}
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, event: Dict[str, Any], raw: Optional[bytes] = None, sensor: str = "", source: str = ""):
+        event_type = event.get('event_type')
+        if event_type == STATS_TYPE:
+            metrics = self.batches.get(STATS_TYPE)
+            if metrics is None:
+                metrics = self.batches[STATS_TYPE] = MetricsBatch()
+            metrics.append(event, sensor)
+            self.size += 1
+            return
+        table = table_for(event_type)
+        batch = self.batches.get(table.event_type)
+        if batch is None:
+            batch = self.batches[table.event_type] = ColumnarBatch(table)
+        batch.append(event, raw, sensor, source)
+        self.size += 1
+
+    def compute_metrics(self, tracker: StatsDeltaTracker):
+        """stats 샘플의 delta 계산 (배치 순서대로 호출해야 함). 저장할 행이 없으면 테이블에서 뺀다"""
+        metrics = self.batches.get(STATS_TYPE)
+        if metrics is None:
+            return
+        metrics.compute(tracker)
+        if not metrics.columns["metric"]:
+            del self.batches[STATS_TYPE]
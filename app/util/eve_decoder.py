@@ -0,0 +1,38 @@
+"""EVE JSON 라인 디코더
+
+설치되어 있으면 orjson, msgspec 순으로 더 빠른 JSON 백엔드를 사용하고,
+없으면 표준 json 모듈을 사용한다. 한 라인은 한 번만 디코딩하여
+ClickHouse 배치와 alert 캐시가 같은 dict 를 공유한다.
+"""
+import json
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+_loads: Callable[[bytes], Any]
+DECODE_ERRORS: Tuple[Type[Exception], ...]
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+    DECODE_ERRORS = (orjson.JSONDecodeError,)
+    JSON_BACKEND = "orjson"
+except ImportError:
+    try:
+        import msgspec
+
+        _loads = msgspec.json.Decoder().decode
+        DECODE_ERRORS = (msgspec.DecodeError,)
+        JSON_BACKEND = "msgspec"
+    except ImportError:
+        _loads = json.loads
+        DECODE_ERRORS = (json.JSONDecodeError, UnicodeDecodeError)
+        JSON_BACKEND = "json"
+
+
+def decode_line(line: bytes) -> Optional[Dict[str, Any]]:
+    """EVE 라인 1개 디코딩 (JSON 객체가 아니면 None)"""
+    try:
+        data = _loads(line)
+    except DECODE_ERRORS:
+        return None
+    return data if isinstance(data, dict) else None
@@ -0,0 +1,485 @@
+import logging
+import os
+import sys
+import glob
+import time
+import struct
+import asyncio
+import ctypes
+import ctypes.util
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple, TypeVar
+
+from app.core.config import settings
+
+log = logging.getLogger(__name__)
+
+# inotify 이벤트 마스크 (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+
+_WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE |
+    IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+FileIdentity = Tuple[int, int]  # (st_dev, st_ino)
+T = TypeVar("T")
+
+
+class InotifyWatcher:
+    """디렉토리 단위 inotify 감시 (Linux 전용, ctypes 사용)
+
+    로그 파일 자체가 아니라 상위 디렉토리를 감시해야 rotate 후 새로 생성된
+    파일도 놓치지 않는다. 파일 이름은 glob 패턴(eve.*.json)이어도 된다.
+    사용할 수 없는 환경이면 available 이 False 이고 호출 측은 폴링으로 동작한다.
+    """
+
+    def __init__(self):
+        self.fd: Optional[int] = None
+        self._libc = None
+        self._watches: Dict[int, Path] = {}
+        self._names: Dict[Path, Set[str]] = {}
+        self._changed = asyncio.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        if not sys.platform.startswith("linux"):
+            return
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd < 0:
+                return
+            self._libc = libc
+            self.fd = fd
+        except (OSError, AttributeError):
+            self.fd = None
+
+    @property
+    def available(self) -> bool:
+        return self.fd is not None
+
+    def watch(self, path: Path) -> bool:
+        """path(파일 또는 glob 패턴)가 속한 디렉토리를 감시 대상에 추가"""
+        if not self.available:
+            return False
+
+        directory = path.parent
+        self._names.setdefault(directory, set()).add(path.name)
+        if directory in self._watches.values():
+            return True
+
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            return False
+        self._watches[wd] = directory
+        return True
+
+    def _attach(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        loop.add_reader(self.fd, self._on_readable)
+
+    def _on_readable(self):
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        except OSError:
+            self._changed.set()
+            return
+
+        pos = 0
+        while pos + _EVENT_HEADER.size <= len(data):
+            wd, _mask, _cookie, length = _EVENT_HEADER.unpack_from(data, pos)
+            pos += _EVENT_HEADER.size
+            name = data[pos:pos + length].rstrip(b"\0").decode(errors="replace")
+            pos += length
+
+            directory = self._watches.get(wd)
+            names = self._names.get(directory) if directory else None
+            # 같은 디렉토리의 다른 파일(fast.log 등) 변경은 무시
+            if not name or names is None or any(fnmatchcase(name, pattern) for pattern in names):
+                self._changed.set()
+                return
+
+    async def wait(self, timeout: float):
+        """변경 알림 또는 timeout 까지 대기"""
+        if not self.available:
+            await asyncio.sleep(timeout)
+            return
+
+        self._attach()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._changed.clear()
+
+    def close(self):
+        if self.fd is None:
+            return
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.remove_reader(self.fd)
+        os.close(self.fd)
+        self.fd = None
+
+
+class TailChunk(NamedTuple):
+    """한 번의 read 로 얻은 완성된 라인 묶음"""
+    identity: FileIdentity
+    start: int          # 첫 라인의 시작 바이트 오프셋
+    lines: List[bytes]  # 개행 제외, 빈 라인 포함 가능
+
+
+class TailBlock(NamedTuple):
+    """라인 경계로 자른 원본 바이트 (프로세스 간 전달용, 라인 분리 전)"""
+    identity: FileIdentity
+    start: int   # 첫 라인의 시작 바이트 오프셋
+    end: int     # 마지막 라인의 개행 다음 위치
+    data: bytes  # 마지막 개행 제외
+
+
+class EveTailer:
+    """eve.json 바이트 오프셋 기반 tail
+
+    - 파일을 직접 열어 마지막으로 완성된 라인의 끝(offset)을 기억한다.
+    - 개행으로 끝나지 않은 마지막 조각은 다음 read 까지 보관한다.
+    - (st_dev, st_ino) 가 바뀌면 rotate 로 보고 이전 파일을 끝까지 읽은 뒤
+      새 파일의 처음부터 읽는다.
+    - 같은 inode 에서 크기가 줄어들면 truncate(copytruncate 등)로 보고
+      처음부터 다시 읽는다.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        offset: int = 0,
+        identity: Optional[FileIdentity] = None,
+        chunk_size: int = 1024 * 1024,
+        poll_interval: float = 1.0,
+        watcher: Optional[InotifyWatcher] = None,
+    ):
+        self.path = Path(path)
+        self.chunk_size = chunk_size
+        self.poll_interval = poll_interval
+
+        self.offset = offset
+        self.identity: Optional[FileIdentity] = None
+        self._resume_identity = identity
+        self._file = None
+        self._partial = b""
+        self._rotated = False
+        self._missing_reported = False
+
+        # 여러 파일을 tail 할 때는 감시자를 공유한다 (닫는 것은 소유자 몫)
+        self._owns_watcher = watcher is None
+        self.watcher = watcher or InotifyWatcher()
+        self.watcher.watch(self.path)
+
+    @property
+    def read_position(self) -> int:
+        """파일에서 실제로 읽은 위치 (보관 중인 미완성 라인 포함)"""
+        return self.offset + len(self._partial)
+
+    def _find_rotated(self, identity: FileIdentity) -> Optional[Path]:
+        """중단된 동안 rotate 된 이전 파일(eve.json.1 등)을 inode 로 찾기"""
+        try:
+            candidates = list(self.path.parent.glob(self.path.name + "*"))
+        except OSError:
+            return None
+        for candidate in candidates:
+            try:
+                st = os.stat(candidate)
+            except OSError:
+                continue
+            if (st.st_dev, st.st_ino) == identity:
+                return candidate
+        return None
+
+    def _open(self) -> bool:
+        if self._resume_identity is not None:
+            identity = self._resume_identity
+            self._resume_identity = None
+            rotated = self._find_rotated(identity)
+            if rotated is not None and rotated != self.path:
+                # 이전 파일의 남은 부분을 먼저 읽고 현재 파일로 넘어간다
+                log.info("rotate 된 파일에서 이어서 수집: %s (offset %d)", rotated, self.offset)
+                self._file = open(rotated, "rb")
+                self._file.seek(self.offset)
+                self.identity = identity
+                self._partial = b""
+                self._rotated = True
+                return True
+            if rotated is None:
+                log.warning("체크포인트의 파일을 찾을 수 없어 처음부터 수집: %s", self.path)
+                self.offset = 0
+
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            if not self._missing_reported:
+                log.warning("로그 파일 없음, 생성 대기: %s", self.path)
+                self._missing_reported = True
+            return False
+
+        self._missing_reported = False
+        st = os.fstat(f.fileno())
+        identity = (st.st_dev, st.st_ino)
+
+        if self.identity is None and st.st_size < self.offset:
+            log.warning("로그 파일이 체크포인트보다 작아 처음부터 수집: %s", self.path)
+            self.offset = 0
+
+        f.seek(self.offset)
+        self._file = f
+        self.identity = identity
+        self._partial = b""
+        self._rotated = False
+        return True
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _check_file(self):
+        """rotate / truncate 감지"""
+        if self._file is None or self._rotated:
+            return
+
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            # rotate 중 잠시 파일이 없을 수 있음 - 열린 fd 로 계속 읽는다
+            return
+
+        if (st.st_dev, st.st_ino) != self.identity:
+            self._rotated = True
+        elif st.st_size < self.read_position:
+            log.warning("로그 파일 truncate 감지: %s", self.path)
+            self._file.seek(0)
+            self.offset = 0
+            self._partial = b""
+
+    def read_block(self) -> Optional[TailBlock]:
+        """읽을 수 있는 만큼(chunk_size 이하) 읽어 완성된 라인 부분만 반환"""
+        if self._file is None and not self._open():
+            return None
+
+        self._check_file()
+
+        data = self._file.read(self.chunk_size)
+        if not data:
+            if self._rotated:
+                if self._partial:
+                    log.warning("rotate 된 파일의 미완성 라인 %d바이트 폐기", len(self._partial))
+                log.info("로그 파일 rotate 감지: %s", self.path)
+                self._close_file()
+                self.identity = None
+                self.offset = 0
+                if self._open():
+                    return self.read_block()
+            return None
+
+        buf = self._partial + data if self._partial else data
+        cut = buf.rfind(b"\n")
+        if cut < 0:
+            self._partial = buf
+            return None
+
+        start = self.offset
+        self._partial = buf[cut + 1:]
+        self.offset = start + cut + 1
+        return TailBlock(self.identity, start, self.offset, buf[:cut])
+
+    def read_chunk(self) -> Optional[TailChunk]:
+        """read_block 결과를 라인 단위로 나눠 반환"""
+        block = self.read_block()
+        if block is None:
+            return None
+        return TailChunk(block.identity, block.start, block.data.split(b"\n"))
+
+    async def follow(self) -> AsyncIterator[TailChunk]:
+        """새 라인이 생길 때마다 TailChunk 를 생성 (inotify, 없으면 폴링)"""
+        while True:
+            chunk = self.read_chunk()
+            if chunk is not None:
+                yield chunk
+                continue
+            await self.watcher.wait(self.poll_interval)
+
+    def at_eof(self) -> bool:
+        """열린 파일을 끝까지 읽었는지 (열린 파일이 없으면 True)"""
+        if self._file is None:
+            return True
+        try:
+            return self.read_position >= os.fstat(self._file.fileno()).st_size
+        except OSError:
+            return True
+
+    def close(self):
+        self._close_file()
+        if self._owns_watcher:
+            self.watcher.close()
+
+
+class LogSource(NamedTuple):
+    """수집 대상 설정 1개 (파일 경로 또는 glob 패턴 + 센서 이름)"""
+    sensor: str
+    pattern: str
+
+
+def parse_log_sources(spec: str, default_sensor: str) -> List[LogSource]:
+    """"센서=경로,경로" 형식 설정 파싱 (센서를 생략하면 default_sensor)"""
+    sources = []
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        sensor, sep, pattern = entry.partition("=")
+        if not sep:
+            sensor, pattern = default_sensor, entry
+        sources.append(LogSource(sensor.strip() or default_sensor, pattern.strip()))
+    return sources
+
+
+class TailedFile(NamedTuple):
+    sensor: str
+    source: str  # 파일 경로 (체크포인트 키, source 컬럼 값)
+    tailer: EveTailer
+
+
+class MultiTailer:
+    """여러 eve 파일/glob 을 하나의 inotify 감시자와 하나의 루프로 tail
+
+    - 파일마다 EveTailer(오프셋, rotate/truncate 처리)를 두고 감시자는 공유한다.
+    - glob 패턴은 rescan_interval 마다 다시 찾아 새 파일을 추가하고, 패턴에서
+      사라진 파일은 열린 fd 를 끝까지 읽은 뒤 뺀다.
+    - 한 번에 파일마다 read 를 한 번씩 돌아가며 호출하여 한 파일에 이벤트가
+      몰려도 다른 파일이 밀리지 않게 한다.
+    positions 는 파일 경로 -> (offset, (dev, inode)) 로, 없는 파일은 처음부터 읽는다.
+    from_end 이면 시작 시 이미 있던 파일은 끝부터 읽는다 (이후 생긴 파일은 처음부터).
+    """
+
+    def __init__(
+        self,
+        sources: List[LogSource],
+        positions: Optional[Dict[str, Tuple[int, FileIdentity]]] = None,
+        from_end: bool = False,
+        chunk_size: int = 1024 * 1024,
+        poll_interval: float = 1.0,
+        rescan_interval: float = 10.0,
+    ):
+        self.sources = sources
+        self.positions = positions or {}
+        self.chunk_size = chunk_size
+        self.poll_interval = poll_interval
+        self.rescan_interval = rescan_interval
+        self.files: Dict[str, TailedFile] = {}
+        self.watcher = InotifyWatcher()
+        for source in sources:
+            self.watcher.watch(Path(source.pattern))
+        self._from_end = from_end
+        self._next_scan = 0.0
+
+    def scan(self):
+        """패턴에 맞는 파일 목록 갱신"""
+        seen = set()
+        for source in self.sources:
+            if glob.has_magic(source.pattern):
+                paths = sorted(glob.glob(source.pattern))
+            else:
+                # 고정 경로는 아직 없어도 생성될 때까지 기다린다
+                paths = [source.pattern]
+            for path in paths:
+                if path in seen:
+                    continue
+                seen.add(path)
+                if path not in self.files:
+                    self._add(source.sensor, path)
+
+        # 삭제/이름 변경된 파일은 열린 fd 로 끝까지 읽은 뒤 뺀다
+        for path, tailed in list(self.files.items()):
+            if path not in seen and tailed.tailer.at_eof():
+                log.info("수집 대상에서 제외: %s", path)
+                tailed.tailer.close()
+                del self.files[path]
+
+        self._from_end = False
+        self._next_scan = time.monotonic() + self.rescan_interval
+
+    def _add(self, sensor: str, path: str):
+        position = self.positions.get(path)
+        identity = None
+        offset = 0
+        if position is not None:
+            offset, identity = position
+            log.info("체크포인트에서 이어서 수집: %s (offset %d)", path, offset)
+        elif self._from_end:
+            try:
+                offset = os.path.getsize(path)
+            except OSError:
+                pass
+        tailer = EveTailer(
+            Path(path),
+            offset=offset,
+            identity=identity,
+            chunk_size=self.chunk_size,
+            poll_interval=self.poll_interval,
+            watcher=self.watcher,
+        )
+        self.files[path] = TailedFile(sensor, path, tailer)
+        log.info("수집 대상 추가: %s (센서 %s)", path, sensor)
+
+    def read_round(self, read: Callable[[EveTailer], Optional[T]]) -> Iterator[Tuple[TailedFile, T]]:
+        """파일마다 read(EveTailer.read_chunk/read_block)를 한 번씩 호출 (rescan 주기면 먼저 scan)"""
+        if time.monotonic() >= self._next_scan:
+            self.scan()
+        for tailed in list(self.files.values()):
+            item = read(tailed.tailer)
+            if item is not None:
+                yield tailed, item
+
+    async def follow(self) -> AsyncIterator[Tuple[TailedFile, TailChunk]]:
+        """(파일, TailChunk) 를 새 라인이 생길 때마다 생성 (inotify, 없으면 폴링)"""
+        while True:
+            idle = True
+            for tailed, chunk in self.read_round(EveTailer.read_chunk):
+                idle = False
+                yield tailed, chunk
+            if idle:
+                await self.watcher.wait(self.poll_interval)
+
+    def close(self):
+        for tailed in self.files.values():
+            tailed.tailer.close()
+        self.files.clear()
+        self.watcher.close()
+
+
+def open_log_sources(
+    positions: Optional[Dict[str, Tuple[int, FileIdentity]]] = None,
+    from_end: bool = False
+) -> MultiTailer:
+    """SURICATA_LOG_SOURCES 설정대로 MultiTailer 생성"""
+    tailer = MultiTailer(
+        parse_log_sources(settings.SURICATA_LOG_SOURCES, settings.SENSOR_NAME),
+        positions=positions,
+        from_end=from_end,
+        chunk_size=settings.SURICATA_LOG_READ_CHUNK,
+        poll_interval=settings.SURICATA_LOG_POLL_INTERVAL,
+        rescan_interval=settings.SURICATA_LOG_RESCAN_INTERVAL,
+    )
+    if not tailer.watcher.available:
+        log.warning("inotify 사용 불가 - %s초 간격 폴링", settings.SURICATA_LOG_POLL_INTERVAL)
+    return tailer
@@ -0,0 +1,124 @@
+"""Suricata EVE 타임스탬프 파서
+
+Suricata 는 항상 `YYYY-MM-DDTHH:MM:SS.ffffff+ZZZZ` (31자) 형식으로 기록한다.
+초 단위 접두어와 시간대 문자열을 키로 epoch 초를 캐시하므로, 같은 초에 발생한
+이벤트들은 소수부(마이크로초)만 정수로 변환하면 된다.
+
+형식이 다르면(`Z` 접미사, 소수부 자릿수 차이, 시간대 생략 등) 아래 순서로 처리한다.
+  1. datetime.fromisoformat (`Z` 는 `+00:00` 으로 치환, `+ZZZZ` 는 `+ZZ:ZZ` 로 보정)
+  2. dateutil.parser.isoparse (설치된 경우)
+시간대가 없는 값은 UTC 로 간주하며, 모두 실패하면 ValueError 를 발생시킨다.
+"""
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_NAIVE_EPOCH = datetime(1970, 1, 1)
+_CACHE_LIMIT = 4096
+_MAX_DATE_DAYS = 0xFFFF  # ClickHouse Date (UInt16 일수)
+
+# 초 단위 접두어 -> (epoch 마이크로초, 이벤트 시간대 기준 날짜의 epoch 일수, 시간대 문자열)
+_second_cache: Dict[str, Tuple[int, int, str]] = {}
+
+def _tz_offset_seconds(tz: str) -> int:
+    sign = -1 if tz[0] == "-" else 1
+    return sign * (int(tz[1:3]) * 3600 + int(tz[3:5]) * 60)
+
+
+def _parse_fallback(value: str) -> datetime:
+    """표준 형식이 아닌 값 처리"""
+    text = value.strip()
+    if text.endswith("Z"):
+        text = text[:-1] + "+00:00"
+    elif len(text) > 5 and text[-5] in "+-" and text[-4:].isdigit():
+        text = text[:-2] + ":" + text[-2:]
+
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        try:
+            from dateutil import parser
+        except ImportError:
+            raise ValueError(f"지원하지 않는 타임스탬프 형식: {value!r}")
+        parsed = parser.isoparse(value)
+
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def parse_eve_ticks(value: str) -> Tuple[int, int]:
+    """EVE 타임스탬프 -> (epoch 마이크로초, 날짜의 epoch 일수)
+
+    ClickHouse DateTime64(6) / Date 컬럼에 정수 그대로 넣을 수 있는 값이다.
+    날짜는 이벤트에 기록된 시간대 기준이다.
+    """
+    cached = _second_cache.get(value[:19])
+    if cached is not None and len(value) == 31 and value.endswith(cached[2]):
+        return cached[0] + int(value[20:26]), cached[1]
+
+    if len(value) == 31 and value[19] == "." and value[26] in "+-":
+        tz = value[26:]
+        local = datetime(
+            int(value[0:4]), int(value[5:7]), int(value[8:10]),
+            int(value[11:13]), int(value[14:16]), int(value[17:19]),
+            tzinfo=timezone.utc
+        )
+        local_seconds = (local - _EPOCH) // timedelta(seconds=1)
+        cached = (
+            (local_seconds - _tz_offset_seconds(tz)) * 1_000_000,
+            local_seconds // 86400,
+            tz,
+        )
+        if len(_second_cache) >= _CACHE_LIMIT:
+            _second_cache.clear()
+        _second_cache[value[:19]] = cached
+        return cached[0] + int(value[20:26]), cached[1]
+
+    parsed = _parse_fallback(value)
+    micros = (parsed - _EPOCH) // timedelta(microseconds=1)
+    local_days = (parsed.replace(tzinfo=None) - _NAIVE_EPOCH).days
+    return micros, local_days
+
+
+def event_ticks(value: Optional[str]) -> Tuple[int, int]:
+    """parse_eve_ticks 와 같지만, 타임스탬프가 없거나 읽을 수 없으면 현재 시각 (UTC 날짜)
+
+    Date 컬럼 범위(1970-01-01 ~ 2149-06-06)를 벗어난 값도 읽을 수 없는 것으로 본다.
+    """
+    if value:
+        try:
+            ticks = parse_eve_ticks(value)
+        except (ValueError, TypeError, OverflowError):
+            pass
+        else:
+            if 0 <= ticks[1] <= _MAX_DATE_DAYS:
+                return ticks
+    micros = time.time_ns() // 1000
+    return micros, micros // 86_400_000_000
+
+
+def parse_eve_micros(value: str) -> int:
+    """EVE 타임스탬프 -> epoch 마이크로초"""
+    return parse_eve_ticks(value)[0]
+
+
+def parse_eve_timestamp(value: str) -> datetime:
+    """EVE 타임스탬프 -> 시간대 정보가 있는 datetime (API 응답용)"""
+    try:
+        # Python 3.11+ 은 +ZZZZ 형식을 C 구현으로 바로 처리한다
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return _parse_fallback(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def eve_utc_offset_minutes(value: str) -> int:
+    """EVE 타임스탬프에 기록된 UTC 오프셋(분)"""
+    if len(value) == 31 and value[26] in "+-":
+        return _tz_offset_seconds(value[26:]) // 60
+    offset = parse_eve_timestamp(value).utcoffset()
+    return int(offset.total_seconds()) // 60 if offset else 0
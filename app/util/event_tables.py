@@ -0,0 +1,472 @@
+"""이벤트 타입별 ClickHouse 테이블과 EVE 필드 매핑
+
+suricata.yaml 에서 켠 타입(alert/http/dns/tls/files/drop)과 flow/anomaly/ssh/smtp 는
+각자 필요한 컬럼만 가진 테이블에, 나머지 타입은 {table}_other 에 저장한다.
+값이 없으면 NULL 대신 타입 기본값('', 0, [])을 넣어 Nullable 을 쓰지 않는다.
+여러 값인 필드는 Array, 객체 목록(dns answers, http 헤더)은 Nested 컬럼으로 저장해
+raw_json 을 JSONExtract 하지 않고 조회할 수 있게 한다.
+
+필드를 추가하면 EVENT_TABLES 를 고치고, 기존 테이블에 컬럼을 넣는
+sync_event_table 마이그레이션을 clickhouse_migrations 에 추가한다.
+기존 조회(events)는 모든 테이블을 UNION ALL 하는 view 로 유지한다.
+"""
+from ipaddress import ip_address
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from app.core.config import settings
+from app.util.clickhouse_schema import WIDE_COLUMNS, WIDE_SUFFIX, column_ddl
+from app.util.eve_time import parse_eve_micros
+
+OTHER_TYPE = "other"
+
+
+class Field(NamedTuple):
+    """이벤트 필드 1개 -> 컬럼"""
+    column: str
+    section: Optional[str]  # None 이면 이벤트 최상위, "tls.ja3" 처럼 하위 경로 가능
+    key: str
+    type: str
+    codec: str = ""
+    convert: Optional[Callable] = None  # None 이면 type 에서 만든 변환 (type_converter)
+    default: Any = None  # None 이면 타입 기본값
+    subfields: Tuple[Tuple[str, str, str], ...] = ()  # Nested 컬럼의 (이름, 키, 타입)
+
+
+class EventTable(NamedTuple):
+    event_type: str
+    fields: Tuple[Field, ...]
+    order_by: str
+    partition_by: str = "toYYYYMM(date)"
+    indexes: Tuple[str, ...] = ()
+
+    @property
+    def name(self) -> str:
+        return f"{settings.CLICKHOUSE_TABLE}_{self.event_type}"
+
+    @property
+    def qualified_name(self) -> str:
+        return f"{settings.CLICKHOUSE_DATABASE}.{self.name}"
+
+    @property
+    def event_type_expr(self) -> str:
+        """rollup/view 에서 event_type 대신 쓸 SQL 식 (other 만 컬럼으로 가짐)"""
+        return "event_type" if self.event_type == OTHER_TYPE else f"'{self.event_type}'"
+
+
+def type_default(column_type: str) -> Any:
+    if column_type.startswith("Array("):
+        return []
+    if column_type.startswith("Map("):
+        return {}
+    return "" if "String" in column_type else 0
+
+
+def field_default(field: Field) -> Any:
+    if field.default is not None:
+        return field.default
+    return type_default(field.type)
+
+
+# 컬럼 타입별 값 변환 -------------------------------------------------------------
+# 드라이버는 타입이 맞지 않는 값 하나에도 테이블 배치 전체를 쓰지 못하므로(ValueError/DataError)
+# 배치에 넣기 전에 타입에 맞게 바꾸고, 바꿀 수 없으면 ValueError/TypeError -> 필드 기본값
+
+UINT_MAX = {"UInt8": 0xFF, "UInt16": 0xFFFF, "UInt32": 0xFFFFFFFF, "UInt64": 0xFFFFFFFFFFFFFFFF}
+_IP_CACHE_SIZE = 65536
+_valid_ips: Dict[str, bool] = {}
+
+
+def _uint_converter(maximum: int) -> Callable[[Any], int]:
+    def convert(value: Any) -> int:
+        if value.__class__ is not int:
+            # true/false 는 0/1, 정수 값인 float 는 정수로 (그 외 문자열 등은 거부)
+            if isinstance(value, float) and value.is_integer():
+                value = int(value)
+            elif not isinstance(value, int):
+                raise TypeError(f"정수가 아닌 값: {value!r}")
+        if not 0 <= value <= maximum:
+            raise ValueError(f"범위를 벗어난 값: {value}")
+        return int(value)
+    return convert
+
+
+def _to_ip(value: Any) -> str:
+    """IPv6 컬럼 값 (드라이버처럼 ip_address 로 검증, IPv4 는 드라이버가 IPv4-mapped 로 변환)"""
+    if value.__class__ is not str:
+        raise TypeError(f"IP 주소가 아닌 값: {value!r}")
+    if value not in _valid_ips:
+        ip_address(value)
+        if len(_valid_ips) >= _IP_CACHE_SIZE:
+            _valid_ips.clear()
+        _valid_ips[value] = True
+    return value
+
+
+def _to_str(value: Any) -> str:
+    if value.__class__ is str:
+        return value
+    # 숫자는 문자열로, 객체/목록/bool 은 거부
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    raise TypeError(f"문자열이 아닌 값: {value!r}")
+
+
+def _to_micros(value: Any) -> int:
+    if value.__class__ is int:
+        return value
+    return parse_eve_micros(value)
+
+
+def _array_converter(item: Callable[[Any], Any]) -> Callable[[Any], list]:
+    def convert(value: Any) -> list:
+        # 단일 값으로 올 수도 있는 필드는 원소 1개 배열로
+        return [item(v) for v in value] if isinstance(value, list) else [item(value)]
+    return convert
+
+
+def _map_converter(key: Callable[[Any], Any], item: Callable[[Any], Any]) -> Callable[[Any], dict]:
+    def convert(value: Any) -> dict:
+        if not isinstance(value, dict):
+            raise TypeError(f"객체가 아닌 값: {value!r}")
+        return {key(k): item(v) for k, v in value.items()}
+    return convert
+
+
+def _split_args(body: str) -> List[str]:
+    """'K, Array(V)' 처럼 괄호 안 콤마는 건너뛰고 최상위 인자만 나누기"""
+    args, depth, start = [], 0, 0
+    for index, char in enumerate(body):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            args.append(body[start:index].strip())
+            start = index + 1
+    args.append(body[start:].strip())
+    return args
+
+
+def type_converter(column_type: str) -> Callable[[Any], Any]:
+    """컬럼 타입 -> 값 변환 함수 (지원하지 않는 타입은 그대로)"""
+    if column_type in UINT_MAX:
+        return _uint_converter(UINT_MAX[column_type])
+    if column_type == "IPv6":
+        return _to_ip
+    if column_type in ("String", "LowCardinality(String)"):
+        return _to_str
+    if column_type.startswith("DateTime64("):
+        return _to_micros
+    if column_type.startswith("Array("):
+        return _array_converter(type_converter(column_type[6:-1]))
+    if column_type.startswith("Map("):
+        key_type, value_type = _split_args(column_type[4:-1])
+        return _map_converter(type_converter(key_type), type_converter(value_type))
+    return lambda value: value
+
+
+def field_converter(field: Field) -> Callable[[Any], Any]:
+    return field.convert or type_converter(field.type)
+
+
+def array(column: str, section: Optional[str], key: str, item_type: str) -> Field:
+    return Field(column, section, key, f"Array({item_type})")
+
+
+def nested(column: str, section: Optional[str], key: str, *subfields: Tuple[str, str, str]) -> Field:
+    """객체 목록 -> Nested 컬럼 (column.name 별 Array 로 저장)"""
+    body = ", ".join(f"{name} {column_type}" for name, _, column_type in subfields)
+    return Field(column, section, key, f"Nested({body})", subfields=subfields)
+
+
+def field_columns(field: Field) -> List[str]:
+    """필드가 삽입하는 컬럼 이름 (Nested 는 column.name 으로 펼쳐짐)"""
+    if field.subfields:
+        return [f"{field.column}.{name}" for name, _, _ in field.subfields]
+    return [field.column]
+
+
+def field_definition(field: Field) -> str:
+    """컬럼 이름 뒤에 오는 타입 + 코덱"""
+    return f"{field.type} CODEC({field.codec})" if field.codec else field.type
+
+
+# 모든 테이블 공통 (timestamp, 포트, raw_json, date 는 배치가 따로 처리)
+COMMON_FIELDS: Tuple[Field, ...] = (
+    Field("src_ip", None, "src_ip", "IPv6", "ZSTD(1)", default="0.0.0.0"),
+    Field("dest_ip", None, "dest_ip", "IPv6", "ZSTD(1)", default="0.0.0.0"),
+    Field("proto", None, "proto", "LowCardinality(String)", default="unknown"),
+    Field("flow_id", None, "flow_id", "UInt64", "ZSTD(1)"),
+    Field("app_proto", None, "app_proto", "LowCardinality(String)"),
+    Field("in_iface", None, "in_iface", "LowCardinality(String)"),
+    # eve metadata (flowbits 등)
+    array("flowbits", "metadata", "flowbits", "LowCardinality(String)"),
+)
+
+PORT_COLUMNS: Tuple[str, ...] = ("src_port", "dest_port")
+
+# 이벤트 내용이 아니라 수집 대상에서 채우는 컬럼 (센서 이름, eve 파일 경로)
+ORIGIN_COLUMNS: Tuple[str, ...] = ("sensor", "source")
+ORIGIN_TYPE = "LowCardinality(String)"
+
+_SRC_IP_INDEX = "INDEX idx_src_ip src_ip TYPE bloom_filter(0.01) GRANULARITY 4"
+
+EVENT_TABLES: Dict[str, EventTable] = {table.event_type: table for table in (
+    EventTable(
+        "alert",
+        (
+            Field("alert_signature", "alert", "signature", "LowCardinality(String)"),
+            Field("alert_signature_id", "alert", "signature_id", "UInt32"),
+            Field("alert_gid", "alert", "gid", "UInt32"),
+            Field("alert_rev", "alert", "rev", "UInt32"),
+            Field("alert_category", "alert", "category", "LowCardinality(String)"),
+            Field("alert_severity", "alert", "severity", "UInt8"),
+            Field("alert_action", "alert", "action", "LowCardinality(String)"),
+            # 규칙 metadata (키 -> 값 목록)
+            Field("alert_metadata", "alert", "metadata", "Map(LowCardinality(String), Array(String))"),
+            # payload/packet 은 base64 (suricata.yaml 에서 payload, packet 출력)
+            Field("payload", None, "payload", "String", "ZSTD(3)"),
+            Field("packet", None, "packet", "String", "ZSTD(3)"),
+        ),
+        # alert 는 양이 적어 시간순으로 두고 시그니처/IP 는 skip index 로 찾는다
+        order_by="(timestamp, src_ip, dest_ip)",
+        indexes=(
+            _SRC_IP_INDEX,
+            "INDEX idx_dest_ip dest_ip TYPE bloom_filter(0.01) GRANULARITY 4",
+            "INDEX idx_alert_signature alert_signature TYPE bloom_filter(0.01) GRANULARITY 4",
+        ),
+    ),
+    EventTable(
+        "flow",
+        (
+            Field("flow_pkts_toserver", "flow", "pkts_toserver", "UInt32", "T64, ZSTD(1)"),
+            Field("flow_pkts_toclient", "flow", "pkts_toclient", "UInt32", "T64, ZSTD(1)"),
+            Field("flow_bytes_toserver", "flow", "bytes_toserver", "UInt64", "T64, ZSTD(1)"),
+            Field("flow_bytes_toclient", "flow", "bytes_toclient", "UInt64", "T64, ZSTD(1)"),
+            Field("flow_start", "flow", "start", "DateTime64(6)", "Delta, ZSTD(1)", parse_eve_micros),
+            Field("flow_end", "flow", "end", "DateTime64(6)", "Delta, ZSTD(1)", parse_eve_micros),
+            Field("flow_age", "flow", "age", "UInt32", "T64, ZSTD(1)"),
+            Field("flow_state", "flow", "state", "LowCardinality(String)"),
+            Field("flow_reason", "flow", "reason", "LowCardinality(String)"),
+            Field("flow_alerted", "flow", "alerted", "UInt8"),
+        ),
+        # 양이 가장 많음: 시간 단위로 묶은 뒤 IP 순 (시간 범위 + IP 조회 모두 pruning)
+        order_by="(toStartOfHour(timestamp), src_ip, dest_ip, timestamp)",
+        partition_by="toYYYYMMDD(date)",
+    ),
+    EventTable(
+        "http",
+        (
+            Field("http_hostname", "http", "hostname", "String", "ZSTD(1)"),
+            Field("http_url", "http", "url", "String", "ZSTD(1)"),
+            Field("http_http_user_agent", "http", "http_user_agent", "String", "ZSTD(1)"),
+            Field("http_http_method", "http", "http_method", "LowCardinality(String)"),
+            Field("http_protocol", "http", "protocol", "LowCardinality(String)"),
+            Field("http_status", "http", "status", "UInt16"),
+            Field("http_length", "http", "length", "UInt32", "T64, ZSTD(1)"),
+            # extended 출력
+            Field("http_refer", "http", "http_refer", "String", "ZSTD(1)"),
+            Field("http_content_type", "http", "http_content_type", "LowCardinality(String)"),
+            Field("http_redirect", "http", "redirect", "String", "ZSTD(1)"),
+            # dump-all-headers 를 켰을 때만 채워짐
+            nested("http_request_headers", "http", "request_headers", ("name", "name", "String"), ("value", "value", "String")),
+            nested("http_response_headers", "http", "response_headers", ("name", "name", "String"), ("value", "value", "String")),
+        ),
+        order_by="(toStartOfHour(timestamp), http_hostname, timestamp)",
+        indexes=(_SRC_IP_INDEX,),
+    ),
+    EventTable(
+        "dns",
+        (
+            Field("dns_type", "dns", "type", "LowCardinality(String)"),
+            Field("dns_id", "dns", "id", "UInt16", "ZSTD(1)"),
+            Field("dns_rrname", "dns", "rrname", "String", "ZSTD(1)"),
+            Field("dns_rrtype", "dns", "rrtype", "LowCardinality(String)"),
+            Field("dns_rcode", "dns", "rcode", "LowCardinality(String)"),
+            Field("dns_flags", "dns", "flags", "LowCardinality(String)"),
+            Field("dns_opcode", "dns", "opcode", "UInt8"),
+            # eve dns v3 는 질의를 queries 목록으로 출력
+            nested("dns_queries", "dns", "queries", ("rrname", "rrname", "String"), ("rrtype", "rrtype", "LowCardinality(String)")),
+            nested(
+                "dns_answers", "dns", "answers",
+                ("rrname", "rrname", "String"),
+                ("rrtype", "rrtype", "LowCardinality(String)"),
+                ("ttl", "ttl", "UInt32"),
+                ("rdata", "rdata", "String"),
+            ),
+        ),
+        order_by="(toStartOfHour(timestamp), dns_rrname, timestamp)",
+        partition_by="toYYYYMMDD(date)",
+        indexes=(_SRC_IP_INDEX,),
+    ),
+    EventTable(
+        "tls",
+        (
+            Field("tls_subject", "tls", "subject", "String", "ZSTD(1)"),
+            Field("tls_issuerdn", "tls", "issuerdn", "String", "ZSTD(1)"),
+            Field("tls_fingerprint", "tls", "fingerprint", "String", "ZSTD(1)"),
+            Field("tls_sni", "tls", "sni", "String", "ZSTD(1)"),
+            Field("tls_version", "tls", "version", "LowCardinality(String)"),
+            # extended 출력
+            Field("tls_serial", "tls", "serial", "String", "ZSTD(1)"),
+            Field("tls_notbefore", "tls", "notbefore", "String", "ZSTD(1)"),
+            Field("tls_notafter", "tls", "notafter", "String", "ZSTD(1)"),
+            Field("tls_ja3_hash", "tls.ja3", "hash", "String", "ZSTD(1)"),
+            Field("tls_ja3s_hash", "tls.ja3s", "hash", "String", "ZSTD(1)"),
+        ),
+        order_by="(toStartOfHour(timestamp), tls_sni, timestamp)",
+        indexes=(_SRC_IP_INDEX,),
+    ),
+    EventTable(
+        "fileinfo",
+        (
+            Field("fileinfo_filename", "fileinfo", "filename", "String", "ZSTD(1)"),
+            Field("fileinfo_magic", "fileinfo", "magic", "String", "ZSTD(1)"),
+            Field("fileinfo_state", "fileinfo", "state", "LowCardinality(String)"),
+            Field("fileinfo_size", "fileinfo", "size", "UInt64", "T64, ZSTD(1)"),
+            Field("fileinfo_md5", "fileinfo", "md5", "String", "ZSTD(1)"),
+            Field("fileinfo_sha1", "fileinfo", "sha1", "String", "ZSTD(1)"),
+            Field("fileinfo_sha256", "fileinfo", "sha256", "String", "ZSTD(1)"),
+            Field("fileinfo_stored", "fileinfo", "stored", "UInt8"),
+            Field("fileinfo_gaps", "fileinfo", "gaps", "UInt8"),
+            Field("fileinfo_tx_id", "fileinfo", "tx_id", "UInt32"),
+        ),
+        order_by="(timestamp, src_ip, dest_ip)",
+        indexes=("INDEX idx_fileinfo_sha256 fileinfo_sha256 TYPE bloom_filter(0.01) GRANULARITY 4",),
+    ),
+    EventTable(
+        "anomaly",
+        (
+            Field("anomaly_type", "anomaly", "type", "LowCardinality(String)"),
+            Field("anomaly_event", "anomaly", "event", "LowCardinality(String)"),
+            Field("anomaly_layer", "anomaly", "layer", "LowCardinality(String)"),
+            Field("anomaly_code", "anomaly", "code", "UInt32"),
+        ),
+        order_by="(anomaly_event, timestamp)",
+    ),
+    EventTable(
+        "drop",
+        (
+            Field("drop_reason", "drop", "reason", "LowCardinality(String)"),
+            Field("drop_len", "drop", "len", "UInt16"),
+            Field("drop_tos", "drop", "tos", "UInt8"),
+            Field("drop_ttl", "drop", "ttl", "UInt8"),
+            Field("drop_ipid", "drop", "ipid", "UInt16"),
+            Field("drop_tcpseq", "drop", "tcpseq", "UInt32"),
+            Field("drop_tcpack", "drop", "tcpack", "UInt32"),
+            Field("drop_tcpwin", "drop", "tcpwin", "UInt16"),
+            Field("drop_syn", "drop", "syn", "UInt8"),
+            Field("drop_ack", "drop", "ack", "UInt8"),
+            Field("drop_rst", "drop", "rst", "UInt8"),
+            Field("drop_fin", "drop", "fin", "UInt8"),
+            # drop 규칙으로 버려진 경우 해당 규칙
+            Field("alert_signature", "alert", "signature", "LowCardinality(String)"),
+            Field("alert_signature_id", "alert", "signature_id", "UInt32"),
+        ),
+        order_by="(timestamp, src_ip, dest_ip)",
+    ),
+    EventTable(
+        "ssh",
+        (
+            Field("ssh_client_proto_version", "ssh.client", "proto_version", "LowCardinality(String)"),
+            Field("ssh_client_software_version", "ssh.client", "software_version", "LowCardinality(String)"),
+            Field("ssh_server_proto_version", "ssh.server", "proto_version", "LowCardinality(String)"),
+            Field("ssh_server_software_version", "ssh.server", "software_version", "LowCardinality(String)"),
+        ),
+        order_by="(timestamp, src_ip, dest_ip)",
+    ),
+    EventTable(
+        "smtp",
+        (
+            Field("smtp_helo", "smtp", "helo", "String", "ZSTD(1)"),
+            Field("smtp_mail_from", "smtp", "mail_from", "String", "ZSTD(1)"),
+            array("smtp_rcpt_to", "smtp", "rcpt_to", "String"),
+            Field("email_status", "email", "status", "LowCardinality(String)"),
+            Field("email_from", "email", "from", "String", "ZSTD(1)"),
+            array("email_to", "email", "to", "String"),
+            Field("email_subject", "email", "subject", "String", "ZSTD(1)"),
+            array("email_attachment", "email", "attachment", "String"),
+        ),
+        order_by="(timestamp, src_ip, dest_ip)",
+    ),
+    EventTable(
+        OTHER_TYPE,
+        (
+            Field("event_type", None, "event_type", "LowCardinality(String)", default="unknown"),
+        ),
+        order_by="(event_type, timestamp)",
+    ),
+)}
+
+
+def table_for(event_type: Optional[str]) -> EventTable:
+    return EVENT_TABLES.get(event_type) or EVENT_TABLES[OTHER_TYPE]
+
+
+def table_fields(table: EventTable) -> Tuple[Field, ...]:
+    return COMMON_FIELDS + table.fields
+
+
+def table_columns(table: EventTable) -> List[str]:
+    """배치가 삽입하는 컬럼 순서 (raw_json 은 CLICKHOUSE_STORE_RAW_JSON 일 때만)"""
+    columns = ["timestamp", "date"] + list(PORT_COLUMNS) + list(ORIGIN_COLUMNS)
+    for field in table_fields(table):
+        columns += field_columns(field)
+    if settings.CLICKHOUSE_STORE_RAW_JSON:
+        columns.append("raw_json")
+    return columns
+
+
+def event_table_ddl(table: EventTable) -> str:
+    columns = [column_ddl("timestamp", "DateTime64(6)", "Delta, ZSTD(1)")]
+    columns += [column_ddl(name, "UInt16", "ZSTD(1)") for name in PORT_COLUMNS]
+    columns += [f"{name} {ORIGIN_TYPE} DEFAULT ''" for name in ORIGIN_COLUMNS]
+    columns += [f"{field.column} {field_definition(field)}" for field in table_fields(table)]
+    # raw_json 을 저장하지 않도록 설정해도 view/조회가 동작하도록 컬럼은 둔다 (빈 값은 공간을 거의 차지하지 않음)
+    columns += ["raw_json String DEFAULT '' CODEC(ZSTD(3))", "date Date DEFAULT toDate(timestamp)"]
+    columns += list(table.indexes)
+    ttl_days = settings.CLICKHOUSE_EVENT_TTL_DAYS.get(table.event_type, 90)
+    body = ",\n        ".join(columns)
+    return f"""
+    CREATE TABLE IF NOT EXISTS {table.qualified_name}
+    (
+        {body}
+    )
+    ENGINE = MergeTree()
+    PARTITION BY {table.partition_by}
+    ORDER BY {table.order_by}
+    TTL date + INTERVAL {ttl_days} DAY
+    SETTINGS index_granularity = 8192, ttl_only_drop_parts = 1
+    """
+
+
+def compat_view_ddl(include_wide: bool) -> str:
+    """events view: 타입별 테이블을 이전 단일 테이블 컬럼 형태로 UNION ALL
+
+    테이블에 없는 컬럼은 이전 타입의 NULL 로 채운다. 조건은 각 테이블로 전달되며
+    event_type 조건은 상수 비교가 되어 해당하지 않는 테이블은 읽지 않는다.
+    sensor/source 는 이전 컬럼 뒤에 붙인다 (wide 테이블은 빈 값).
+    """
+    database = settings.CLICKHOUSE_DATABASE
+    selects = []
+    for table in EVENT_TABLES.values():
+        present = {field.column for field in table_fields(table)} | set(PORT_COLUMNS) | {"timestamp", "raw_json"}
+        columns = []
+        for name, column_type, _ in WIDE_COLUMNS:
+            if name == "event_type" and name not in present:
+                columns.append(f"CAST({table.event_type_expr} AS LowCardinality(String)) AS event_type")
+            elif name in present:
+                columns.append(name)
+            else:
+                columns.append(f"CAST(NULL AS {column_type}) AS {name}")
+        columns.append("date")
+        columns += ORIGIN_COLUMNS
+        selects.append(f"SELECT {', '.join(columns)} FROM {table.qualified_name}")
+
+    if include_wide:
+        columns = [name for name, _, _ in WIDE_COLUMNS] + ["date"]
+        columns += [f"CAST('' AS {ORIGIN_TYPE}) AS {name}" for name in ORIGIN_COLUMNS]
+        selects.append(f"SELECT {', '.join(columns)} FROM {database}.{settings.CLICKHOUSE_TABLE}{WIDE_SUFFIX}")
+
+    union = "\n    UNION ALL\n    ".join(selects)
+    return f"CREATE OR REPLACE VIEW {database}.{settings.CLICKHOUSE_TABLE} AS\n    {union}"
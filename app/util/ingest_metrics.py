@@ -0,0 +1,67 @@
+"""수집 파이프라인 지표 (/metrics, INGEST_METRICS_PORT)
+
+inline 모드는 API 프로세스, process 모드는 ingest.py 의 writer 프로세스에서 갱신된다.
+라인/바이트/이벤트 수는 블록(chunk) 단위로 모아서 더한다.
+버퍼 깊이처럼 다른 모듈이 가진 값은 그 모듈에서 set_function 으로 연결한다.
+"""
+import os
+from typing import Dict
+
+from app.util.checkpoint import LogPosition
+from app.util.metrics import registry
+
+lines_read = registry.counter("ingest_lines_read_total", "eve 파일에서 읽은 라인 수 (빈 라인 제외)")
+bytes_read = registry.counter("ingest_bytes_read_total", "eve 파일에서 읽은 바이트 수")
+parse_errors = registry.counter("ingest_parse_errors_total", "JSON 디코딩/변환에 실패한 라인 수")
+events = registry.counter("ingest_events_total", "event_type 별 수집 이벤트 수", ["event_type"])
+dropped_events = registry.counter("ingest_dropped_events_total", "backpressure drop 정책으로 버린 이벤트 수")
+
+batch_size = registry.histogram(
+    "ingest_batch_size", "삽입 대기열에 들어간 배치의 이벤트 수",
+    (1, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000)
+)
+insert_duration = registry.histogram(
+    "clickhouse_insert_duration_seconds", "배치 1개 삽입 시간 (테이블별 insert 합계)",
+    (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+inserted_events = registry.counter("clickhouse_inserted_events_total", "ClickHouse 에 저장된 이벤트 수")
+insert_errors = registry.counter("clickhouse_insert_errors_total", "실패한 배치 삽입 수 (재시도 포함)")
+dead_letter_events = registry.counter(
+    "clickhouse_dead_letter_events_total", "삽입할 수 없어 dead letter 로 옮긴 이벤트 수", ["table"]
+)
+
+buffered_events = registry.gauge("ingest_buffered_events", "메모리 버퍼 + 삽입 대기/진행 중인 이벤트 수")
+pending_batches = registry.gauge("ingest_pending_batches", "삽입 대기 중인 배치 수")
+spill_bytes = registry.gauge("ingest_spill_bytes", "디스크로 스필된 배치 크기")
+clickhouse_connected = registry.gauge("clickhouse_connected", "ClickHouse 연결 여부 (1/0)")
+tail_lag = registry.gauge("ingest_tail_lag_bytes", "파일 끝(EOF)까지 아직 읽지 않은 바이트 수", ["source"])
+
+
+class TailPositions:
+    """소스별 마지막으로 읽은 위치 -> 스크랩 시 파일 크기와 비교해 EOF 까지의 lag 계산
+
+    같은 inode 면 (크기 - 위치), rotate 되어 inode 가 바뀌었으면 새 파일 크기 전체를 lag 로 본다.
+    """
+
+    def __init__(self):
+        self.positions: Dict[str, LogPosition] = {}
+
+    def update(self, position: LogPosition):
+        self.positions[position.source] = position
+
+    def lag(self) -> Dict[tuple, int]:
+        lags = {}
+        for source, position in self.positions.items():
+            try:
+                st = os.stat(source)
+            except OSError:
+                continue
+            if (st.st_dev, st.st_ino) == (position.dev, position.inode):
+                lags[(source,)] = max(0, st.st_size - position.offset)
+            else:
+                lags[(source,)] = st.st_size
+        return lags
+
+
+tail_positions = TailPositions()
+tail_lag.set_function(tail_positions.lag)
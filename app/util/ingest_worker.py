@@ -0,0 +1,117 @@
+"""멀티 프로세스 수집 파이프라인의 reader / 워커 프로세스 함수
+
+reader 프로세스는 eve 파일들(SURICATA_LOG_SOURCES)을 라인 경계로 자른 블록을
+순번과 함께 작업 큐에 넣고, 워커 프로세스들은 블록을 디코딩하여 테이블별 컬럼 배치
+(RoutedBatch)를 만들어 결과 큐로 보낸다. 삽입과 체크포인트는 writer
+(app.service.ingest_pipeline)가 순번 순서대로 처리한다.
+
+spawn 방식으로 실행되므로 이 모듈은 ClickHouse 클라이언트를 import 하지 않는다.
+"""
+import asyncio
+import logging
+import signal
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from app.util.column_batch import RoutedBatch
+from app.util.eve_decoder import decode_line
+from app.util.eve_tailer import EveTailer, FileIdentity, MultiTailer, open_log_sources
+from app.util.log_config import configure_logging
+
+log = logging.getLogger(__name__)
+
+
+class ChunkTask(NamedTuple):
+    """reader -> 워커: 라인 경계로 자른 블록 1개"""
+    seq: int
+    sensor: str
+    source: str
+    identity: FileIdentity
+    end: int
+    data: bytes
+
+
+class ChunkResult(NamedTuple):
+    """워커 -> writer: 블록 1개를 디코딩한 배치"""
+    seq: int
+    source: str
+    identity: FileIdentity
+    end: int
+    batch: RoutedBatch
+    alerts: int
+    invalid: int
+    lines: int
+    size: int  # 블록 바이트 수
+    event_types: Dict[str, int]
+
+
+def decode_chunk(task: ChunkTask) -> ChunkResult:
+    """블록의 라인을 디코딩하여 테이블별 컬럼 배치로 (원본 라인은 raw_json 으로)"""
+    batch = RoutedBatch()
+    alerts = 0
+    invalid = 0
+    lines = 0
+    event_types: Dict[str, int] = {}
+    for line in task.data.split(b"\n"):
+        line = line.strip()
+        if not line:
+            continue
+        lines += 1
+        data = decode_line(line)
+        if data is None:
+            invalid += 1
+            continue
+        try:
+            batch.append(data, line, task.sensor, task.source)
+        except Exception as e:
+            # 예외로 워커가 죽으면 재시작 후 같은 블록에서 다시 죽으므로 라인만 건너뛴다
+            invalid += 1
+            log.warning("배치에 넣을 수 없는 이벤트 건너뜀 (%s, 블록 끝 %d): %s", task.source, task.end, e)
+            continue
+        event_type = data.get("event_type", "unknown")
+        event_types[event_type] = event_types.get(event_type, 0) + 1
+        if event_type == "alert":
+            alerts += 1
+    return ChunkResult(
+        task.seq, task.source, task.identity, task.end, batch, alerts, invalid,
+        lines, len(task.data) + 1, event_types
+    )
+
+
+def worker_main(tasks, results):
+    """워커 프로세스: 작업 큐가 None 을 줄 때까지 블록을 배치로 변환"""
+    # 종료는 부모가 작업 큐에 None 을 넣어 알린다 (Ctrl+C 는 부모만 처리)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # spawn 된 프로세스는 부모의 로깅 설정을 물려받지 않는다
+    configure_logging()
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        results.put(decode_chunk(task))
+    results.put(None)
+
+
+async def _read_blocks(tailer: MultiTailer, tasks, stop):
+    loop = asyncio.get_running_loop()
+    seq = 0
+    while not stop.is_set():
+        idle = True
+        for tailed, block in tailer.read_round(EveTailer.read_block):
+            idle = False
+            task = ChunkTask(seq, tailed.sensor, tailed.source, block.identity, block.end, block.data)
+            # 작업 큐가 가득 차면 (워커가 밀리면) 읽기도 멈춘다
+            await loop.run_in_executor(None, tasks.put, task)
+            seq += 1
+        if idle:
+            await tailer.watcher.wait(tailer.poll_interval)
+
+
+def reader_main(positions: Optional[Dict[str, Tuple[int, FileIdentity]]], tasks, stop):
+    """reader 프로세스: stop 이 설정될 때까지 eve 파일들을 tail 하여 작업 큐에 넣기"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    configure_logging()
+    tailer = open_log_sources(positions)
+    try:
+        asyncio.run(_read_blocks(tailer, tasks, stop))
+    finally:
+        tailer.close()
@@ -0,0 +1,66 @@
+"""로깅 설정 (레벨 + 같은 메시지 반복 제한)
+
+각 모듈은 logging.getLogger(__name__) 을 쓰고, 메시지는 "%d개 저장" 처럼
+%-형식 템플릿과 인자로 남긴다. 레벨이 꺼진 메시지는 문자열을 만들지 않고,
+같은 템플릿은 LOG_RATE_INTERVAL 초마다 LOG_RATE_LIMIT 번까지만 출력한다
+(생략된 수는 다음에 출력되는 같은 메시지 뒤에 붙는다).
+"""
+import sys
+import time
+import logging
+import threading
+from typing import Dict, Tuple
+
+from app.core.config import settings
+
+LOG_FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+
+
+class RateLimitFilter(logging.Filter):
+    """(로거, 메시지 템플릿) 별로 interval 초 동안 limit 개까지만 통과"""
+
+    def __init__(self, limit: int, interval: float):
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        # 키 -> [구간 시작, 구간 내 출력 수, 생략 수]
+        self._windows: Dict[Tuple[str, str], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.limit <= 0:
+            return True
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window is not None else 0
+                window = self._windows[key] = [now, 0, 0]
+            else:
+                suppressed = 0
+            if window[1] >= self.limit:
+                window[2] += 1
+                return False
+            window[1] += 1
+            if len(self._windows) > 10000:
+                # 템플릿이 아닌 메시지가 섞여도 메모리가 늘지 않도록 오래된 구간 정리
+                for stale in [k for k, w in self._windows.items() if now - w[0] >= self.interval]:
+                    del self._windows[stale]
+        if suppressed:
+            record.msg = f"{record.getMessage()} (직전 {self.interval:g}초 동안 같은 메시지 {suppressed}개 생략)"
+            record.args = None
+        return True
+
+
+def configure_logging(level: str = None):
+    """루트 로거에 stderr 핸들러 + 반복 제한 필터 설정 (여러 번 호출해도 한 번만)"""
+    root = logging.getLogger()
+    root.setLevel((level or settings.LOG_LEVEL).upper())
+    if any(getattr(handler, "_suricata_monitor", False) for handler in root.handlers):
+        return
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    handler.addFilter(RateLimitFilter(settings.LOG_RATE_LIMIT, settings.LOG_RATE_INTERVAL))
+    handler._suricata_monitor = True
+    root.addHandler(handler)
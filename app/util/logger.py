@@ -1,146 +1,131 @@
-import json
 import asyncio
-import subprocess
-from typing import Optional, List
-from datetime import datetime
+import logging
+from typing import Dict
 
-from app.model.alert import Alert
 from app.core.config import settings
 from app.util.clickhouse_client import clickhouse_client
+from app.util.eve_tailer import open_log_sources
+from app.util.checkpoint import LogPosition, ingest_checkpoint
+from app.util.eve_decoder import JSON_BACKEND, decode_line
+from app.util.alert_store import AlertStore
+from app.util.alert_broadcaster import AlertBroadcaster
+from app.util import ingest_metrics
+from app.util.metrics import registry
 
-# 메모리 캐시 (임시로 만듦듦) - API 응답용
-alert_cache: List[Alert] = []
-MAX_CACHE_SIZE = 1000
+log = logging.getLogger(__name__)
 
-async def parse_eve_log_line(line: str) -> Optional[Alert]:
-    """EVE JSON 로그 라인 파싱"""
-    try:
-        line = line.strip()
-        if not line:
-            return None
-            
-        data = json.loads(line)
-        
-        # alert 이벤트만
-        if data.get("event_type") == "alert":
-            alert = Alert(
-                timestamp=datetime.fromisoformat(data["timestamp"].replace("Z", "+00:00")),
-                event_type=data["event_type"],
-                src_ip=data.get("src_ip", "unknown"),
-                src_port=data.get("src_port"),
-                dest_ip=data.get("dest_ip", "unknown"),
-                dest_port=data.get("dest_port"),
-                proto=data.get("proto", "unknown"),
-                alert_signature=data.get("alert", {}).get("signature"),
-                alert_severity=data.get("alert", {}).get("severity"),
-                payload=data.get("payload")
-            )
-            return alert
-            
-    except json.JSONDecodeError:
-        pass
-    except Exception as e:
-        print(f"예상치 못한 파싱 오류: {e}")
-    
-    return None
+# 메모리 캐시 - API 응답용 (고정 용량 컬럼형 ring buffer, severity/IP/시그니처 인덱스)
+alert_cache = AlertStore(settings.ALERT_CACHE_SIZE, settings.ALERT_CACHE_PAYLOAD_SIZE)
+# 실시간 스트림 구독자에게 이벤트 전달
+alert_broadcaster = AlertBroadcaster(settings.ALERT_STREAM_QUEUE_SIZE, settings.ALERT_STREAM_MAX_CLIENTS)
+registry.gauge("alert_cache_size", "메모리 alert 캐시에 보관 중인 alert 수").set_function(lambda: len(alert_cache))
+
+# 저장하지 않는 모드에서 구독자가 없을 때 디코딩 없이 alert 가 아닌 라인을 거르는 표식
+ALERT_MARKER = b'"event_type":"alert"'
+
+async def monitor_logs(store: bool = True):
+    """eve 파일(SURICATA_LOG_SOURCES) tail 및 ClickHouse 저장
 
-async def monitor_logs():
-    """WSL 파일 모니터링 및 ClickHouse 저장"""
-    global alert_cache
+    여러 파일/glob 을 하나의 태스크에서 돌아가며 읽고, 파일마다 체크포인트를 둔다.
+    store 가 False 이면 (INGEST_MODE=process) 저장은 수집 프로세스(ingest.py)에 맡기고
+    파일 끝부터 읽어 alert 캐시와 실시간 스트림만 채운다.
+    """
+    log.info("로그 모니터링 시작: %s", settings.SURICATA_LOG_SOURCES)
     
-    # WSL 경로를 직접 문자열로 사용
-    wsl_log_path = "/var/log/suricata/eve.json"
-    print(f"로그 모니터링 시작: {wsl_log_path}")
-    print(f"ClickHouse 활성화")
+    positions = None
+    if store:
+        log.info("ClickHouse 활성화 (JSON 디코더: %s)", JSON_BACKEND)
+        ingest_checkpoint.load()
+        positions = ingest_checkpoint.resume_positions()
+    else:
+        log.info("ClickHouse 저장은 수집 프로세스가 담당 - alert 캐시/스트림만 갱신")
+    
+    tailer = open_log_sources(positions, from_end=not store)
     
     try:
-        try:
-            result = subprocess.run(
-                ["wsl", "head", "-1", wsl_log_path],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            if result.returncode == 0:
-                pass
-            else:
-                print(f"WSL 파일 접근 실패: {result.stderr}")
-                return
-        except Exception as e:
-            print(f"WSL 연결 오류: {e}")
-            return
-        
-        last_lines_count = 0
-        
         while True:
             try:
-                # WSL을 통해 파일의 총 라인 수 확인
-                result = subprocess.run(
-                    ["wsl", "wc", "-l", wsl_log_path],
-                    capture_output=True,
-                    text=True,
-                    timeout=10
-                )
-                
-                if result.returncode == 0:
-                    current_lines = int(result.stdout.split()[0])
+                async for tailed, chunk in tailer.follow():
+                    alert_count = 0
+                    total_events = 0
+                    line_count = 0
+                    invalid = 0
+                    type_counts: Dict[str, int] = {}
+                    sensor, source = tailed.sensor, tailed.source
+                    dev, inode = chunk.identity
+                    offset = chunk.start
                     
-                    if current_lines > last_lines_count:
-                        print(f"새로운 로그 라인 감지: {last_lines_count} -> {current_lines}")
+                    for line in chunk.lines:
+                        # 이 라인의 끝(개행 다음) 위치
+                        offset += len(line) + 1
+                        line = line.strip()
+                        if not line:
+                            continue
+                        line_count += 1
+                        if not store and not alert_broadcaster and ALERT_MARKER not in line:
+                            continue
+                        # 라인당 한 번만 디코딩하여 ClickHouse 와 alert 캐시가 공유
+                        data = decode_line(line)
+                        if data is None:
+                            invalid += 1
+                            continue
+                        event_type = data.get("event_type", "unknown")
+                        if event_type.__class__ is not str:
+                            invalid += 1
+                            continue
                         
-                        new_lines = current_lines - last_lines_count
-                        result = subprocess.run(
-                            ["wsl", "tail", "-n", str(new_lines), wsl_log_path],
-                            capture_output=True,
-                            text=True,
-                            timeout=10
-                        )
+                        # ClickHouse에 모든 이벤트 저장 (원본 라인을 raw_json 으로)
+                        if store:
+                            try:
+                                await clickhouse_client.add_to_batch(
+                                    data, LogPosition(source, dev, inode, offset), line, sensor
+                                )
+                            except (ValueError, TypeError, AttributeError, OverflowError) as e:
+                                # 컬럼에 넣을 수 없는 이벤트는 건너뛰고 블록의 나머지를 계속 처리
+                                invalid += 1
+                                log.warning("배치에 넣을 수 없는 이벤트 건너뜀 (%s:%d): %s", source, offset, e)
+                                continue
                         
-                        if result.returncode == 0 and result.stdout.strip():
-                            lines = result.stdout.strip().split('\n')
-                            
-                            alert_count = 0
-                            total_events = 0
-                            
-                            for line in lines:
-                                line = line.strip()
-                                if line:
-                                    try:
-                                        data = json.loads(line)
-                                        event_type = data.get("event_type", "unknown")
-                                        total_events += 1
-                                        
-                                        # ClickHouse에 모든 이벤트 저장
-                                        await clickhouse_client.add_to_batch(data)
-                                        
-                                        # alert 이벤트는 메모리 캐시에도 저장 (API 응답용)
-                                        if event_type == "alert":
-                                            alert_count += 1
-                                            alert = await parse_eve_log_line(line)
-                                            if alert:
-                                                alert_cache.append(alert)
-                                                print(f"  → Alert: {alert.alert_signature} (심각도: {alert.alert_severity})")
-                                                print(f"     출발지: {alert.src_ip}:{alert.src_port} → 목적지: {alert.dest_ip}:{alert.dest_port}")
-                                                if len(alert_cache) > MAX_CACHE_SIZE:
-                                                    alert_cache.pop(0)
-                                    
-                                    except json.JSONDecodeError:
-                                        pass
-                            
-                            if total_events > 0:
-                                print(f" {total_events}개 이벤트 처리 완료 (Alert: {alert_count}개)")
+                        type_counts[event_type] = type_counts.get(event_type, 0) + 1
+                        total_events += 1
                         
-                        last_lines_count = current_lines
-                
-                # 3초마다 체크
-                await asyncio.sleep(3)
-                
-            except subprocess.TimeoutExpired:
-                print("WSL 명령어 타임아웃...")
-                await asyncio.sleep(10)
+                        # 스트림 구독자가 있으면 원본 라인 그대로 전달
+                        if alert_broadcaster:
+                            alert_broadcaster.publish(data, line)
+                            if total_events % alert_broadcaster.YIELD_EVERY == 0:
+                                await asyncio.sleep(0)
+                        
+                        # alert 이벤트는 메모리 캐시에도 저장 (API 응답용)
+                        if event_type == "alert":
+                            alert_count += 1
+                            try:
+                                alert_cache.add_event(data)
+                            except Exception as e:
+                                invalid += 1
+                                log.warning("예상치 못한 파싱 오류: %s", e)
+                                continue
+                            if log.isEnabledFor(logging.DEBUG):
+                                alert_info = data.get("alert") or {}
+                                log.debug(
+                                    "Alert: %s (심각도: %s) %s:%s -> %s:%s",
+                                    alert_info.get("signature"), alert_info.get("severity"),
+                                    data.get("src_ip", "unknown"), data.get("src_port"),
+                                    data.get("dest_ip", "unknown"), data.get("dest_port")
+                                )
+                    
+                    ingest_metrics.lines_read.inc(line_count)
+                    ingest_metrics.bytes_read.inc(offset - chunk.start)
+                    ingest_metrics.events.inc_counts(type_counts)
+                    if invalid:
+                        ingest_metrics.parse_errors.inc(invalid)
+                    ingest_metrics.tail_positions.update(LogPosition(source, dev, inode, offset))
+                    if total_events > 0:
+                        log.debug("%d개 이벤트 처리 완료 (Alert: %d개)", total_events, alert_count)
+            
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                print(f"log monitor error: {e}")
+                log.error("로그 모니터 오류, 10초 후 재시도: %s", e)
                 await asyncio.sleep(10)
-                
-    except Exception as e:
-        print(f"log monitor error: {e}")
\ No newline at end of file
+    finally:
+        tailer.close()
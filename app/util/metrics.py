@@ -0,0 +1,190 @@
+"""Prometheus 텍스트 형식(0.0.4) 지표 (외부 라이브러리 없이 최소 구현)
+
+Counter / Gauge / Histogram 을 registry 에 등록하고 /metrics 에서 render() 로 내보낸다.
+값 갱신은 dict / list 연산 1번 수준이라 수집 루프에서 호출해도 부담이 적지만,
+잠금이 없으므로 이벤트 루프 스레드에서만 갱신한다 (스레드에서 측정한 값은 루프에서 반영).
+Gauge 는 set_function 으로 스크랩 시점에 값을 읽어올 수 있다 (버퍼 깊이, 캐시 크기 등).
+"""
+import math
+import asyncio
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple, Union
+
+LabelValues = Tuple[str, ...]
+GaugeValue = Union[float, Dict[LabelValues, float]]
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, int) or (isinstance(value, float) and value.is_integer()):
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def samples(self) -> Iterable[Tuple[str, LabelValues, Sequence[str], float]]:
+        """(이름, 라벨 값, 라벨 이름, 값)"""
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, values, labelnames, value in self.samples():
+            lines.append(f"{name}{_labels(labelnames, values)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    """단조 증가 값 (라벨이 있으면 라벨 값 튜플별)"""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[LabelValues, float] = {} if labelnames else {(): 0}
+
+    def inc(self, amount: float = 1, labels: LabelValues = ()):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def inc_counts(self, counts: Dict[str, int]):
+        """라벨 1개짜리 카운터에 {라벨 값: 증가량} 을 한 번에 더하기"""
+        values = self.values
+        for label, amount in counts.items():
+            key = (label,)
+            values[key] = values.get(key, 0) + amount
+
+    def samples(self):
+        for values, value in sorted(self.values.items()):
+            yield self.name, values, self.labelnames, value
+
+
+class Gauge(Metric):
+    """현재 값. set_function 을 쓰면 스크랩할 때 함수 결과를 사용
+
+    라벨이 있으면 함수는 {라벨 값 튜플: 값} 을 반환한다.
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[LabelValues, float] = {} if labelnames else {(): 0}
+        self._function: Union[Callable[[], GaugeValue], None] = None
+
+    def set(self, value: float, labels: LabelValues = ()):
+        self.values[labels] = value
+
+    def set_function(self, function: Callable[[], GaugeValue]):
+        self._function = function
+
+    def samples(self):
+        values = self.values
+        if self._function is not None:
+            result = self._function()
+            values = result if isinstance(result, dict) else {(): result}
+        for labels, value in sorted(values.items()):
+            yield self.name, labels, self.labelnames, value
+
+
+class Histogram(Metric):
+    """구간별 누적 분포 (bucket 상한은 오름차순, +Inf 는 자동 추가)"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float]):
+        super().__init__(name, documentation)
+        self.bounds = sorted(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        # le(이하) 기준이므로 경계값은 그 bucket 에 포함
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        cumulative = 0
+        for bound, count in zip(self.bounds + [math.inf], self.counts):
+            cumulative += count
+            yield f"{self.name}_bucket", (_format_value(bound),), ("le",), cumulative
+        yield f"{self.name}_sum", (), (), self.sum
+        yield f"{self.name}_count", (), (), self.count
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self.metrics:
+            raise ValueError(f"이미 등록된 지표: {metric.name}")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, buckets: Sequence[float]) -> Histogram:
+        return self.register(Histogram(name, documentation, buckets))
+
+    def render(self) -> str:
+        """등록된 지표 전체를 Prometheus 텍스트 형식으로"""
+        lines: List[str] = []
+        for metric in self.metrics.values():
+            try:
+                lines.extend(metric.render())
+            except Exception:
+                # 값을 읽지 못한 지표(set_function 오류)만 빼고 나머지는 내보낸다
+                continue
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+async def start_metrics_server(registry: "MetricsRegistry", host: str, port: int) -> asyncio.AbstractServer:
+    """GET /metrics 만 처리하는 최소 HTTP 서버 (API 서버가 없는 수집 프로세스용)"""
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 10)
+            method, _, rest = request.partition(b" ")
+            path = rest.split(b" ", 1)[0].split(b"?", 1)[0]
+            if method == b"GET" and path == b"/metrics":
+                status, content_type, body = "200 OK", CONTENT_TYPE, registry.render().encode()
+            else:
+                status, content_type, body = "404 Not Found", "text/plain", b"not found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+registry = MetricsRegistry()
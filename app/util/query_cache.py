@@ -0,0 +1,68 @@
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class QueryCache:
+    """조회 결과 TTL 캐시 + 동일 요청 합치기(single-flight)
+
+    같은 키의 조회가 진행 중이면 새로 실행하지 않고 그 결과를 함께 기다린다.
+    실패한 결과는 캐시하지 않으며, 기다리던 요청 모두에게 같은 예외가 전달된다.
+    항목 수가 max_entries 를 넘으면 가장 오래 쓰이지 않은 것부터 버린다.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get_or_compute(self, key: Hashable, ttl: float, compute: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if time.monotonic() < expires_at:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            # 별도 태스크로 실행하여 먼저 요청한 클라이언트가 끊겨도 조회는 계속됨
+            task = asyncio.create_task(self._compute(key, ttl, compute))
+            self._inflight[key] = task
+            # 기다리는 요청이 모두 끊긴 뒤 실패해도 "exception was never retrieved" 경고가 없도록
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return await asyncio.shield(task)
+
+    async def _compute(self, key: Hashable, ttl: float, compute: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await compute()
+        finally:
+            self._inflight.pop(key, None)
+
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        self._entries.clear()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
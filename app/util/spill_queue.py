@@ -0,0 +1,160 @@
+import logging
+import os
+import json
+import zlib
+import pickle
+import struct
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Sequence
+
+log = logging.getLogger(__name__)
+
+
+class SpillRecord(NamedTuple):
+    """스필 파일에 저장된 배치 1개"""
+    table: str
+    column_names: List[str]
+    columns: List[Sequence]
+    segment: str
+    next_offset: int  # 이 레코드 다음 위치
+
+
+class SpillQueue:
+    """ClickHouse 장애 시 배치를 보관하는 로컬 append-only 큐
+
+    세그먼트 파일(spill-000000000001.seg ...)에 [길이(4) | crc32(4) | zlib(pickle)]
+    형식의 레코드를 이어 붙인다. 재전송이 끝난 위치는 cursor.json 에 기록하며
+    끝까지 소비된 세그먼트는 삭제한다. 단일 스레드에서만 호출해야 한다.
+    """
+
+    HEADER = struct.Struct(">II")
+    CURSOR_FILE = "cursor.json"
+
+    def __init__(self, directory: Path, segment_bytes: int = 64 * 1024 * 1024, max_bytes: int = 0):
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes  # 0 이면 제한 없음
+        self.total_bytes = 0
+
+        self._segments: List[str] = []
+        self._writer = None
+        self._cursor_segment: Optional[str] = None
+        self._cursor_offset = 0
+        self._opened = False
+
+    def open(self):
+        if self._opened:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._segments = sorted(p.name for p in self.directory.glob("spill-*.seg"))
+        self.total_bytes = sum((self.directory / name).stat().st_size for name in self._segments)
+
+        try:
+            with open(self.directory / self.CURSOR_FILE, "r", encoding="utf-8") as f:
+                cursor = json.load(f)
+            if cursor.get("segment") in self._segments:
+                self._cursor_segment = cursor["segment"]
+                self._cursor_offset = cursor.get("offset", 0)
+                # 커서 이전 세그먼트는 이미 전송 완료
+                for name in self._segments[:self._segments.index(self._cursor_segment)]:
+                    self._remove_segment(name)
+        except (FileNotFoundError, ValueError):
+            pass
+
+        if self._segments:
+            log.info("스필 큐 복구: 세그먼트 %d개, %d bytes", len(self._segments), self.total_bytes)
+        self._opened = True
+
+    def has_data(self) -> bool:
+        return bool(self._segments)
+
+    def append(self, table: str, column_names: List[str], columns: List[Sequence]) -> bool:
+        """배치 1개를 디스크에 기록 (fsync 까지). 용량 초과면 False"""
+        self.open()
+        payload = zlib.compress(
+            pickle.dumps((table, column_names, columns), protocol=pickle.HIGHEST_PROTOCOL), 1
+        )
+        size = self.HEADER.size + len(payload)
+        if self.max_bytes and self.total_bytes + size > self.max_bytes:
+            return False
+
+        if self._writer is None or self._writer.tell() >= self.segment_bytes:
+            self._roll_segment()
+
+        self._writer.write(self.HEADER.pack(len(payload), zlib.crc32(payload)))
+        self._writer.write(payload)
+        self._writer.flush()
+        os.fsync(self._writer.fileno())
+
+        self.total_bytes += size
+        return True
+
+    def _roll_segment(self):
+        if self._writer is not None:
+            self._writer.close()
+        last = int(self._segments[-1][6:-4]) if self._segments else 0
+        name = f"spill-{last + 1:012d}.seg"
+        self._writer = open(self.directory / name, "ab")
+        self._segments.append(name)
+
+    def peek(self) -> Optional[SpillRecord]:
+        """가장 오래된 미전송 레코드 읽기 (소비하지 않음)"""
+        self.open()
+        while self._segments:
+            segment = self._segments[0]
+            offset = self._cursor_offset if segment == self._cursor_segment else 0
+            path = self.directory / segment
+
+            with open(path, "rb") as f:
+                f.seek(offset)
+                header = f.read(self.HEADER.size)
+                if len(header) == self.HEADER.size:
+                    length, crc = self.HEADER.unpack(header)
+                    payload = f.read(length)
+                    if len(payload) == length and zlib.crc32(payload) == crc:
+                        table, column_names, columns = pickle.loads(zlib.decompress(payload))
+                        return SpillRecord(table, column_names, columns, segment, offset + self.HEADER.size + length)
+                    log.error("스필 레코드 손상, 세그먼트 나머지 폐기: %s@%d", segment, offset)
+
+            if self._is_active(segment):
+                # 기록 중인 세그먼트를 끝까지 읽었으면 닫고 정리
+                self._writer.close()
+                self._writer = None
+            self._remove_segment(segment)
+            self._save_cursor(None, 0)
+        return None
+
+    def advance(self, record: SpillRecord):
+        """peek 한 레코드를 전송 완료로 표시"""
+        self._cursor_segment = record.segment
+        self._cursor_offset = record.next_offset
+        self._save_cursor(record.segment, record.next_offset)
+
+    def _is_active(self, segment: str) -> bool:
+        return self._writer is not None and self._segments and self._segments[-1] == segment
+
+    def _remove_segment(self, name: str):
+        path = self.directory / name
+        try:
+            self.total_bytes -= path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        self._segments.remove(name)
+        self.total_bytes = max(0, self.total_bytes)
+        if self._cursor_segment == name:
+            self._cursor_segment = None
+            self._cursor_offset = 0
+
+    def _save_cursor(self, segment: Optional[str], offset: int):
+        tmp_path = self.directory / (self.CURSOR_FILE + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"segment": segment, "offset": offset}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.directory / self.CURSOR_FILE)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
@@ -0,0 +1,206 @@
+"""Suricata stats 이벤트 -> 카운터 시계열 (metrics 테이블)
+
+stats 이벤트(event_type: stats)는 누적 카운터 수백 개를 담은 객체 1개다.
+이를 "capture.kernel_packets" 같은 점 경로로 펼쳐 카운터 1개당 1행으로
+{database}.{CLICKHOUSE_METRICS_TABLE} 에 저장한다 (좁은 테이블).
+
+- iface '' 는 전체 합계(stats 최상위), 인터페이스 이름이 있는 행은 stats.threads 의
+  워커 스레드(W#01-eth0 처럼 이름 뒤에 인터페이스)를 인터페이스별로 합산한 값
+  (suricata.yaml 의 eve stats 에 threads: yes 필요)
+- value 는 누적값(메모리 사용량 같은 gauge 는 현재값), delta 는 같은
+  (sensor, iface, metric) 의 직전 샘플 대비 변화량. Suricata 가 재시작되어
+  uptime 이 줄었으면 카운터가 0 부터 다시 시작한 것이므로 delta = value
+- 값이 계속 0 인 카운터는 처음 0 이 아닌 값이 나올 때까지 저장하지 않는다 (decoder.event.* 등).
+  0 은 기준값으로 기억하므로 첫 증가분도 delta 에 들어간다
+
+delta 는 샘플 순서에 의존하므로 워커가 만든 배치도 writer 가 로그 순서대로
+compute() 를 호출할 때 계산한다 (StatsDeltaTracker 는 writer 에만 있음).
+정렬 키가 (sensor, metric, iface, timestamp) 라 같은 카운터의 값이 연속으로 놓여
+timestamp/value 는 DoubleDelta, delta 는 T64 로 거의 압축된다.
+"""
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from app.core.config import settings
+from app.util.eve_time import event_ticks
+
+STATS_TYPE = "stats"
+TOTAL_IFACE = ""
+
+METRICS_COLUMNS: Tuple[str, ...] = ("timestamp", "date", "sensor", "iface", "metric", "value", "delta")
+
+
+class MetricsTable(NamedTuple):
+    event_type: str
+    name: str
+
+    @property
+    def qualified_name(self) -> str:
+        return f"{settings.CLICKHOUSE_DATABASE}.{self.name}"
+
+
+METRICS_TABLE = MetricsTable(STATS_TYPE, settings.CLICKHOUSE_METRICS_TABLE)
+
+
+def metrics_table_ddl() -> str:
+    return f"""
+    CREATE TABLE IF NOT EXISTS {METRICS_TABLE.qualified_name}
+    (
+        timestamp DateTime64(6) CODEC(DoubleDelta, ZSTD(1)),
+        sensor LowCardinality(String),
+        iface LowCardinality(String),
+        metric LowCardinality(String),
+        value Int64 CODEC(DoubleDelta, ZSTD(1)),
+        delta Int64 CODEC(T64, ZSTD(1)),
+        date Date DEFAULT toDate(timestamp)
+    )
+    ENGINE = MergeTree()
+    PARTITION BY toYYYYMM(date)
+    ORDER BY (sensor, metric, iface, timestamp)
+    TTL date + INTERVAL {settings.CLICKHOUSE_METRICS_TTL_DAYS} DAY
+    SETTINGS index_granularity = 8192, ttl_only_drop_parts = 1
+    """
+
+
+def flatten_counters(stats: Dict[str, Any], prefix: str, out: Dict[str, int]):
+    """중첩 객체의 숫자 값을 점 경로로 펼쳐 out 에 더한다 (목록은 무시)"""
+    for key, value in stats.items():
+        if isinstance(value, dict):
+            flatten_counters(value, f"{prefix}{key}.", out)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            name = prefix + key
+            out[name] = out.get(name, 0) + int(value)
+
+
+def thread_iface(thread: str) -> Optional[str]:
+    """스레드 이름의 캡처 인터페이스 (W#01-eth0 -> eth0, FM#01 처럼 없으면 None)"""
+    if "#" not in thread or "-" not in thread:
+        return None
+    return thread.split("-", 1)[1] or None
+
+
+def split_stats(stats: Dict[str, Any]) -> Dict[str, Dict[str, int]]:
+    """stats 객체 -> {iface: {metric: 값}} (TOTAL_IFACE 는 전체 합계)"""
+    counters: Dict[str, Dict[str, int]] = {TOTAL_IFACE: {}}
+    for key, value in stats.items():
+        if key == "threads" and isinstance(value, dict):
+            for thread, thread_stats in value.items():
+                iface = thread_iface(thread)
+                if iface is not None and isinstance(thread_stats, dict):
+                    flatten_counters(thread_stats, "", counters.setdefault(iface, {}))
+        elif isinstance(value, dict):
+            flatten_counters(value, f"{key}.", counters[TOTAL_IFACE])
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            counters[TOTAL_IFACE][key] = int(value)
+    return counters
+
+
+class StatsSample(NamedTuple):
+    micros: int
+    days: int
+    sensor: str
+    counters: Dict[str, Dict[str, int]]
+
+
+class StatsDeltaTracker:
+    """(sensor, iface, metric) 별 직전 값과 센서별 uptime 으로 delta 계산"""
+
+    def __init__(self):
+        self.values: Dict[Tuple[str, str, str], int] = {}
+        self.uptimes: Dict[str, int] = {}
+
+    def restore(self, rows: Sequence[Tuple[str, str, str, int]]):
+        """metrics 테이블의 마지막 값으로 초기화 (재시작 후 이어서 delta 계산)
+
+        이미 샘플을 처리한 카운터는 그 값이 더 최신이므로 덮어쓰지 않는다.
+        """
+        for sensor, iface, metric, value in rows:
+            self.values.setdefault((sensor, iface, metric), value)
+            if iface == TOTAL_IFACE and metric == "uptime":
+                self.uptimes.setdefault(sensor, value)
+
+    def rows(self, sample: StatsSample) -> List[Tuple[str, str, int, int]]:
+        """샘플 -> (iface, metric, value, delta) 목록"""
+        uptime = sample.counters.get(TOTAL_IFACE, {}).get("uptime")
+        last_uptime = self.uptimes.get(sample.sensor)
+        restarted = uptime is not None and last_uptime is not None and uptime < last_uptime
+        if uptime is not None:
+            self.uptimes[sample.sensor] = uptime
+
+        rows = []
+        values = self.values
+        for iface, counters in sample.counters.items():
+            for metric, value in counters.items():
+                key = (sample.sensor, iface, metric)
+                previous = values.get(key)
+                values[key] = value
+                if not value and not previous:
+                    # 0 인 카운터는 값이 생길 때까지 행을 만들지 않는다 (기준값 0 은 기억해 첫 증가분을 delta 로)
+                    continue
+                if previous is None:
+                    # 처음 보는 카운터: 기준값으로 (변화량은 모름)
+                    delta = value if restarted else 0
+                else:
+                    delta = value if restarted else value - previous
+                rows.append((iface, metric, value, delta))
+        return rows
+
+
+class MetricsBatch:
+    """stats 이벤트 배치 (RoutedBatch 의 stats 테이블 자리)
+
+    ColumnarBatch 와 같이 table / column_names / column_data 로 삽입/스필되며,
+    len() 은 stats 이벤트 수. 컬럼은 compute() 후에 채워진다.
+    """
+
+    def __init__(self):
+        self.table = METRICS_TABLE
+        self.size = 0
+        self.samples: List[StatsSample] = []
+        self.columns: Dict[str, list] = {name: [] for name in METRICS_COLUMNS}
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, event: Dict[str, Any], sensor: str = ""):
+        micros, days = event_ticks(event.get("timestamp"))
+        stats = event.get(STATS_TYPE)
+        counters = split_stats(stats) if isinstance(stats, dict) else {}
+        self.samples.append(StatsSample(micros, days, sensor, counters))
+        self.size += 1
+
+    def compute(self, tracker: StatsDeltaTracker):
+        """쌓인 샘플을 로그 순서대로 delta 를 계산해 컬럼으로 옮김"""
+        timestamps, dates, sensors, ifaces, metrics, values, deltas = (
+            self.columns[name].append for name in METRICS_COLUMNS
+        )
+        for sample in self.samples:
+            for iface, metric, value, delta in tracker.rows(sample):
+                timestamps(sample.micros)
+                dates(sample.days)
+                sensors(sample.sensor)
+                ifaces(iface)
+                metrics(metric)
+                values(value)
+                deltas(delta)
+        self.samples = []
+
+    @property
+    def column_names(self) -> List[str]:
+        return list(METRICS_COLUMNS)
+
+    @property
+    def column_data(self) -> List[Sequence]:
+        return [self.columns[name] for name in METRICS_COLUMNS]
+
+
+def last_values_query() -> str:
+    """센서/인터페이스/카운터별 마지막 값 (StatsDeltaTracker.restore 용)"""
+    return f"""
+    SELECT sensor, iface, metric, argMax(value, timestamp)
+    FROM {METRICS_TABLE.qualified_name}
+    WHERE date >= today() - {settings.STATS_RESTORE_DAYS}
+    GROUP BY sensor, iface, metric
+    """
+
+
+stats_tracker = StatsDeltaTracker()
@@ -0,0 +1,217 @@
+"""Suricata 규칙 파싱 / 규칙 파일 읽기 쓰기
+
+규칙 형식: action proto src sport direction dst dport (key:value; key; ...)
+여기서는 저장 전에 걸러낼 수 있는 구조 오류(헤더, 따옴표, ; 누락, sid)만 확인한다.
+키워드 자체의 유효성은 Suricata 가 리로드할 때 판단한다 (ruleset-stats 의 rules_failed).
+"""
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+ACTIONS = {"alert", "pass", "drop", "reject", "rejectsrc", "rejectdst", "rejectboth"}
+DIRECTIONS = {"->", "<>", "=>"}
+
+_OPTION_NAME = re.compile(r"^[A-Za-z0-9_.\-]+$")
+# 주석 처리된(비활성) 규칙: "# alert ..." / "#alert ..."
+_DISABLED = re.compile(r"^#+\s*(?=(?:%s)\s)" % "|".join(sorted(ACTIONS)))
+
+
+class RuleSyntaxError(ValueError):
+    """저장하면 Suricata 가 읽을 수 없는 규칙"""
+
+
+class Rule(NamedTuple):
+    sid: int
+    gid: int
+    rev: int
+    msg: str
+    action: str
+    enabled: bool
+    text: str  # 규칙 한 줄 (비활성이면 앞의 # 제외)
+
+
+def _split_header(header: str) -> List[str]:
+    """공백으로 나누되 [ ] 주소/포트 그룹 안의 공백은 유지"""
+    tokens, current, depth = [], "", 0
+    for ch in header:
+        if ch == "[":
+            depth += 1
+        elif ch == "]":
+            depth -= 1
+            if depth < 0:
+                raise RuleSyntaxError("헤더의 ] 가 짝이 맞지 않음")
+        if ch.isspace() and depth == 0:
+            if current:
+                tokens.append(current)
+            current = ""
+        else:
+            current += ch
+    if depth:
+        raise RuleSyntaxError("헤더의 [ 가 닫히지 않음")
+    if current:
+        tokens.append(current)
+    return tokens
+
+
+def _split_options(body: str) -> List[Tuple[str, Optional[str]]]:
+    """옵션을 ; 로 나누기 (따옴표 안과 \\; 는 제외) -> [(이름, 값)]"""
+    options = []
+    start, quoted, escaped = 0, False, False
+    for index, ch in enumerate(body):
+        if escaped:
+            escaped = False
+        elif ch == "\\":
+            escaped = True
+        elif ch == '"':
+            quoted = not quoted
+        elif ch == ";" and not quoted:
+            options.append(body[start:index])
+            start = index + 1
+    if quoted:
+        raise RuleSyntaxError("따옴표가 닫히지 않음")
+    if body[start:].strip():
+        raise RuleSyntaxError(f"마지막 옵션 뒤에 ; 가 없음: {body[start:].strip()[:40]}")
+
+    parsed = []
+    for option in options:
+        name, sep, value = option.partition(":")
+        name = name.strip()
+        if not name:
+            if option.strip():
+                raise RuleSyntaxError(f"옵션 이름이 없음: {option.strip()[:40]}")
+            continue
+        if not _OPTION_NAME.match(name):
+            raise RuleSyntaxError(f"잘못된 옵션 이름: {name[:40]}")
+        parsed.append((name, value.strip() if sep else None))
+    return parsed
+
+
+def _int_option(options: Dict[str, str], name: str, default: Optional[int]) -> int:
+    value = options.get(name)
+    if value is None:
+        if default is None:
+            raise RuleSyntaxError(f"{name} 가 없음")
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise RuleSyntaxError(f"{name} 는 정수여야 함: {value}")
+    if number <= 0:
+        raise RuleSyntaxError(f"{name} 는 1 이상이어야 함: {value}")
+    return number
+
+
+def parse_rule(text: str, enabled: bool = True) -> Rule:
+    """규칙 1개 파싱 (오류면 RuleSyntaxError)"""
+    # content 의 공백도 의미가 있으므로 앞뒤만 정리
+    text = text.strip()
+    if not text:
+        raise RuleSyntaxError("빈 규칙")
+    if "\n" in text or "\r" in text:
+        raise RuleSyntaxError("규칙은 한 줄이어야 함")
+    open_index = text.find("(")
+    if open_index < 0 or not text.endswith(")"):
+        raise RuleSyntaxError("옵션은 ( ... ) 로 감싸야 함")
+
+    header = _split_header(text[:open_index])
+    if len(header) != 7:
+        raise RuleSyntaxError("헤더는 action proto src sport direction dst dport 형식이어야 함")
+    action, direction = header[0], header[4]
+    if action not in ACTIONS:
+        raise RuleSyntaxError(f"알 수 없는 action: {action}")
+    if direction not in DIRECTIONS:
+        raise RuleSyntaxError(f"알 수 없는 방향: {direction}")
+
+    options: Dict[str, str] = {}
+    for name, value in _split_options(text[open_index + 1:-1]):
+        if name in ("sid", "gid", "rev", "msg"):
+            if name in options:
+                raise RuleSyntaxError(f"{name} 가 두 번 있음")
+            if value is None:
+                raise RuleSyntaxError(f"{name} 에 값이 없음")
+            options[name] = value
+
+    msg = options.get("msg", "")
+    if len(msg) >= 2 and msg[0] == msg[-1] == '"':
+        msg = msg[1:-1]
+    return Rule(
+        sid=_int_option(options, "sid", None),
+        gid=_int_option(options, "gid", 1),
+        rev=_int_option(options, "rev", 1),
+        msg=msg,
+        action=action,
+        enabled=enabled,
+        text=text,
+    )
+
+
+def parse_line(line: str) -> Optional[Rule]:
+    """규칙 파일의 한 줄 -> Rule (빈 줄, 주석, 읽을 수 없는 줄은 None)"""
+    stripped = line.strip()
+    if not stripped:
+        return None
+    enabled = True
+    if stripped.startswith("#"):
+        match = _DISABLED.match(stripped)
+        if match is None:
+            return None
+        stripped, enabled = stripped[match.end():], False
+    try:
+        return parse_rule(stripped, enabled)
+    except RuleSyntaxError:
+        return None
+
+
+# 규칙 파일의 항목: 규칙 또는 그대로 보존할 줄 (주석, 빈 줄, 읽을 수 없는 줄)
+Entry = Union[Rule, str]
+
+
+def read_rule_file(path: Path) -> List[Entry]:
+    """규칙 파일 읽기 (\\ 로 이어지는 여러 줄 규칙은 한 항목으로)"""
+    entries: List[Entry] = []
+    pending = ""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line.endswith("\\"):
+                pending += line[:-1]
+                continue
+            line, pending = pending + line, ""
+            rule = parse_line(line)
+            entries.append(rule if rule is not None else line)
+    if pending:
+        entries.append(pending)
+    return entries
+
+
+def format_entry(entry: Entry) -> str:
+    if isinstance(entry, str):
+        return entry
+    return entry.text if entry.enabled else f"# {entry.text}"
+
+
+def stage_rule_file(path: Path, entries: List[Entry]) -> Path:
+    """같은 디렉터리의 임시 파일에 쓰고 fsync (os.replace 로 교체하면 반영) -> 임시 파일 경로"""
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    try:
+        mode = os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o644
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(format_entry(entry))
+                f.write("\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, mode)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return tmp_path
+
+
+def write_rule_file(path: Path, entries: List[Entry]):
+    """임시 파일에 쓴 뒤 os.replace 로 교체 (Suricata 가 반쯤 쓴 파일을 읽지 않도록)"""
+    os.replace(stage_rule_file(path, entries), path)
@@ -0,0 +1,137 @@
+"""Suricata unix command socket 클라이언트
+
+프로토콜 (suricatasc 와 같음):
+- 연결 후 {"version": "0.2"} 를 보내 handshake
+- {"command": 이름, "arguments": {...}} 를 보내면 {"return": "OK"|"NOK", "message": ...}
+  JSON 한 줄(개행으로 끝남)로 응답
+요청과 응답이 1:1 이므로 연결 1개를 lock 으로 직렬화하여 계속 사용한다.
+"""
+import json
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+
+PROTOCOL_VERSION = "0.2"
+
+# dump-counters 응답은 스레드 수에 따라 수백 KB 가 될 수 있음
+READ_LIMIT = 16 * 1024 * 1024
+
+
+class SuricataSocketError(Exception):
+    """소켓 연결/통신 실패 (소켓 없음, 권한, 끊김, 시간 초과)"""
+
+
+class SuricataSocketTimeout(SuricataSocketError):
+    """명령을 보냈지만 응답이 없음 (명령은 실행되었을 수 있음)"""
+
+
+class SuricataCommandError(Exception):
+    """Suricata 가 명령을 거부함 (return: NOK)"""
+
+
+class SuricataSocket:
+    """Suricata unix command socket 연결 (끊기면 다음 명령에서 재연결)"""
+
+    def __init__(self, path: str, timeout: float):
+        self.path = path
+        self.timeout = timeout
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def _exchange(self, request: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        self._writer.write(json.dumps(request).encode() + b"\n")
+        await self._writer.drain()
+        line = await asyncio.wait_for(self._reader.readline(), timeout)
+        if not line.endswith(b"\n"):
+            raise ConnectionResetError("Suricata 가 연결을 닫음")
+        return json.loads(line)
+
+    async def _connect(self):
+        try:
+            self._reader, self._writer = await asyncio.wait_for(
+                asyncio.open_unix_connection(self.path, limit=READ_LIMIT), self.timeout
+            )
+            reply = await self._exchange({"version": PROTOCOL_VERSION}, self.timeout)
+        except asyncio.TimeoutError as e:
+            raise SuricataSocketError("연결 시간 초과") from e
+        if reply.get("return") != "OK":
+            raise SuricataSocketError(f"handshake 거부: {reply.get('message')}")
+
+    def _close(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def command(self, name: str, arguments: Optional[Dict[str, Any]] = None,
+                      timeout: Optional[float] = None) -> Any:
+        """명령 실행 -> message (NOK 면 SuricataCommandError)"""
+        request: Dict[str, Any] = {"command": name}
+        if arguments:
+            request["arguments"] = arguments
+        timeout = timeout or self.timeout
+
+        async with self._lock:
+            # 재사용한 연결이 이미 끊겨 있으면 (Suricata 재시작 등) 한 번만 다시 연결
+            for attempt in range(2):
+                reused = self.connected
+                try:
+                    if not reused:
+                        await self._connect()
+                    reply = await self._exchange(request, timeout)
+                    break
+                except (ConnectionError, asyncio.IncompleteReadError) as e:
+                    self._close()
+                    if not reused or attempt:
+                        raise SuricataSocketError(f"{self.path}: {e}") from e
+                except asyncio.TimeoutError as e:
+                    # 늦게 온 응답이 다음 명령의 응답으로 읽히지 않도록 연결을 버림
+                    self._close()
+                    raise SuricataSocketTimeout(f"{name} 응답 시간 초과 ({timeout}초)") from e
+                except (OSError, ValueError, SuricataSocketError) as e:
+                    self._close()
+                    raise SuricataSocketError(f"{self.path}: {e}") from e
+
+        if reply.get("return") != "OK":
+            raise SuricataCommandError(str(reply.get("message")))
+        return reply.get("message")
+
+    async def close(self):
+        async with self._lock:
+            self._close()
+
+    # 명령 ------------------------------------------------------------------
+
+    async def reload_rules(self) -> Any:
+        """규칙 리로드 (완료될 때까지 응답하지 않음)"""
+        return await self.command("reload-rules", timeout=settings.SURICATA_RELOAD_TIMEOUT)
+
+    async def ruleset_stats(self) -> List[Dict[str, Any]]:
+        """detect 엔진별 로드/실패 규칙 수"""
+        return await self.command("ruleset-stats")
+
+    async def iface_list(self) -> Dict[str, Any]:
+        return await self.command("iface-list")
+
+    async def iface_stat(self, iface: str) -> Dict[str, Any]:
+        """인터페이스 패킷/드롭 수"""
+        return await self.command("iface-stat", {"iface": iface})
+
+    async def dump_counters(self) -> Dict[str, Any]:
+        """전체 성능 카운터 (stats 로그와 같은 구조)"""
+        return await self.command("dump-counters")
+
+    async def shutdown(self) -> Any:
+        """Suricata 정상 종료 요청"""
+        try:
+            return await self.command("shutdown")
+        finally:
+            await self.close()
+
+
+suricata_socket = SuricataSocket(settings.SURICATA_COMMAND_SOCKET, settings.SURICATA_SOCKET_TIMEOUT)
@@ -0,0 +1,63 @@
+"""
+EVE 타임스탬프 파서 마이크로벤치마크
+
+app.util.eve_time 의 캐시 기반 파서를 기존 dateutil.isoparse 와 비교합니다.
+실제 eve.json 처럼 같은 초에 여러 이벤트가 몰리는 입력을 사용합니다.
+
+사용법: python bench_eve_time.py [반복 횟수]
+"""
+
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+
+from app.util.eve_time import parse_eve_ticks, parse_eve_timestamp
+
+
+def make_samples(count: int, events_per_second: int = 200):
+    """초당 events_per_second 개씩 증가하는 EVE 타임스탬프 생성"""
+    base = datetime(2025, 9, 18, 11, 35, 0, tzinfo=timezone.utc)
+    samples = []
+    for i in range(count):
+        ts = base + timedelta(microseconds=i * (1_000_000 // events_per_second) + i % 997)
+        samples.append(ts.strftime("%Y-%m-%dT%H:%M:%S.%f+0000"))
+    return samples
+
+
+def bench(name, func, samples, repeat):
+    def run():
+        for value in samples:
+            func(value)
+
+    elapsed = min(timeit.repeat(run, number=1, repeat=repeat))
+    per_call = elapsed / len(samples) * 1e9
+    print(f"{name:<32} {per_call:>10.0f} ns/call")
+    return per_call
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    samples = make_samples(100_000)
+
+    print("=" * 60)
+    print(f"EVE 타임스탬프 파서 벤치마크 ({len(samples):,}개, {repeat}회 중 최소)")
+    print("=" * 60)
+
+    results = {}
+    try:
+        from dateutil import parser
+        results["dateutil"] = bench("dateutil.isoparse", parser.isoparse, samples, repeat)
+    except ImportError:
+        print("dateutil 미설치 - 비교 생략")
+
+    bench("datetime.fromisoformat", datetime.fromisoformat, samples, repeat)
+    bench("eve_time.parse_eve_timestamp", parse_eve_timestamp, samples, repeat)
+    results["ticks"] = bench("eve_time.parse_eve_ticks", parse_eve_ticks, samples, repeat)
+
+    if "dateutil" in results:
+        print("-" * 60)
+        print(f"parse_eve_ticks 는 dateutil 대비 {results['dateutil'] / results['ticks']:.1f}배 빠름")
+
+
+if __name__ == "__main__":
+    main()
@@ -34,6 +34,19 @@ class SuricataClient:
             json={"rule_content": rule_content}
         )
         return response.json()
+    
+    def apply_rules(self, add: list = (), update: list = (), delete: list = ()) -> Dict[str, Any]:
+        """규칙 일괄 추가/교체/삭제 (add 는 {"rule_content", "rule_file"} 목록, delete 는 sid 목록)"""
+        response = requests.post(
+            f"{self.base_url}/rules/batch",
+            json={"add": list(add), "update": list(update), "delete": list(delete)}
+        )
+        return response.json()
+    
+    def reload_rules(self) -> Dict[str, Any]:
+        """규칙 리로드 (적용될 때까지 대기, 걸린 시간 포함)"""
+        response = requests.post(f"{self.base_url}/control/reload")
+        return response.json()
 
 # 사용 예제
 if __name__ == "__main__":
@@ -0,0 +1,164 @@
+"""
+Suricata unix command socket 가짜 서버 (개발/테스트용)
+
+Suricata 없이 app.util.suricata_socket 과 /control/reload, /suricata/* API 를
+확인할 수 있도록 같은 프로토콜로 응답합니다.
+- reload-rules 는 지정한 시간만큼 기다린 뒤 응답하고, 규칙 디렉터리의 *.rules 를
+  다시 세어 ruleset-stats 에 반영합니다 (sid 가 없는 규칙은 실패로 셈).
+- shutdown 을 받으면 응답 후 종료합니다.
+
+사용법: python fake_suricata_socket.py [소켓 경로] [리로드 시간(초)] [규칙 디렉터리]
+  기본값: SURICATA_COMMAND_SOCKET, 0.5, SURICATA_RULES_PATH
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import asyncio
+from datetime import datetime, timezone
+from pathlib import Path
+
+from app.core.config import settings
+
+
+class FakeSuricata:
+    def __init__(self, rules_path: Path, reload_delay: float):
+        self.rules_path = rules_path
+        self.reload_delay = reload_delay
+        self.started = time.time()
+        self.last_reload = datetime.now(timezone.utc)
+        self.reloads = 0
+        self.packets = 0
+        self.reloading = asyncio.Lock()
+        self.stopping = asyncio.Event()
+        self.clients = {}  # 핸들러 task -> writer
+        self.rules_loaded, self.rules_failed = self.count_rules()
+
+    def count_rules(self):
+        loaded = failed = 0
+        for path in sorted(self.rules_path.glob("*.rules")):
+            for line in path.read_text(errors="replace").splitlines():
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                if "sid:" in line and line.endswith(")"):
+                    loaded += 1
+                else:
+                    failed += 1
+        return loaded, failed
+
+    async def reload(self):
+        # 실제 Suricata 처럼 리로드는 한 번에 하나씩
+        async with self.reloading:
+            await asyncio.sleep(self.reload_delay)
+            self.rules_loaded, self.rules_failed = self.count_rules()
+            self.last_reload = datetime.now(timezone.utc)
+            self.reloads += 1
+
+    def counters(self):
+        self.packets += 1000
+        return {
+            "uptime": int(time.time() - self.started),
+            "capture": {"kernel_packets": self.packets, "kernel_drops": self.packets // 100},
+            "decoder": {"pkts": self.packets, "bytes": self.packets * 800},
+            "detect": {"alert": self.packets // 500, "engines": [
+                {"id": 0, "last_reload": self.last_reload.isoformat(),
+                 "rules_loaded": self.rules_loaded, "rules_failed": self.rules_failed}
+            ]},
+        }
+
+    async def execute(self, name: str, arguments: dict):
+        """-> (OK 여부, message)"""
+        if name == "reload-rules":
+            await self.reload()
+            return True, "done"
+        if name == "ruleset-reload-nonblocking":
+            asyncio.create_task(self.reload())
+            return True, "done"
+        if name == "ruleset-reload-time":
+            return True, [{"id": 0, "last_reload": self.last_reload.isoformat()}]
+        if name == "ruleset-stats":
+            return True, [{"id": 0, "rules_loaded": self.rules_loaded, "rules_failed": self.rules_failed}]
+        if name == "iface-list":
+            return True, {"count": 1, "ifaces": [settings.SURICATA_INTERFACE]}
+        if name == "iface-stat":
+            if arguments.get("iface") != settings.SURICATA_INTERFACE:
+                return False, "Interface not found"
+            self.packets += 100
+            return True, {"pkts": self.packets, "drop": self.packets // 100, "invalid-checksums": 0}
+        if name == "dump-counters":
+            return True, self.counters()
+        if name == "uptime":
+            return True, int(time.time() - self.started)
+        if name == "version":
+            return True, "fake-suricata"
+        if name == "shutdown":
+            self.stopping.set()
+            return True, "Closing Suricata"
+        return False, "Unknown command"
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        async def reply(ok: bool, message):
+            writer.write(json.dumps({"return": "OK" if ok else "NOK", "message": message}).encode() + b"\n")
+            await writer.drain()
+
+        self.clients[asyncio.current_task()] = writer
+        try:
+            hello = json.loads(await reader.readline() or b"{}")
+            if hello.get("version") not in ("0.1", "0.2"):
+                await reply(False, "Unsupported protocol version")
+                return
+            await reply(True, None)
+
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request = json.loads(line)
+                name = request.get("command", "")
+                started = time.perf_counter()
+                ok, message = await self.execute(name, request.get("arguments") or {})
+                print(f"{name}: {'OK' if ok else 'NOK'} ({(time.perf_counter() - started) * 1000:.1f}ms)")
+                await reply(ok, message)
+        except (ConnectionError, ValueError) as e:
+            print(f"클라이언트 오류: {e}")
+        finally:
+            del self.clients[asyncio.current_task()]
+            writer.close()
+
+    async def close_clients(self):
+        """남은 연결을 닫고 핸들러가 끝날 때까지 대기 (취소하지 않음)"""
+        tasks = list(self.clients)
+        for writer in self.clients.values():
+            writer.close()
+        if tasks:
+            await asyncio.wait(tasks, timeout=1.0)
+
+
+async def main():
+    socket_path = sys.argv[1] if len(sys.argv) > 1 else settings.SURICATA_COMMAND_SOCKET
+    reload_delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+    rules_path = Path(sys.argv[3]) if len(sys.argv) > 3 else settings.SURICATA_RULES_PATH
+
+    fake = FakeSuricata(rules_path, reload_delay)
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = await asyncio.start_unix_server(fake.handle, socket_path)
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, fake.stopping.set)
+    print(f"가짜 Suricata command socket: {socket_path} (규칙 {fake.rules_loaded}개, 리로드 {reload_delay}초)")
+    try:
+        async with server:
+            await fake.stopping.wait()
+            await fake.close_clients()
+    finally:
+        os.unlink(socket_path)
+    print("종료")
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
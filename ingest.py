@@ -0,0 +1,18 @@
+"""
+수집 전용 프로세스 (INGEST_MODE=process)
+
+eve 파일 tail, JSON 디코딩, 컬럼 배치 생성을 reader/워커 프로세스로 나누고
+ClickHouse 삽입과 체크포인트는 이 프로세스가 처리합니다.
+API 서버(app.main)는 INGEST_MODE=process 로 실행해야 같은 로그를 중복 저장하지 않고
+조회와 실시간 alert 만 담당합니다.
+
+    INGEST_WORKERS=6 python ingest.py
+    INGEST_MODE=process python -m app.main
+"""
+import sys
+import asyncio
+
+from app.service.ingest_pipeline import run_ingest
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(run_ingest()))
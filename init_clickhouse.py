@@ -7,8 +7,11 @@ ClickHouse 데이터베이스 초기화 스크립트
 """
 
 from app.util.clickhouse_client import clickhouse_client
+from app.util.clickhouse_schema import copy_legacy_partitions
+from app.util.log_config import configure_logging
 
 def main():
+    configure_logging()
     print("=" * 60)
     print("ClickHouse 데이터베이스 초기화 스크립트")
     print("=" * 60)
@@ -21,8 +24,15 @@ def main():
         print("초기화 완료")
     else:
         print("초기화 실패")
+        if clickhouse_client.schema_drift["missing"]:
+            print(f"테이블에 없는 컬럼: {', '.join(clickhouse_client.schema_drift['missing'])}")
         return
     
+    # 이전 스키마 테이블이 남아 있으면 파티션 단위로 새 스키마 테이블에 복사
+    copied = copy_legacy_partitions(clickhouse_client.client)
+    if copied:
+        print(f"이전 스키마 데이터 이전 완료: 파티션 {copied}개")
+    
     print("\n3. ClickHouse Disconnected")
     clickhouse_client.disconnect()
     
@@ -1,4 +1,6 @@
 from app.util.clickhouse_client import clickhouse_client
+from app.util.clickhouse_schema import display_ip
+from app.util.log_config import configure_logging
 from datetime import datetime, timedelta
 
 def print_section(title):
@@ -8,6 +10,7 @@ def print_section(title):
     print("=" * 70)
 
 def main():
+    configure_logging()
     print_section("ClickHouse 데이터 조회 스크립트")
     
     if not clickhouse_client.connect():
@@ -60,7 +63,7 @@ def main():
                 print(f"\n[{i}] {row[0]}")
                 print(f"    시그니처: {row[1]}")
                 print(f"    심각도: {row[2]}")
-                print(f"    {row[3]}:{row[4]} → {row[5]}:{row[6]}")
+                print(f"    {display_ip(row[3])}:{row[4]} → {display_ip(row[5])}:{row[6]}")
         else:
             print("Alert 없음")
         
@@ -114,7 +117,7 @@ def main():
             count() as cnt,
             countIf(event_type = 'alert') as alert_cnt
         FROM suricata.events
-        WHERE src_ip != '0.0.0.0'
+        WHERE src_ip != toIPv6('::ffff:0.0.0.0')
         GROUP BY src_ip
         ORDER BY cnt DESC
         LIMIT 10
@@ -124,7 +127,7 @@ def main():
             print(f"{'순위':<6} {'IP 주소':<20} {'전체 이벤트':>15} {'Alert 수':>15}")
             print("-" * 70)
             for i, row in enumerate(result.result_rows, 1):
-                print(f"{i:<6} {row[0]:<20} {row[1]:>15,} {row[2]:>15,}")
+                print(f"{i:<6} {display_ip(row[0]):<20} {row[1]:>15,} {row[2]:>15,}")
         else:
             print("데이터 없음")
         
@@ -148,23 +151,22 @@ def main():
         else:
             print("HTTP 데이터 없음")
         
-        print_section("8. 데이터 저장 통계")
+        print_section("8. 데이터 저장 통계 (테이블별)")
         query = """
         SELECT 
+            table,
             formatReadableSize(sum(bytes_on_disk)) as disk_size,
             formatReadableSize(sum(data_compressed_bytes)) as compressed,
             formatReadableSize(sum(data_uncompressed_bytes)) as uncompressed,
             count() as parts
         FROM system.parts
-        WHERE database = 'suricata' AND table = 'events' AND active
+        WHERE database = 'suricata' AND startsWith(table, 'events_') AND active
+        GROUP BY table
+        ORDER BY sum(bytes_on_disk) DESC
         """
         result = clickhouse_client.client.query(query)
-        if result.result_rows:
-            row = result.result_rows[0]
-            print(f"디스크 사용량: {row[0]}")
-            print(f"압축된 크기: {row[1]}")
-            print(f"압축 전 크기: {row[2]}")
-            print(f"파티션 수: {row[3]}")
+        for row in result.result_rows:
+            print(f"{row[0]:20} 디스크 {row[1]:>10} | 압축 {row[2]:>10} | 압축 전 {row[3]:>10} | 파트 {row[4]}")
         
     except Exception as e:
         print(f"\n 오류 발생: {e}")
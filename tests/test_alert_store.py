@@ -0,0 +1,50 @@
+import pytest
+
+from app.model.alert import Alert
+from app.util.alert_store import AlertStore
+
+
+def _alert(n: int, **overrides):
+    event = {
+        "timestamp": f"2024-01-01T00:00:{n:02d}.000000+0900",
+        "event_type": "alert",
+        "src_ip": f"10.0.0.{n}",
+        "src_port": 1000 + n,
+        "dest_ip": "192.168.0.1",
+        "dest_port": 80,
+        "proto": "TCP",
+        "alert": {"signature": f"sig-{n % 2}", "severity": 1 + n % 2},
+    }
+    event.update(overrides)
+    return event
+
+
+def test_invalid_event_on_full_ring_keeps_store_consistent():
+    store = AlertStore(capacity=3)
+    for n in range(3):
+        store.add_event(_alert(n))
+
+    with pytest.raises(ValueError):
+        store.add_event(_alert(3, timestamp="garbage"))
+    assert len(store) == 3
+    assert [a.src_ip for a in store.query()] == ["10.0.0.0", "10.0.0.1", "10.0.0.2"]
+
+    for n in range(4, 8):
+        store.add_event(_alert(n))
+
+    assert [a.src_ip for a in store.query()] == ["10.0.0.5", "10.0.0.6", "10.0.0.7"]
+    matched = store.query(alert_signature="sig-1", alert_severity=2)
+    assert [a.src_ip for a in matched] == ["10.0.0.5", "10.0.0.7"]
+    assert store.query(src_ip="10.0.0.4") == []
+
+
+def test_null_and_non_string_fields_are_normalized():
+    store = AlertStore(capacity=3, payload_capacity=3)
+    store.add_event(_alert(0, proto=None, event_type=None, src_ip=None, payload={"x": 1},
+                           alert={"signature": 1234, "severity": 1}))
+
+    (alert,) = store.query()
+    Alert.model_validate(alert.model_dump())
+    assert (alert.proto, alert.event_type, alert.src_ip) == ("unknown", "alert", "unknown")
+    assert alert.alert_signature is None
+    assert alert.payload is None
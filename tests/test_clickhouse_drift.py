@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+
+from app.util.clickhouse_client import ClickHouseClient
+from app.util.clickhouse_migrations import EVENT_TABLES_VERSION
+from app.util.event_tables import EVENT_TABLES, table_columns
+from app.util.stats_metrics import METRICS_COLUMNS, METRICS_TABLE
+
+
+class FakeClient:
+    """system.columns 와 schema_migrations 조회만 흉내내는 클라이언트"""
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    def query(self, query, parameters=None, **kwargs):
+        if "system.columns" in query:
+            return SimpleNamespace(result_rows=[(name, "") for name in self.columns[parameters["table"]]])
+        if "max(version)" in query:
+            return SimpleNamespace(result_rows=[(EVENT_TABLES_VERSION,)])
+        return SimpleNamespace(result_rows=[])
+
+
+def _client(columns):
+    client = ClickHouseClient()
+    client.manage_schema = False
+    client.client = FakeClient(columns)
+    return client
+
+
+def _columns():
+    columns = {t.name: list(table_columns(t)) for t in EVENT_TABLES.values()}
+    columns[METRICS_TABLE.name] = list(METRICS_COLUMNS)
+    return columns
+
+
+def test_missing_columns_hold_inserts_until_resolved():
+    columns = _columns()
+    table = next(iter(EVENT_TABLES.values())).name
+    dropped = columns[table].pop()
+    client = _client(columns)
+
+    assert client.ensure_database() is False
+    assert not client.schema_ready
+    assert client.status()["schema_drift"]["missing"] == [f"{table}.{dropped}"]
+
+    # 컬럼이 추가되면 다음 확인에서 삽입 재개
+    columns[table].append(dropped)
+    assert client.ensure_database() is True
+    assert client.schema_ready
+    assert client.status()["schema_drift"]["missing"] == []
@@ -0,0 +1,87 @@
+import logging
+
+import pytest
+from clickhouse_connect.datatypes.registry import get_from_name
+from clickhouse_connect.driver.insert import InsertContext
+from clickhouse_connect.driver.transform import NativeTransform
+
+from app.util.column_batch import ColumnarBatch
+from app.util.event_tables import ORIGIN_COLUMNS, ORIGIN_TYPE, PORT_COLUMNS, table_fields, table_for
+
+TIMESTAMP = "2024-01-01T00:00:00.000000+0900"
+
+
+def _column_types(batch: ColumnarBatch) -> dict:
+    types = {"timestamp": "DateTime64(6)", "date": "Date", "raw_json": "String"}
+    types.update((name, "UInt16") for name in PORT_COLUMNS)
+    types.update((name, ORIGIN_TYPE) for name in ORIGIN_COLUMNS)
+    for field in table_fields(batch.table):
+        if field.subfields:
+            types.update((f"{field.column}.{name}", f"Array({t})") for name, _, t in field.subfields)
+        else:
+            types[field.column] = field.type
+    return types
+
+
+def _serialize(batch: ColumnarBatch):
+    """드라이버가 삽입할 때처럼 Native 형식으로 직렬화 (타입이 맞지 않으면 예외)"""
+    types = _column_types(batch)
+    context = InsertContext(
+        batch.table.qualified_name, batch.column_names, [get_from_name(types[name]) for name in batch.column_names],
+        data=batch.column_data, column_oriented=True
+    )
+    for _ in NativeTransform().build_insert(context):
+        pass
+    # 직렬화 오류는 로그를 남기고 context 에 담겨 insert 에서 다시 발생한다
+    if context.insert_exception is not None:
+        raise context.insert_exception
+
+
+def test_malformed_alert_does_not_poison_batch():
+    batch = ColumnarBatch(table_for("alert"))
+    batch.append({
+        "timestamp": TIMESTAMP, "event_type": "alert", "src_ip": "10.0.0.1", "dest_ip": "2001:db8::1",
+        "proto": "TCP", "flow_id": 123, "alert": {"signature": "ok", "severity": 2, "metadata": {"k": ["v"]}},
+    })
+    batch.append({
+        "timestamp": TIMESTAMP, "event_type": "alert", "src_ip": "not-an-ip", "dest_ip": 42,
+        "proto": ["TCP"], "flow_id": -1,
+        "alert": {"signature": 7, "severity": "high", "signature_id": 2 ** 40, "metadata": {"k": [{"x": 1}]}},
+        "metadata": {"flowbits": "single"},
+    })
+    _serialize(batch)
+
+    columns = batch.columns
+    assert list(columns["alert_severity"]) == [2, 0]
+    assert columns["src_ip"] == ["10.0.0.1", "0.0.0.0"]
+    assert columns["dest_ip"] == ["2001:db8::1", "0.0.0.0"]
+    assert columns["alert_signature"] == ["ok", "7"]
+    assert columns["alert_signature_id"] == [0, 0]
+    assert columns["alert_metadata"] == [{"k": ["v"]}, {}]
+    assert columns["flowbits"] == [[], ["single"]]
+
+
+def test_out_of_range_values_fall_back_to_defaults():
+    batch = ColumnarBatch(table_for("dns"))
+    batch.append({
+        "timestamp": TIMESTAMP, "event_type": "dns",
+        "dns": {
+            "id": 70000, "opcode": True, "rrname": "example.com",
+            "answers": [{"rrname": "example.com", "ttl": -5, "rdata": "1.2.3.4"}, "bogus"],
+        },
+    })
+    _serialize(batch)
+
+    assert list(batch.columns["dns_id"]) == [0]
+    assert list(batch.columns["dns_opcode"]) == [1]
+    assert batch.columns["dns_answers.ttl"] == [[0, 0]]
+    assert batch.columns["dns_answers.rdata"] == [["1.2.3.4", ""]]
+
+
+def test_unconverted_values_fail_serialization(caplog):
+    # 변환 없이 넣으면 드라이버가 실패하는지 (위 테스트가 의미 있는지) 확인
+    batch = ColumnarBatch(table_for("alert"))
+    batch.append({"timestamp": TIMESTAMP, "event_type": "alert", "alert": {"severity": 1}})
+    batch.columns["alert_severity"][0] = "high"
+    with caplog.at_level(logging.CRITICAL), pytest.raises(ValueError):
+        _serialize(batch)
@@ -0,0 +1,25 @@
+from app.util.stats_metrics import TOTAL_IFACE, StatsDeltaTracker, StatsSample
+
+
+def _sample(uptime: int, **counters):
+    return StatsSample(0, 0, "sensor", {TOTAL_IFACE: {"uptime": uptime, **counters}})
+
+
+def _deltas(tracker: StatsDeltaTracker, sample: StatsSample, metric: str):
+    return [delta for _, name, _, delta in tracker.rows(sample) if name == metric]
+
+
+def test_counter_starting_at_zero_keeps_first_increase():
+    tracker = StatsDeltaTracker()
+    deltas = []
+    for uptime, drops in ((8, 0), (16, 0), (24, 500), (32, 800)):
+        deltas.extend(_deltas(tracker, _sample(uptime, **{"capture.kernel_drops": drops}), "capture.kernel_drops"))
+    assert deltas == [500, 300]
+
+
+def test_first_seen_nonzero_counter_is_baseline_and_restart_resets():
+    tracker = StatsDeltaTracker()
+    assert _deltas(tracker, _sample(8, **{"decoder.pkts": 100}), "decoder.pkts") == [0]
+    assert _deltas(tracker, _sample(16, **{"decoder.pkts": 150}), "decoder.pkts") == [50]
+    # uptime 감소 = Suricata 재시작 -> 카운터 값 전체가 delta
+    assert _deltas(tracker, _sample(4, **{"decoder.pkts": 30}), "decoder.pkts") == [30]